@@ -12,6 +12,7 @@ from django.conf import settings
 from django.utils.crypto import get_random_string
 from django.urls import reverse
 from dashboard.supabase_utils import upload_profile_picture
+from dashboard import metrics
 from django.core.files.base import ContentFile
 from PIL import Image
 from io import BytesIO
@@ -213,13 +214,18 @@ The ProTrack Team
         
         # Send email
         from django.core.mail import send_mail
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            fail_silently=False,
-        )
+        try:
+            send_mail(
+                subject,
+                message,
+                settings.DEFAULT_FROM_EMAIL,
+                [user.email],
+                fail_silently=False,
+            )
+        except Exception:
+            metrics.inc('protrack_emails_failed_total')
+            raise
+        metrics.inc('protrack_emails_sent_total')
         
         logger.info(f'✅ Email sent successfully to {user.email}')
         messages.success(request, f'Verification email sent to {user.email}. Check your inbox!')
@@ -3,4 +3,5 @@ set -o errexit
  
 pip install -r requirements.txt
 python manage.py migrate --noinput
+python manage.py createcachetable
 python manage.py collectstatic --noinput
\ No newline at end of file
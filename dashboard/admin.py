@@ -1,7 +1,8 @@
 # Protrack/dashboard/admin.py
 from django.contrib import admin
 from .models import TrainingCategory, TrainingCourse, TrainingSession, Enrollment, TrainingMaterial, Certificate
-from .models import Notification 
+from .models import Notification, BackgroundJob
+from .notifications import forget_unread_counts, touch_notification_stamps
 
 @admin.register(TrainingCategory)
 class TrainingCategoryAdmin(admin.ModelAdmin):
@@ -196,12 +197,42 @@ class NotificationAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_read', 'mark_as_unread']
     
+    def _notification_users_changed(self, queryset):
+        # update() skips signals: rebuild counters and wake streams for these users
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        forget_unread_counts(user_ids)
+        touch_notification_stamps(user_ids)
+    
     def mark_as_read(self, request, queryset):
         updated = queryset.update(is_read=True)
+        self._notification_users_changed(queryset)
         self.message_user(request, f'{updated} notification(s) marked as read.')
     mark_as_read.short_description = 'Mark selected as read'
     
     def mark_as_unread(self, request, queryset):
         updated = queryset.update(is_read=False)
+        self._notification_users_changed(queryset)
         self.message_user(request, f'{updated} notification(s) marked as unread.')
-    mark_as_unread.short_description = 'Mark selected as unread'
\ No newline at end of file
+    mark_as_unread.short_description = 'Mark selected as unread'
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'task', 'created_at']
+    search_fields = ['task', 'last_error']
+    readonly_fields = ['created_at', 'updated_at', 'finished_at', 'last_error']
+    date_hierarchy = 'created_at'
+    list_per_page = 50
+    
+    actions = ['retry_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status='running').update(
+            status='pending',
+            attempts=0,
+            run_after=timezone.now()
+        )
+        self.message_user(request, f'{updated} job(s) queued for retry.')
+    retry_jobs.short_description = 'Retry selected jobs'
@@ -0,0 +1,198 @@
+"""Calendar feeds for ProTrack.
+
+The FullCalendar JSON endpoints and the iCalendar subscription feed read the
+same rows: ``calendar_sessions`` (training sessions, shown to superusers),
+``calendar_enrollments`` (a learner's enrollment windows) and
+``calendar_events`` (personal CalendarEvents), each optionally limited to a
+date window.
+
+Each user can subscribe to ``/dashboard/calendar/feed/<token>.ics`` from
+Outlook or Google Calendar (see CalendarFeed). Those clients poll often, so
+the rendered ICS is cached under the feed's ``version``: saving or deleting
+anything that appears in a user's feed increments that column (see
+dashboard.signals), and the next poll rebuilds the feed once. The version
+lives in the database rather than the cache so every process agrees on it,
+and it is also the feed's ETag, so answering an unchanged poll with a 304
+needs only the token lookup. There is no Last-Modified: two changes within
+one second would share it.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import CalendarEvent, CalendarFeed, Enrollment, TrainingSession
+
+FEED_CACHE_KEY = 'calendar:ics:{}:{}'
+
+
+def _window_datetime(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def calendar_sessions(start=None, end=None):
+    """Training sessions overlapping [start, end)."""
+    sessions = TrainingSession.objects.all()
+    if start:
+        sessions = sessions.filter(end_date__gte=start)
+    if end:
+        sessions = sessions.filter(start_date__lt=end)
+    return sessions
+
+
+def calendar_enrollments(user, start=None, end=None):
+    """The user's enrollments whose calendar span overlaps [start, end)."""
+    enrollments = Enrollment.objects.filter(user=user)
+    if start:
+        # Open enrollments are shown for one day from enrollment
+        enrollments = enrollments.filter(
+            Q(completion_date__gte=start)
+            | Q(completion_date__isnull=True, enrolled_date__gte=_window_datetime(start - timedelta(days=1)))
+        )
+    if end:
+        enrollments = enrollments.filter(enrolled_date__lt=_window_datetime(end))
+    return enrollments
+
+
+def calendar_events(user, start=None, end=None):
+    """The user's own CalendarEvents dated within [start, end)."""
+    events = CalendarEvent.objects.filter(user=user)
+    if start:
+        events = events.filter(event_date__gte=start)
+    if end:
+        events = events.filter(event_date__lt=end)
+    return events
+
+
+# ============ CHANGE TRACKING ============
+
+def touch_calendar_feeds(user_ids):
+    """Mark the users' feeds as changed, so their next poll rebuilds them."""
+    CalendarFeed.objects.filter(user_id__in=user_ids).update(version=F('version') + 1)
+
+
+def touch_superuser_calendar_feeds():
+    """Training sessions appear in every superuser's feed."""
+    CalendarFeed.objects.filter(user__is_superuser=True).update(version=F('version') + 1)
+
+
+# ============ ICS ============
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces, continued with a leading space (RFC 5545 3.1)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    pieces = []
+    while encoded:
+        size = min(len(encoded), 75 if not pieces else 74)
+        # Never split a multi-byte character
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        pieces.append(encoded[:size].decode('utf-8'))
+        encoded = encoded[size:]
+    return '\r\n '.join(pieces)
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local(day, at):
+    """A date and naive time as entered in the app (TIME_ZONE), in UTC."""
+    return _utc(timezone.make_aware(datetime.combine(day, at)))
+
+
+def _vevent(uid, stamp, start, end=None, summary='', description='', location='', url='', alarm_minutes=None):
+    lines = ['BEGIN:VEVENT', f'UID:{uid}', f'DTSTAMP:{_utc(stamp)}', start]
+    if end:
+        lines.append(end)
+    lines.append(f'SUMMARY:{_escape(summary)}')
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    if location:
+        lines.append(f'LOCATION:{_escape(location)}')
+    if url:
+        lines.append(f'URL:{url}')
+    if alarm_minutes is not None:
+        lines += [
+            'BEGIN:VALARM', 'ACTION:DISPLAY', f'DESCRIPTION:{_escape(summary)}',
+            f'TRIGGER:-PT{alarm_minutes}M', 'END:VALARM',
+        ]
+    lines.append('END:VEVENT')
+    return lines
+
+
+def build_ics(user):
+    """Render the user's calendar (the rows the FullCalendar feeds show) as an iCalendar document."""
+    site_url = settings.SITE_URL.rstrip('/')
+    domain = site_url.split('://')[-1].split('/')[0] or 'protrack'
+    lines = [
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//ProTrack//Calendar//EN',
+        'CALSCALE:GREGORIAN', 'METHOD:PUBLISH', 'X-WR-CALNAME:ProTrack',
+    ]
+
+    if user.is_superuser:
+        for (session_id, course_id, course_title, session_name, start_date, start_time, end_date, end_time,
+             location, notes, updated_at) in calendar_sessions().values_list(
+            'id', 'course_id', 'course__title', 'session_name', 'start_date', 'start_time',
+            'end_date', 'end_time', 'location', 'notes', 'updated_at',
+        ):
+            lines += _vevent(
+                f'session-{session_id}@{domain}', updated_at,
+                f'DTSTART:{_local(start_date, start_time)}', f'DTEND:{_local(end_date, end_time)}',
+                summary=f'{course_title} - {session_name}', description=notes, location=location,
+                url=site_url + reverse('dashboard:course_detail', args=[course_id]),
+            )
+    else:
+        for (enrollment_id, course_id, course_title, enrolled_date, completion_date,
+             updated_at) in calendar_enrollments(user).values_list(
+            'id', 'course_id', 'course__title', 'enrolled_date', 'completion_date', 'updated_at',
+        ):
+            start = enrolled_date.date()
+            end = max(completion_date or start, start + timedelta(days=1))
+            lines += _vevent(
+                f'enrollment-{enrollment_id}@{domain}', updated_at,
+                f'DTSTART;VALUE=DATE:{start:%Y%m%d}', f'DTEND;VALUE=DATE:{end:%Y%m%d}',
+                summary=course_title, url=site_url + reverse('dashboard:course_detail', args=[course_id]),
+            )
+
+    for (event_id, title, description, event_date, event_time, end_time, reminder_minutes,
+         updated_at) in calendar_events(user).values_list(
+        'id', 'title', 'description', 'event_date', 'event_time', 'end_time', 'reminder_minutes', 'updated_at',
+    ):
+        lines += _vevent(
+            f'event-{event_id}@{domain}', updated_at,
+            f'DTSTART:{_local(event_date, event_time)}',
+            f'DTEND:{_local(event_date, end_time)}' if end_time else None,
+            summary=title, description=description, url=site_url + reverse('dashboard:calendar'),
+            alarm_minutes=reminder_minutes,
+        )
+
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def feed_etag(feed):
+    return f'"{feed.pk}-{feed.version}"'
+
+
+def get_feed(feed):
+    """The feed's ICS document as of its version, built only when it is not cached yet."""
+    cache_key = FEED_CACHE_KEY.format(feed.pk, feed.version)
+    ics = cache.get(cache_key)
+    if ics is None:
+        ics = build_ics(feed.user)
+        cache.set(cache_key, ics, getattr(settings, 'CALENDAR_FEED_CACHE_TIMEOUT', 86400))
+    return ics
@@ -0,0 +1,125 @@
+"""Batch certificate issuing for ProTrack.
+
+``issue_certificates`` takes many draft certificates and, one batch at a
+time, renders their PDFs in a process pool, uploads them concurrently over
+the shared Supabase session, and marks the batch issued in one transaction.
+Used by the bulk-approve action (via the 'issue_certificates' job) and the
+``issue_certificates`` management command.
+"""
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+from django.db import transaction
+from django.utils import timezone
+
+from .certificates import certificate_context, render_certificates
+from .models import Certificate, Notification
+from .reports import invalidate_report
+from .supabase_utils import POOL_SIZE, upload_certificate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+
+
+def _render_batch(contexts, pool, processes):
+    """Render PDFs for a batch, split across the process pool. Failed chunks yield None."""
+    if pool is None:
+        chunks = [contexts]
+    else:
+        per_chunk = max(1, -(-len(contexts) // processes))
+        chunks = [contexts[i:i + per_chunk] for i in range(0, len(contexts), per_chunk)]
+
+    futures = [pool.submit(render_certificates, chunk) if pool else None for chunk in chunks]
+    pdfs = []
+    for chunk, future in zip(chunks, futures):
+        try:
+            pdfs.extend(future.result() if future else render_certificates(chunk))
+        except Exception as e:
+            logger.error(f"Certificate render failed for {len(chunk)} certificate(s): {e}")
+            pdfs.extend([None] * len(chunk))
+    return pdfs
+
+
+def _upload(certificate, pdf):
+    buffer = BytesIO(pdf)
+    buffer.name = f"certificate_{certificate.certificate_number}.pdf"
+    success, url, error = upload_certificate(certificate.enrollment_id, buffer)
+    if not success:
+        raise IOError(error or 'upload failed')
+    return url
+
+
+def issue_certificates(certificates, issued_by=None, batch_size=DEFAULT_BATCH_SIZE,
+                       processes=1, upload_workers=POOL_SIZE):
+    """
+    Render, upload and issue draft certificates in batches.
+
+    Args:
+        certificates: Certificate queryset (only drafts are issued)
+        issued_by: user recorded as the issuer
+        batch_size: certificates per render/upload/commit round
+        processes: render processes (1 renders in this process)
+        upload_workers: concurrent uploads
+
+    Returns:
+        dict with 'issued', 'failed' and 'elapsed' (seconds)
+    """
+    started = time.monotonic()
+    drafts = list(
+        certificates.filter(status='draft')
+        .select_related('enrollment__user', 'enrollment__course', 'issued_by')
+        .order_by('id')
+    )
+    issued = failed = 0
+
+    # Spawned, not forked: this runs inside run_worker's thread pool, and forking
+    # a process that has threads can copy a held lock into the child and deadlock
+    pool = ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+    ) if processes > 1 else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, upload_workers)) as uploader:
+            for start in range(0, len(drafts), batch_size):
+                batch = drafts[start:start + batch_size]
+                if issued_by is not None:
+                    for certificate in batch:
+                        certificate.issued_by = issued_by
+
+                pdfs = _render_batch([certificate_context(c) for c in batch], pool, processes)
+                uploads = {
+                    certificate: uploader.submit(_upload, certificate, pdf)
+                    for certificate, pdf in zip(batch, pdfs) if pdf is not None
+                }
+                failed += len(batch) - len(uploads)
+
+                done = []
+                for certificate, future in uploads.items():
+                    try:
+                        certificate.certificate_url = future.result()
+                    except Exception as e:
+                        logger.error(f"Certificate upload failed for {certificate.certificate_number}: {e}")
+                        failed += 1
+                        continue
+                    certificate.status = 'issued'
+                    certificate.updated_at = timezone.now()
+                    done.append(certificate)
+
+                with transaction.atomic():
+                    Certificate.objects.bulk_update(done, ['status', 'certificate_url', 'issued_by', 'updated_at'])
+                    for certificate in done:
+                        Notification.create_certificate_notification(certificate)
+                if done:
+                    invalidate_report()  # bulk_update skips post_save
+                issued += len(done)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Issued {issued} certificate(s), {failed} failed, in {elapsed:.3f}s")
+    return {'issued': issued, 'failed': failed, 'elapsed': elapsed}
@@ -0,0 +1,144 @@
+"""Certificate PDF rendering for ProTrack.
+
+A certificate is a static background (borders, headings, rules and footer,
+``draw_background``) with the learner/course details stamped on top
+(``draw_details``). ``render_certificates`` renders a batch in one call.
+
+Usage:
+    from dashboard.certificates import certificate_context, render_certificate_pdf
+
+    pdf_bytes = render_certificate_pdf(certificate_context(certificate))
+
+Contexts are plain dicts of strings, so they can be sent to worker processes.
+"""
+
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+PAGE_SIZE = landscape(letter)
+
+
+def draw_background(c):
+    """Draw the parts of the certificate that do not depend on the certificate."""
+    width, height = PAGE_SIZE
+
+    # Outer border (gold) and inner border (blue)
+    c.setStrokeColor(colors.HexColor('#C9A961'))
+    c.setLineWidth(6)
+    c.roundRect(0.4*inch, 0.4*inch, width-0.8*inch, height-0.8*inch, 15)
+
+    c.setStrokeColor(colors.HexColor('#667eea'))
+    c.setLineWidth(3)
+    c.roundRect(0.6*inch, 0.6*inch, width-1.2*inch, height-1.2*inch, 10)
+
+    # Title
+    c.setFont("Helvetica-Bold", 60)
+    c.setFillColor(colors.HexColor('#667eea'))
+    c.drawCentredString(width/2, height-2*inch, "CERTIFICATE")
+
+    c.setFont("Helvetica", 24)
+    c.setFillColor(colors.black)
+    c.drawCentredString(width/2, height-2.5*inch, "OF COMPLETION")
+
+    # Decorative line
+    c.setStrokeColor(colors.HexColor('#764ba2'))
+    c.setLineWidth(2)
+    c.line(width/2 - 3.5*inch, height-2.8*inch, width/2 + 3.5*inch, height-2.8*inch)
+
+    c.setFont("Helvetica", 16)
+    c.setFillColor(colors.black)
+    c.drawCentredString(width/2, height-3.6*inch, "This is to certify that")
+
+    c.setFont("Helvetica", 15)
+    c.drawCentredString(width/2, height-5*inch, "has successfully completed the course")
+
+    # Signature line
+    c.setStrokeColor(colors.black)
+    c.setLineWidth(1)
+    c.line(width/2 - 2*inch, 2.5*inch, width/2 + 2*inch, 2.5*inch)
+
+    # Footer
+    c.setFont("Helvetica-Oblique", 11)
+    c.setFillColor(colors.grey)
+    c.drawCentredString(width/2, 1*inch, "ProTrack - Skills & Training Management System")
+
+    c.setFont("Helvetica-Oblique", 9)
+    c.drawCentredString(width/2, 0.7*inch,
+        "This certificate verifies successful completion of the training program")
+
+
+def draw_details(c, context):
+    """Stamp the learner, course, issuer, date and number onto the certificate."""
+    width, height = PAGE_SIZE
+
+    # Recipient name
+    c.setFont("Helvetica-Bold", 40)
+    c.setFillColor(colors.HexColor('#764ba2'))
+    c.drawCentredString(width/2, height-4.3*inch, context['user_name'])
+
+    # Course title, split over two lines when long
+    c.setFont("Helvetica-Bold", 26)
+    c.setFillColor(colors.HexColor('#667eea'))
+    course_title = context['course_title']
+    if len(course_title) > 50:
+        words = course_title.split()
+        mid = len(words) // 2
+        c.drawCentredString(width/2, height-5.6*inch, ' '.join(words[:mid]))
+        c.drawCentredString(width/2, height-6*inch, ' '.join(words[mid:]))
+        info_y_position = height-6.7*inch
+    else:
+        c.drawCentredString(width/2, height-5.6*inch, course_title)
+        info_y_position = height-6.3*inch
+
+    c.setFont("Helvetica", 13)
+    c.setFillColor(colors.HexColor('#666666'))
+    c.drawCentredString(
+        width/2, info_y_position,
+        f"Duration: {context['duration_hours']} hours | Instructor: {context['instructor']}"
+    )
+
+    if context['issued_by']:
+        c.setFont("Helvetica-Bold", 11)
+        c.drawCentredString(width/2, 1.95*inch, context['issued_by'])
+
+    c.setFont("Helvetica-Bold", 11)
+    c.setFillColor(colors.black)
+    c.drawString(1.5*inch, 1.6*inch, f"Date Issued: {context['issue_date']}")
+    c.drawRightString(width-1.5*inch, 1.6*inch, f"Certificate No: {context['certificate_number']}")
+
+
+def certificate_context(certificate):
+    """Collect the variable text for a certificate (expects enrollment user/course loaded)."""
+    user = certificate.enrollment.user
+    course = certificate.enrollment.course
+    issued_by = certificate.issued_by
+    return {
+        'user_name': user.get_full_name() or user.username,
+        'course_title': course.title,
+        'duration_hours': str(course.duration_hours),
+        'instructor': course.instructor,
+        'issued_by': (issued_by.get_full_name() or issued_by.username) if issued_by else '',
+        'issue_date': certificate.issue_date.strftime("%B %d, %Y"),
+        'certificate_number': certificate.certificate_number,
+    }
+
+
+def render_certificate_pdf(context):
+    """Render one certificate from its context. Returns the PDF bytes."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
+    c.saveState()
+    draw_background(c)
+    c.restoreState()
+    draw_details(c, context)
+    c.save()
+    return buffer.getvalue()
+
+
+def render_certificates(contexts):
+    """Render a batch of certificates. Returns PDF bytes in the same order."""
+    return [render_certificate_pdf(context) for context in contexts]
@@ -0,0 +1,233 @@
+"""Streaming ZIP bundles of course materials.
+
+``stream_materials_zip`` fetches each material from Supabase in chunks and
+writes it straight into a ZIP stream, so the first bytes reach the browser
+immediately and worker memory stays bounded no matter how large the course
+is. Upcoming materials are fetched concurrently on a bounded thread pool,
+each into a small bounded queue, while the current one is streamed.
+
+``stream_and_cache_bundle`` tees that stream into a file under
+``MATERIAL_BUNDLE_CACHE_DIR``; later downloads of an unchanged course are
+served from the cached file (see ``bundle_cache_path``).
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+
+from .supabase_utils import CONNECT_TIMEOUT, READ_TIMEOUT, get_http_session
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024  # bytes per network read / ZIP write
+PREFETCH_CHUNKS = 8  # max chunks buffered per in-flight download
+
+_DONE = object()
+
+
+class StreamBuffer:
+    """
+    Write-only file object that hands written bytes back to a generator.
+
+    Lets ``zipfile`` write into a streaming response: the generator writes,
+    then yields ``pop()``. Also used by the XLSX report export (see
+    dashboard.exports).
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class MaterialFetch:
+    """
+    Download one material in a background thread into a bounded chunk queue.
+
+    The first item on the queue is True once the response headers say the
+    object exists, or an exception if the request failed; chunks follow,
+    then a sentinel. put() blocks when the queue is full, which is what
+    bounds memory.
+    """
+
+    def __init__(self, url, executor, chunk_size=CHUNK_SIZE, max_chunks=PREFETCH_CHUNKS):
+        self.url = url
+        self.chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._cancelled = threading.Event()
+        executor.submit(self._run)
+
+    def _put(self, item):
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            with get_http_session().get(
+                self.url, stream=True, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+            ) as response:
+                if response.status_code != 200:
+                    raise IOError(f"HTTP {response.status_code} fetching {self.url}")
+                if not self._put(True):
+                    return
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if chunk and not self._put(chunk):
+                        return
+            self._put(_DONE)
+        except Exception as e:
+            self._put(e)
+
+    def ready(self):
+        """Wait for the response headers. Raises if the download failed."""
+        item = self._queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def chunks(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+def stream_materials_zip(materials, compression=zipfile.ZIP_DEFLATED, workers=None, errors=None):
+    """
+    Yield a ZIP archive of the given materials as a stream of bytes.
+
+    Up to `workers` materials (MATERIAL_BUNDLE_FETCH_WORKERS by default) are
+    downloaded concurrently. Materials that cannot be downloaded are skipped
+    and logged, like the previous in-memory implementation did; their names
+    are appended to `errors` when a list is given.
+    """
+    materials = [m for m in materials if m.file_url]
+    workers = max(1, workers or getattr(settings, 'MATERIAL_BUNDLE_FETCH_WORKERS', 4))
+    buffer = StreamBuffer()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bundle')
+    fetches = {}
+
+    def start(index):
+        if index < len(materials) and index not in fetches:
+            fetches[index] = MaterialFetch(materials[index].file_url, executor)
+
+    def failed(material, error):
+        logger.error(f"Failed to add {material.file_name}: {str(error)}")
+        if errors is not None:
+            errors.append(material.file_name)
+
+    try:
+        with zipfile.ZipFile(buffer, 'w', compression) as zip_file:
+            for index, material in enumerate(materials):
+                # Keep the current material and the next workers-1 in flight
+                for ahead in range(index, index + workers):
+                    start(ahead)
+                fetch = fetches[index]
+
+                try:
+                    fetch.ready()
+                except Exception as e:
+                    failed(material, e)
+                    del fetches[index]
+                    continue
+
+                try:
+                    with zip_file.open(material.file_name, 'w') as entry:
+                        for chunk in fetch.chunks():
+                            entry.write(chunk)
+                            data = buffer.pop()
+                            if data:
+                                yield data
+                except Exception as e:
+                    # The entry is closed with what was received so the archive stays valid
+                    failed(material, e)
+
+                del fetches[index]
+                data = buffer.pop()
+                if data:
+                    yield data
+
+        yield buffer.pop()  # central directory
+    finally:
+        # Client disconnected or an error escaped: stop any in-flight downloads
+        for fetch in fetches.values():
+            fetch.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ============ ON-DISK BUNDLE CACHE ============
+
+def _cache_dir():
+    return Path(getattr(settings, 'MATERIAL_BUNDLE_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'material_bundles'))
+
+
+def bundle_cache_path(course, materials):
+    """
+    Cache file for the course's current set of materials.
+
+    The name changes whenever a material is added, removed or has its file
+    replaced, so a stale bundle is never served.
+    """
+    digest = hashlib.sha256()
+    for material in sorted(materials, key=lambda m: m.id):
+        digest.update(
+            f"{material.id}|{material.uploaded_at.isoformat()}|{material.file_url}|{material.file_size}\n".encode()
+        )
+    return _cache_dir() / f"course_{course.id}_{digest.hexdigest()[:32]}.zip"
+
+
+def stream_and_cache_bundle(materials, path, **kwargs):
+    """
+    Stream a materials ZIP and save a copy to `path` as it goes.
+
+    The copy is only kept if every material was included and the client
+    received the whole archive; older bundles for the same course are then
+    removed.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    errors = []
+    try:
+        with open(tmp_path, 'wb') as cache_file:
+            for data in stream_materials_zip(materials, errors=errors, **kwargs):
+                cache_file.write(data)
+                yield data
+
+        if errors:
+            logger.warning(f"Not caching {path.name}: {len(errors)} material(s) failed to download")
+        else:
+            os.replace(tmp_path, path)
+            prefix = path.name.rsplit('_', 1)[0] + '_'
+            for old in path.parent.glob(f"{prefix}*.zip"):
+                if old != path:
+                    old.unlink(missing_ok=True)
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,250 @@
+"""Streaming CSV and XLSX exports of the admin reports (US-03).
+
+Each export in ``EXPORTS`` pairs its column headers with a generator that
+walks the rows with ``.iterator(chunk_size=EXPORT_CHUNK_SIZE)``, so rows are
+fetched from the database in chunks rather than loaded all at once.
+``stream_csv`` and ``stream_xlsx`` turn those rows into response chunks as
+they arrive: the download starts immediately and worker memory stays flat
+however many enrollments there are.
+
+XLSX files are written directly as a ZIP of SpreadsheetML parts with
+inline strings, so no spreadsheet library is needed to stream them.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from accounts.models import CustomUser
+
+from .downloads import StreamBuffer
+from .models import Enrollment, TrainingCourse
+
+EXPORT_CHUNK_SIZE = 2000  # rows fetched per database round trip
+ROWS_PER_WRITE = 500  # rows encoded per response chunk
+
+
+def _percent(part, whole):
+    return round(part / whole * 100, 1) if whole else 0
+
+
+def _score(value):
+    return round(value, 2) if value is not None else None
+
+
+def course_rows():
+    courses = (
+        TrainingCourse.objects.annotate(
+            total_enrolled=Count('enrollments'),
+            active=Count('enrollments', filter=Q(enrollments__status__in=['enrolled', 'in_progress'])),
+            completed=Count('enrollments', filter=Q(enrollments__status='completed')),
+            avg_score=Avg('enrollments__score', filter=Q(enrollments__score__isnull=False)),
+        )
+        .order_by('title', 'id')
+        .values_list(
+            'id', 'title', 'category__name', 'instructor', 'status',
+            'total_enrolled', 'active', 'completed', 'avg_score',
+        )
+    )
+    for (course_id, title, category, instructor, status,
+         total, active, completed, avg_score) in courses.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield (
+            course_id, title, category or '', instructor, status,
+            total, active, completed, _percent(completed, total), _score(avg_score),
+        )
+
+
+def user_progress_rows():
+    users = (
+        CustomUser.objects.filter(is_superuser=False)
+        .annotate(
+            total_enrollments=Count('enrollments'),
+            completed_courses=Count('enrollments', filter=Q(enrollments__status='completed')),
+            in_progress=Count('enrollments', filter=Q(enrollments__status='in_progress')),
+            avg_score=Avg('enrollments__score', filter=Q(enrollments__score__isnull=False)),
+        )
+        .order_by('username')
+        .values_list(
+            'username', 'first_name', 'last_name', 'email', 'user_type', 'program',
+            'total_enrollments', 'completed_courses', 'in_progress', 'avg_score',
+        )
+    )
+    for (username, first_name, last_name, email, user_type, program,
+         total, completed, in_progress, avg_score) in users.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield (
+            username, f'{first_name} {last_name}'.strip(), email, user_type, program,
+            total, completed, in_progress, _percent(completed, total), _score(avg_score),
+        )
+
+
+def enrollment_rows():
+    enrollments = Enrollment.objects.order_by('id').values_list(
+        'id', 'user__username', 'user__email', 'course__title', 'status',
+        'enrolled_date', 'start_date', 'completion_date',
+        'required_count', 'completed_required_count', 'progress_percentage', 'score',
+    )
+    for (enrollment_id, username, email, course, status, enrolled, started, completed,
+         required, completed_required, progress, score) in enrollments.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        # Same rule as progress.completion_rate, from the materialized counters
+        if required:
+            progress = round(completed_required / required * 100)
+        yield (
+            enrollment_id, username, email, course, status,
+            timezone.localtime(enrolled), started, completed, progress, score,
+        )
+
+
+EXPORTS = {
+    'courses': (
+        ['Course ID', 'Course', 'Category', 'Instructor', 'Status', 'Enrolled', 'Active',
+         'Completed', 'Completion Rate (%)', 'Average Score'],
+        course_rows,
+    ),
+    'user-progress': (
+        ['Username', 'Name', 'Email', 'User Type', 'Program', 'Enrollments', 'Completed',
+         'In Progress', 'Completion Rate (%)', 'Average Score'],
+        user_progress_rows,
+    ),
+    'enrollments': (
+        ['Enrollment ID', 'Username', 'Email', 'Course', 'Status', 'Enrolled', 'Started',
+         'Completed', 'Progress (%)', 'Score'],
+        enrollment_rows,
+    ),
+}
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= ROWS_PER_WRITE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ============ CSV ============
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    # Keep spreadsheet apps from evaluating user-entered text as a formula
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def stream_csv(headers, rows):
+    """Yield a UTF-8 CSV (with BOM, so Excel detects the encoding) in chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    yield '﻿'.encode('utf-8')
+    for batch in _batches(chain([headers], rows)):
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+
+# ============ XLSX ============
+
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        value = value.strftime('%Y-%m-%d %H:%M:%S')
+    elif isinstance(value, date):
+        value = value.isoformat()
+    text = escape(_INVALID_XML.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(row):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>'
+
+
+def stream_xlsx(headers, rows, sheet_name='Report'):
+    """Yield a single-sheet XLSX workbook in chunks."""
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        for name, xml in _XLSX_PARTS.items():
+            workbook.writestr(name, xml)
+        workbook.writestr('xl/workbook.xml', _WORKBOOK.format(escape(sheet_name[:31], {'"': '&quot;'})))
+        yield buffer.pop()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(_SHEET_START.encode('utf-8'))
+            for batch in _batches(chain([headers], rows)):
+                sheet.write(''.join(_xlsx_row(row) for row in batch).encode('utf-8'))
+                data = buffer.pop()
+                if data:
+                    yield data
+            sheet.write(_SHEET_END.encode('utf-8'))
+
+    yield buffer.pop()  # central directory
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', stream_csv),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', stream_xlsx),
+}
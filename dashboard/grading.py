@@ -0,0 +1,140 @@
+"""Quiz grading for ProTrack.
+
+``build_answer_key`` loads a quiz's questions and choices once (two queries)
+into a plain in-memory key. ``grade_submission`` grades a submitted form
+against it in a single pass, producing both the unsaved Answer rows and the
+per-question results shown on the results page, and ``save_attempt`` writes
+the attempt and all of its answers with one ``bulk_create``. Grading cost no
+longer grows in queries with the number of questions.
+
+Published quizzes cannot be edited until they are unpublished, so their
+compiled keys are cached (``get_answer_key``) and grading a published quiz
+needs no question or choice queries at all. Each cached key is stored under
+the quiz's ``answer_key_version``, a database column that saving the quiz or
+any of its questions or choices increments (see Quiz.save() and
+dashboard.signals). Every
+process reads the version with the quiz row, so none can grade against a
+retired key, even with a per-process cache or a request that raced with the
+edit.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import Answer, Question, Quiz, QuizAttempt
+
+ANSWER_KEY_FORMAT = 1  # bump when the compiled key's structure changes
+ANSWER_KEY_CACHE_KEY = 'quiz:answer-key:{}:{}:v{}'
+
+
+def normalize_answer(text):
+    """Text answers are compared case-insensitively, ignoring surrounding whitespace."""
+    return (text or '').strip().lower()
+
+
+def build_answer_key(quiz):
+    """
+    Compile the quiz's questions and choices into a list of per-question
+    dicts of plain values: 'id', 'text', 'type', 'choices' ({choice id:
+    (text, is_correct)}), 'correct_text' (shown on the results page) and
+    'correct' (normalized expected text answer).
+    """
+    key = []
+    for question in quiz.questions.order_by('order', 'id').prefetch_related('choices'):
+        choices = {choice.id: (choice.text, choice.is_correct) for choice in question.choices.all()}
+        if question.question_type == 'multiple_choice':
+            correct_text = next((text for text, is_correct in choices.values() if is_correct), 'N/A')
+        else:
+            correct_text = question.correct_answer
+        key.append({
+            'id': question.id,
+            'text': question.text,
+            'type': question.question_type,
+            'choices': choices,
+            'correct_text': correct_text,
+            'correct': normalize_answer(question.correct_answer),
+        })
+    return key
+
+
+def get_answer_key(quiz):
+    """Return the compiled answer key, from the cache when the quiz is published."""
+    if not quiz.is_published:
+        return build_answer_key(quiz)
+
+    cache_key = ANSWER_KEY_CACHE_KEY.format(quiz.id, quiz.answer_key_version, ANSWER_KEY_FORMAT)
+    answer_key = cache.get(cache_key)
+    if answer_key is None:
+        answer_key = build_answer_key(quiz)
+        cache.set(cache_key, answer_key, getattr(settings, 'ANSWER_KEY_CACHE_TIMEOUT', 86400))
+    return answer_key
+
+
+def invalidate_answer_key(quiz_id):
+    """Retire the quiz's cached answer key by incrementing its version."""
+    Quiz.objects.filter(pk=quiz_id).update(answer_key_version=F('answer_key_version') + 1)
+
+
+def grade_submission(answer_key, data):
+    """
+    Grade submitted answers (``question_<id>`` fields in data) against an answer key.
+
+    Returns a dict with 'score' (correct answers), 'total', 'percentage',
+    'answers' (unsaved Answer objects for the questions that were answered)
+    and 'results' (one dict per question for the results page).
+    """
+    score = 0
+    answers = []
+    results = []
+
+    for entry in answer_key:
+        # Unsaved stand-in for the results page, so no Question is loaded
+        question = Question(id=entry['id'], text=entry['text'], question_type=entry['type'])
+        user_answer = data.get(f'question_{question.id}')
+        user_answer_text = ''
+        is_correct = False
+
+        if user_answer:
+            if entry['type'] == 'multiple_choice':
+                # Only choices that belong to this question count
+                try:
+                    choice_id = int(user_answer)
+                except ValueError:
+                    choice_id = None
+                if choice_id in entry['choices']:
+                    user_answer_text, is_correct = entry['choices'][choice_id]
+                    answers.append(Answer(question_id=question.id, choice_id=choice_id))
+            else:
+                user_answer_text = user_answer
+                is_correct = normalize_answer(user_answer) == entry['correct']
+                answers.append(Answer(question_id=question.id, text_answer=user_answer))
+
+        if is_correct:
+            score += 1
+        results.append({
+            'question': question,
+            'user_answer': user_answer_text,
+            'correct_answer': entry['correct_text'],
+            'is_correct': is_correct,
+        })
+
+    total = len(answer_key)
+    return {
+        'score': score,
+        'total': total,
+        'percentage': round((score / total) * 100, 2) if total > 0 else 0,
+        'answers': answers,
+        'results': results,
+    }
+
+
+def save_attempt(enrollment, quiz, graded):
+    """Record a graded submission: one attempt insert plus one bulk insert of its answers."""
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(enrollment=enrollment, quiz=quiz, score=graded['percentage'])
+        for answer in graded['answers']:
+            answer.attempt = attempt
+        Answer.objects.bulk_create(graded['answers'])
+    return attempt
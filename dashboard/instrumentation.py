@@ -0,0 +1,170 @@
+"""Per-request timing and query instrumentation for ProTrack.
+
+``RequestMetricsMiddleware`` wraps every request in
+``connection.execute_wrapper`` to count its queries and the time spent in
+the database, and records wall time, query count and DB time per view
+(keyed by URL name):
+
+* as cumulative histograms in dashboard.metrics (exported at ``/metrics``),
+  and
+* in a rolling window of the last ``REQUEST_METRICS_WINDOW`` requests per
+  view, from which ``rolling_metrics`` derives percentiles and histograms
+  (served to admins by the ``request_metrics`` view).
+
+Requests slower than ``REQUEST_SLOW_MS`` or running more than
+``REQUEST_QUERY_THRESHOLD`` queries are logged as warnings listing the SQL
+statements they repeated most, which points straight at N+1 loops.
+
+Metrics are per process: each gunicorn worker keeps its own. Work done
+while a streaming response is iterated happens after the view returns and
+is not counted.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics
+from .metrics import LATENCY_BUCKETS, QUERY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+REPEATED_SQL_SHOWN = 5
+
+
+class QueryRecorder:
+    """``execute_wrapper`` callable counting queries, DB time and repeated statements."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, limit=REPEATED_SQL_SHOWN):
+        """The most repeated statements (run more than once) as (sql, times) pairs."""
+        return [(sql, times) for sql, times in self.statements.most_common(limit) if times > 1]
+
+
+class ViewMetrics:
+
+    def __init__(self, window):
+        self.requests = 0
+        self.errors = 0
+        self.recent = deque(maxlen=window)  # (duration, queries, db_time)
+
+
+_views = {}
+_lock = threading.Lock()
+
+
+def record_request(view, duration, queries, db_time, status=200):
+    metrics.inc('protrack_http_requests_total', view=view, status=f'{status // 100}xx')
+    metrics.observe('protrack_http_request_duration_seconds', duration, view=view)
+    metrics.observe('protrack_http_request_queries', queries, view=view)
+    metrics.observe('protrack_http_request_db_seconds', db_time, view=view)
+    with _lock:
+        view_metrics = _views.get(view)
+        if view_metrics is None:
+            view_metrics = _views[view] = ViewMetrics(getattr(settings, 'REQUEST_METRICS_WINDOW', 1000))
+        view_metrics.requests += 1
+        view_metrics.errors += status >= 500
+        view_metrics.recent.append((duration, queries, db_time))
+
+
+def reset_metrics():
+    with _lock:
+        _views.clear()
+
+
+def _percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def _summary(values, buckets, scale=1):
+    """Percentiles and per-bucket counts of values; reported values are multiplied by scale."""
+    values = sorted(values)
+    counts = [0] * (len(buckets) + 1)
+    for value in values:
+        counts[bisect_left(buckets, value)] += 1
+    return {
+        'p50': round(_percentile(values, 50) * scale, 3),
+        'p95': round(_percentile(values, 95) * scale, 3),
+        'p99': round(_percentile(values, 99) * scale, 3),
+        'max': round(values[-1] * scale, 3),
+        'histogram': [
+            {'le': round(bound * scale, 3), 'count': count} for bound, count in zip(buckets, counts)
+        ] + [{'le': '+Inf', 'count': counts[-1]}],
+    }
+
+
+def rolling_metrics():
+    """Percentiles and histograms over each view's recent requests, slowest p95 first."""
+    with _lock:
+        views = {
+            view: (view_metrics.requests, view_metrics.errors, list(view_metrics.recent))
+            for view, view_metrics in _views.items()
+        }
+    summary = {}
+    for view, (requests, errors, recent) in views.items():
+        durations, queries, db_times = zip(*recent)
+        summary[view] = {
+            'requests': requests,
+            'errors': errors,
+            'window': len(recent),
+            'duration_ms': _summary(durations, LATENCY_BUCKETS, scale=1000),
+            'queries': _summary(queries, QUERY_BUCKETS),
+            'db_ms': _summary(db_times, LATENCY_BUCKETS, scale=1000),
+        }
+    return dict(sorted(summary.items(), key=lambda item: item[1]['duration_ms']['p95'], reverse=True))
+
+
+class RequestMetricsMiddleware:
+    """Record wall time, query count and DB time per view; warn on slow or query-heavy requests."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, 'REQUEST_SLOW_MS', 1000) / 1000
+        self.query_threshold = getattr(settings, 'REQUEST_QUERY_THRESHOLD', 50)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        status = 500
+        try:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            duration = time.perf_counter() - started
+            match = request.resolver_match
+            view = match.view_name if match else 'unresolved'
+            record_request(view, duration, recorder.count, recorder.duration, status)
+            if duration >= self.slow_seconds or recorder.count >= self.query_threshold:
+                self.warn(request, view, duration, recorder)
+
+    def warn(self, request, view, duration, recorder):
+        lines = [
+            f"Slow request {request.method} {request.path} ({view}): {duration * 1000:.0f} ms, "
+            f"{recorder.count} queries, {recorder.duration * 1000:.0f} ms in the database"
+        ]
+        for sql, times in recorder.repeated():
+            lines.append(f"  {times}x {sql[:300]}")
+        logger.warning('\n'.join(lines))
@@ -0,0 +1,264 @@
+"""Database-backed background job queue for ProTrack.
+
+Slow side effects (sending email, rendering and uploading certificate PDFs)
+are stored as BackgroundJob rows and executed by ``python manage.py run_worker``
+so the web request can return immediately.
+
+Usage:
+    from dashboard.jobs import enqueue, enqueue_email
+
+    enqueue_email('ProTrack: Hello', 'Body', ['user@example.com'])
+    enqueue('issue_certificate', certificate_id=1, issued_by_id=2)
+
+Failed jobs are retried with exponential backoff; after ``max_attempts`` they
+are moved to the 'dead' state and left for an admin to inspect or retry.
+While a job runs, its row is touched every ``JOB_HEARTBEAT_SECONDS`` so a
+long job is never mistaken for one whose worker died (``requeue_stale_jobs``).
+
+``JOB_QUEUE_EAGER`` (the default) runs jobs inline in the caller instead;
+turn it off once a ``run_worker`` process is deployed.
+"""
+
+import logging
+import random
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# Retry delay is RETRY_BASE_SECONDS * 2 ** (attempt - 1), plus up to 10% jitter
+RETRY_BASE_SECONDS = 30
+
+_registry = {}
+
+
+def task(name):
+    """Register a function as a job handler. It receives the payload as kwargs."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(task_name, run_after=None, max_attempts=None, unique_on=(), **payload):
+    """
+    Queue a job for the worker.
+
+    The job row is written in the caller's transaction, so work queued by a
+    request that is rolled back is discarded with it. With unique_on (payload
+    keys), a job of the same task with the same values that is still queued
+    or running is returned instead of queuing another.
+    Returns the BackgroundJob (or None when JOB_QUEUE_EAGER ran it inline).
+    """
+    if task_name not in _registry:
+        raise ValueError(f"Unknown job task: {task_name}")
+
+    if getattr(settings, 'JOB_QUEUE_EAGER', True):
+        _registry[task_name](**payload)
+        return None
+
+    if unique_on:
+        queued = BackgroundJob.objects.filter(
+            task=task_name,
+            status__in=['pending', 'running', 'failed'],
+            **{f'payload__{key}': payload[key] for key in unique_on},
+        ).first()
+        if queued is not None:
+            return queued
+
+    job = BackgroundJob.objects.create(
+        task=task_name,
+        payload=payload,
+        run_after=run_after or timezone.now(),
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 5),
+    )
+    return job
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None):
+    """Queue a plain-text email (replaces inline send_mail in request handlers)."""
+    recipients = [r for r in recipient_list if r]
+    if not recipients:
+        return None
+    return enqueue(
+        'send_email',
+        subject=subject,
+        message=message,
+        recipient_list=recipients,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def claim_jobs(limit):
+    """
+    Atomically claim up to `limit` due jobs and mark them running.
+
+    Uses a conditional UPDATE per candidate so concurrent workers (threads or
+    processes, on SQLite or PostgreSQL) never run the same job twice.
+    """
+    now = timezone.now()
+    candidates = list(
+        BackgroundJob.objects.filter(
+            status__in=['pending', 'failed'],
+            run_after__lte=now,
+        ).order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+    )
+
+    claimed = []
+    for job_id in candidates:
+        won = BackgroundJob.objects.filter(
+            id=job_id, status__in=['pending', 'failed']
+        ).update(status='running', updated_at=now)
+        if won:
+            claimed.append(job_id)
+    return list(BackgroundJob.objects.filter(id__in=claimed))
+
+
+@contextmanager
+def heartbeat(job_id, interval=None):
+    """Touch the running job's updated_at every interval seconds until the block exits."""
+    interval = interval or getattr(settings, 'JOB_HEARTBEAT_SECONDS', 60)
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                BackgroundJob.objects.filter(id=job_id, status='running').update(updated_at=timezone.now())
+        except Exception as e:
+            logger.warning(f"Heartbeat for job #{job_id} stopped: {e}")
+        finally:
+            connection.close()  # this thread's connection
+
+    thread = threading.Thread(target=beat, name=f'job-heartbeat-{job_id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run_job(job):
+    """Execute a claimed job and record success, retry or dead-letter."""
+    job.attempts += 1
+    handler = _registry.get(job.task)
+
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for task '{job.task}'")
+        with heartbeat(job.id):
+            handler(**job.payload)
+    except Exception as e:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = 'dead'
+            job.finished_at = timezone.now()
+            logger.error(f"Job {job} gave up after {job.attempts} attempt(s): {e}")
+        else:
+            delay = RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            delay += random.uniform(0, delay * 0.1)
+            job.status = 'failed'
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+            logger.warning(f"Job {job} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {e}")
+    else:
+        job.status = 'succeeded'
+        job.last_error = ''
+        job.finished_at = timezone.now()
+
+    job.save(update_fields=['attempts', 'status', 'last_error', 'run_after', 'finished_at', 'updated_at'])
+    return job.status
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Return jobs stuck in 'running' (e.g. a killed worker) to the queue.
+    Running jobs heartbeat, so older_than must exceed JOB_HEARTBEAT_SECONDS.
+
+    The interrupted run counts as an attempt, so a job that keeps crashing
+    its worker is dead-lettered after max_attempts instead of retried forever.
+    Returns the number of jobs requeued.
+    """
+    now = timezone.now()
+    stale = BackgroundJob.objects.filter(status='running', updated_at__lt=now - older_than)
+    dead = stale.filter(attempts__gte=F('max_attempts') - 1).update(
+        status='dead', attempts=F('attempts') + 1, finished_at=now, updated_at=now,
+        last_error='Worker stopped while running the job',
+    )
+    if dead:
+        logger.error(f"Gave up on {dead} job(s) whose workers stopped on their last attempt")
+    return stale.update(status='failed', attempts=F('attempts') + 1, run_after=now, updated_at=now)
+
+
+# ============ TASKS ============
+
+@task('send_email')
+def send_email_task(subject, message, recipient_list, from_email=None):
+    # fail_silently=False so delivery errors are retried by the queue
+    try:
+        send_mail(
+            subject=subject,
+            message=message,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            recipient_list=recipient_list,
+            fail_silently=False,
+        )
+    except Exception:
+        metrics.inc('protrack_emails_failed_total')
+        raise
+    metrics.inc('protrack_emails_sent_total')
+
+
+@task('issue_certificate')
+def issue_certificate_task(certificate_id, issued_by_id=None):
+    """Render the certificate PDF, upload it and notify the learner."""
+    from .models import Certificate, Notification
+    from .views import generate_and_upload_certificate
+
+    certificate = Certificate.objects.select_related(
+        'enrollment__user', 'enrollment__course'
+    ).get(id=certificate_id)
+    if certificate.status == 'issued' and certificate.certificate_url:
+        return
+
+    if issued_by_id:
+        certificate.issued_by_id = issued_by_id
+
+    pdf_success, pdf_url = generate_and_upload_certificate(certificate)
+    if not pdf_success:
+        raise RuntimeError(f"Failed to generate certificate PDF for {certificate.certificate_number}")
+
+    certificate.status = 'issued'
+    certificate.certificate_url = pdf_url
+    certificate.save()
+
+    Notification.create_certificate_notification(certificate)
+
+
+@task('issue_certificates')
+def issue_certificates_task(certificate_ids, issued_by_id=None):
+    """Issue a batch of approved certificates (bulk approve on the certifications page)."""
+    from django.contrib.auth import get_user_model
+
+    from .certificate_issuing import issue_certificates
+    from .models import Certificate
+
+    issued_by = get_user_model().objects.filter(id=issued_by_id).first() if issued_by_id else None
+    result = issue_certificates(
+        Certificate.objects.filter(id__in=certificate_ids),
+        issued_by=issued_by,
+        processes=getattr(settings, 'CERTIFICATE_RENDER_PROCESSES', 1),
+    )
+    if result['failed']:
+        # Issued ones are no longer drafts, so a retry only picks up the failures
+        raise RuntimeError(f"{result['failed']} certificate(s) could not be issued")
@@ -0,0 +1,136 @@
+"""
+Management command to measure training catalog search latency at scale.
+Creates synthetic courses, indexes them, then times the catalog's search
+query (page of results plus total count) with the full-text backend and
+with the old icontains scan:
+    python manage.py benchmark_catalog_search
+    python manage.py benchmark_catalog_search --courses 50000 --queries 300
+
+Run it against a development database: the benchmark courses are deleted
+afterwards unless --keep is given.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from dashboard.models import TrainingCourse
+from dashboard.search import BasicCourseSearch, get_search_backend, rebuild_search_index
+
+TITLE_PREFIX = 'Benchmark course'
+PAGE_SIZE = 24
+
+WORDS = (
+    'python data analysis web development security networks cloud design project management '
+    'leadership communication safety compliance accounting finance marketing sales statistics '
+    'machine learning databases testing agile scrum architecture structural electrical mechanical '
+    'hospitality tourism teaching curriculum assessment ethics research writing presentation '
+    'excel spreadsheets automation scripting linux windows mobile android ios javascript react '
+    'django sql postgres performance optimization quality inspection surveying drafting estimation'
+).split()
+INSTRUCTORS = ['Ana Reyes', 'Ben Cruz', 'Carla Santos', 'Dan Lim', 'Eva Mendoza', 'Felix Tan']
+
+
+def sample_courses(count, rng):
+    for i in range(count):
+        title_words = rng.sample(WORDS, 3)
+        yield TrainingCourse(
+            title=f"{TITLE_PREFIX} {i}: {' '.join(title_words).title()}",
+            description=' '.join(rng.choices(WORDS, k=60)),
+            instructor=rng.choice(INSTRUCTORS),
+            duration_hours=rng.choice([4, 8, 12, 16]),
+            learning_outcomes='Benchmark',
+        )
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark training catalog search latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--courses',
+            type=int,
+            default=10000,
+            help='Synthetic courses to create (default: 10000)'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Searches timed per backend (default: 200)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for course text and queries (default: 0)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark courses afterwards'
+        )
+
+    def run_queries(self, backend, queries):
+        timings = []
+        hits = 0
+        catalog = TrainingCourse.objects.filter(status='active')
+        for query in queries:
+            started = time.perf_counter()
+            results = backend.search(catalog, query)
+            page = list(results[:PAGE_SIZE])
+            total = results.count()
+            timings.append(time.perf_counter() - started)
+            hits += bool(page) and total > 0
+        return timings, hits
+
+    def report(self, label, timings, hits, count):
+        timings_ms = sorted(t * 1000 for t in timings)
+        self.stdout.write(
+            f"  {label:<22} mean {statistics.mean(timings_ms):8.2f} ms  "
+            f"p50 {percentile(timings_ms, 50):8.2f} ms  p95 {percentile(timings_ms, 95):8.2f} ms  "
+            f"({hits}/{count} queries with results)"
+        )
+        return statistics.mean(timings_ms)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = max(1, options['courses'])
+
+        TrainingCourse.objects.filter(title__startswith=TITLE_PREFIX).delete()
+        started = time.perf_counter()
+        with transaction.atomic():
+            TrainingCourse.objects.bulk_create(sample_courses(count, rng), batch_size=1000)
+        self.stdout.write(f"Created {count} course(s) in {time.perf_counter() - started:.2f}s")
+
+        # bulk_create sends no signals, so index everything in one pass
+        started = time.perf_counter()
+        indexed = rebuild_search_index()
+        self.stdout.write(f"Indexed {indexed} course(s) in {time.perf_counter() - started:.2f}s")
+
+        queries = [
+            ' '.join(rng.sample(WORDS, rng.choice([1, 1, 2]))) if i % 4 else rng.choice(WORDS)[:4]
+            for i in range(max(1, options['queries']))
+        ]
+        full_text = get_search_backend()
+        try:
+            self.stdout.write(f"Timing {len(queries)} catalog search(es) per backend...")
+            indexed_mean = self.report(
+                type(full_text).__name__, *self.run_queries(full_text, queries), len(queries)
+            )
+            scan_mean = self.report(
+                'icontains scan', *self.run_queries(BasicCourseSearch(), queries), len(queries)
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Full-text search is {scan_mean / indexed_mean:.1f}x faster than the icontains scan"
+            ))
+        finally:
+            if not options['keep']:
+                TrainingCourse.objects.filter(title__startswith=TITLE_PREFIX).delete()
+                rebuild_search_index()
@@ -0,0 +1,69 @@
+"""
+Management command to measure certificate PDF render time.
+Renders synthetic certificates one at a time and as a batch:
+    python manage.py benchmark_certificates --count 500
+No database rows are read or written.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.certificates import render_certificate_pdf, render_certificates
+
+
+def sample_contexts(count):
+    return [
+        {
+            'user_name': f'Learner {i}',
+            'course_title': 'Workplace Safety and Compliance Fundamentals' if i % 2 else
+                            'An Unusually Long Course Title That Has To Be Split Across Two Lines',
+            'duration_hours': '12',
+            'instructor': 'Jane Instructor',
+            'issued_by': 'Training Admin',
+            'issue_date': 'January 01, 2026',
+            'certificate_number': f'CERT-BENCH-{i:06d}',
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-certificate PDF render time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=200,
+            help='Number of certificates to render (default: 200)'
+        )
+
+    def report(self, label, timings):
+        timings_ms = sorted(t * 1000 for t in timings)
+        p95 = timings_ms[min(len(timings_ms) - 1, int(len(timings_ms) * 0.95))]
+        self.stdout.write(
+            f"  {label:<22} mean {statistics.mean(timings_ms):.3f} ms  "
+            f"median {statistics.median(timings_ms):.3f} ms  p95 {p95:.3f} ms"
+        )
+        return statistics.mean(timings_ms)
+
+    def handle(self, *args, **options):
+        contexts = sample_contexts(max(1, options['count']))
+        self.stdout.write(f"Rendering {len(contexts)} certificate(s)...")
+
+        timings = []
+        for context in contexts:
+            started = time.perf_counter()
+            render_certificate_pdf(context)
+            timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        render_certificates(contexts)
+        batch_elapsed = time.perf_counter() - started
+
+        self.report('per certificate', timings)
+        self.stdout.write(self.style.SUCCESS(
+            f"  {'batch':<22} {batch_elapsed:.3f} s total, "
+            f"{len(contexts) / batch_elapsed:.0f} certificates/s"
+        ))
@@ -0,0 +1,93 @@
+"""
+Management command to issue draft certificates in bulk.
+PDFs are rendered in a process pool, uploaded concurrently and committed
+one batch per transaction:
+    python manage.py issue_certificates
+    python manage.py issue_certificates --course 3 --issued-by admin --processes 4
+"""
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.certificate_issuing import DEFAULT_BATCH_SIZE, issue_certificates
+from dashboard.models import Certificate
+from dashboard.supabase_utils import POOL_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Render, upload and issue draft certificates in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'certificate_ids',
+            nargs='*',
+            type=int,
+            help='Certificate IDs to issue (default: all drafts)'
+        )
+        parser.add_argument(
+            '--course',
+            type=int,
+            help='Only issue certificates for this course ID'
+        )
+        parser.add_argument(
+            '--issued-by',
+            help='Username recorded as the issuer'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Certificates per render/upload/commit batch (default: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=getattr(settings, 'CERTIFICATE_RENDER_PROCESSES', os.cpu_count() or 1),
+            help='PDF render processes (default: CERTIFICATE_RENDER_PROCESSES)'
+        )
+        parser.add_argument(
+            '--upload-workers',
+            type=int,
+            default=POOL_SIZE,
+            help=f'Concurrent uploads (default: {POOL_SIZE}, the Supabase connection pool size)'
+        )
+
+    def handle(self, *args, **options):
+        certificates = Certificate.objects.filter(status='draft')
+        if options['certificate_ids']:
+            certificates = certificates.filter(id__in=options['certificate_ids'])
+        if options['course']:
+            certificates = certificates.filter(enrollment__course_id=options['course'])
+
+        issued_by = None
+        if options['issued_by']:
+            issued_by = get_user_model().objects.filter(username=options['issued_by']).first()
+            if issued_by is None:
+                raise CommandError(f"User '{options['issued_by']}' does not exist")
+
+        total = certificates.count()
+        if not total:
+            self.stdout.write('No draft certificates to issue')
+            return
+
+        self.stdout.write(
+            f"Issuing {total} certificate(s) with {options['processes']} render process(es) "
+            f"and {options['upload_workers']} upload worker(s)..."
+        )
+        result = issue_certificates(
+            certificates,
+            issued_by=issued_by,
+            batch_size=max(1, options['batch_size']),
+            processes=max(1, options['processes']),
+            upload_workers=max(1, options['upload_workers']),
+        )
+
+        elapsed = result['elapsed']
+        throughput = result['issued'] / elapsed if elapsed else 0
+        style = self.style.SUCCESS if not result['failed'] else self.style.WARNING
+        self.stdout.write(style(
+            f"Issued {result['issued']} certificate(s), {result['failed']} failed, "
+            f"in {elapsed:.2f}s ({throughput:.1f} certificates/s)"
+        ))
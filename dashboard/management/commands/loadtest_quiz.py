@@ -0,0 +1,246 @@
+"""
+Management command to load-test quiz taking the way exam day hits it: a
+whole program opening and submitting the same quiz at once.
+
+Creates a throwaway course with a published quiz and enrolled learners,
+then drives concurrent GET + POST of ``take_quiz`` through Django's test
+client and reports latency percentiles, queries per request and error rate:
+    python manage.py loadtest_quiz
+    python manage.py loadtest_quiz --users 300 --concurrency 30 --questions 50
+
+Real courses and quizzes are never touched. Run it against a development
+database: the load-test course and learners (and their attempts) are
+deleted before each run and, unless --keep is given, after it.
+SQLite allows one writer at a time, so concurrent submissions there fail
+with "database is locked"; point DB_HOST at PostgreSQL for numbers that
+reflect production.
+"""
+import logging
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from dashboard.models import Choice, Enrollment, Question, Quiz, TrainingCourse, TrainingMaterial
+
+USERNAME_PREFIX = 'loadtest_'
+COURSE_TITLE = 'Load-test course (loadtest_quiz)'
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Load-test concurrent quiz taking (GET + POST of take_quiz)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=100,
+            help='Learners taking the quiz (default: 100)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=10,
+            help='Learners taking the quiz at the same time (default: 10)'
+        )
+        parser.add_argument(
+            '--questions',
+            type=int,
+            default=20,
+            help='Questions in the quiz (default: 20)'
+        )
+        parser.add_argument(
+            '--program',
+            default='BSIT',
+            help='Program the load-test learners belong to (default: BSIT)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the answers learners pick (default: 0)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the load-test course, learners and their attempts afterwards'
+        )
+
+    # ------------------------------------------------------------ setup
+
+    def prepare_quiz(self, question_count):
+        """A throwaway course with a reading and a published quiz of question_count questions."""
+        TrainingCourse.objects.filter(title=COURSE_TITLE).delete()
+        course = TrainingCourse.objects.create(
+            title=COURSE_TITLE,
+            description='Created by loadtest_quiz; deleted after the run.',
+            instructor='Load test',
+            duration_hours=1,
+            learning_outcomes='None',
+        )
+        TrainingMaterial.objects.create(
+            course=course, title='Reading', file_url='https://example.com/loadtest.pdf',
+            file_name='loadtest.pdf', is_required=True, order=0,
+        )
+        material = TrainingMaterial.objects.create(
+            course=course, title='Exam', material_type='quiz', file_url='',
+            file_name='loadtest.json', is_required=True, order=1,
+        )
+        quiz = Quiz.objects.create(material=material, title='Exam')
+        question_types = ['multiple_choice', 'multiple_choice', 'true_false', 'identification']
+        for i in range(question_count):
+            question_type = question_types[i % len(question_types)]
+            question = Question.objects.create(
+                quiz=quiz,
+                text=f'Load-test question {i + 1}',
+                question_type=question_type,
+                correct_answer={'true_false': 'True', 'identification': f'answer {i + 1}'}.get(question_type),
+                order=i,
+            )
+            if question_type == 'multiple_choice':
+                Choice.objects.bulk_create([
+                    Choice(question=question, text=f'Option {c + 1}', is_correct=c == 0) for c in range(4)
+                ])
+        quiz.target_question_count = question_count
+        quiz.is_published = True
+        quiz.save()
+        return course, quiz
+
+    def prepare_learners(self, course, count, program):
+        CustomUser.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        password = make_password(None)  # unusable; learners are logged in with force_login
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                username=f'{USERNAME_PREFIX}{i:05d}', email=f'{USERNAME_PREFIX}{i:05d}@example.com',
+                password=password, program=program,
+            )
+            for i in range(count)
+        ])
+        learners = list(CustomUser.objects.filter(username__startswith=USERNAME_PREFIX).order_by('username'))
+        for learner in learners:
+            # Saved one at a time so the enrollment signals set up progress counters
+            Enrollment.objects.create(user=learner, course=course, status='enrolled')
+        return learners
+
+    def build_answers(self, quiz, rng):
+        """Form data for one learner: each question answered correctly about 70% of the time."""
+        data = {}
+        for question in quiz.questions.prefetch_related('choices'):
+            right = rng.random() < 0.7
+            if question.question_type == 'multiple_choice':
+                choices = sorted(question.choices.all(), key=lambda c: not c.is_correct)
+                data[f'question_{question.id}'] = choices[0 if right else rng.randrange(1, len(choices))].id
+            else:
+                data[f'question_{question.id}'] = question.correct_answer if right else 'wrong'
+        return data
+
+    # ------------------------------------------------------------ load
+
+    def take_quiz(self, learner, url, answers):
+        """One learner opens and submits the quiz; returns a sample per request."""
+        client = Client(raise_request_exception=False)
+        client.force_login(learner)
+        samples = []
+        try:
+            for method, kwargs in (('GET', {}), ('POST', {'data': answers})):
+                started = time.perf_counter()
+                error = None
+                with CaptureQueriesContext(connection) as queries:
+                    try:
+                        response = getattr(client, method.lower())(url, **kwargs)
+                        if response.exc_info:
+                            error = repr(response.exc_info[1])
+                        elif response.status_code != 200:
+                            error = f'HTTP {response.status_code}'
+                    except Exception as e:
+                        error = f'{type(e).__name__}: {e}'
+                samples.append({
+                    'method': method,
+                    'elapsed': time.perf_counter() - started,
+                    'queries': len(queries.captured_queries),
+                    'error': error,
+                })
+        finally:
+            connections.close_all()  # this thread's connections
+        return samples
+
+    def report(self, label, samples):
+        timings = sorted(s['elapsed'] * 1000 for s in samples)
+        errors = sum(1 for s in samples if s['error'])
+        self.stdout.write(
+            f"  {label:<6} {len(samples):>6} req  "
+            f"p50 {percentile(timings, 50):8.1f} ms  p95 {percentile(timings, 95):8.1f} ms  "
+            f"p99 {percentile(timings, 99):8.1f} ms  "
+            f"queries/req {statistics.mean(s['queries'] for s in samples):6.1f}  "
+            f"errors {errors} ({errors / len(samples) * 100:.1f}%)"
+        )
+        return errors
+
+    def handle(self, *args, **options):
+        users = max(1, options['users'])
+        concurrency = max(1, options['concurrency'])
+        rng = random.Random(options['seed'])
+
+        course, quiz = self.prepare_quiz(max(1, options['questions']))
+        learners = self.prepare_learners(course, users, options['program'])
+        answers = [self.build_answers(quiz, rng) for _ in learners]
+        url = reverse('dashboard:take_quiz', args=[quiz.id])
+        self.stdout.write(
+            f'"{quiz.title}" ({quiz.questions.count()} questions) for {users} learner(s), '
+            f'{concurrency} at a time...'
+        )
+
+        # Lets the test client reach 'testserver' and keeps mail in memory;
+        # failed requests are summarised below instead of logged one by one
+        test_environment = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        )
+        test_environment.enable()
+        request_logger = logging.getLogger('django.request')
+        request_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='loadtest') as pool:
+                results = list(pool.map(self.take_quiz, learners, [url] * users, answers))
+            elapsed = time.perf_counter() - started
+        finally:
+            request_logger.setLevel(request_level)
+            test_environment.disable()
+
+        samples = [sample for result in results for sample in result]
+        errors = 0
+        for method in ('GET', 'POST'):
+            errors += self.report(method, [s for s in samples if s['method'] == method])
+        self.report('all', samples)
+
+        distinct_errors = {s['error'] for s in samples if s['error']}
+        for error in sorted(distinct_errors)[:5]:
+            self.stdout.write(self.style.WARNING(f'  error: {error}'))
+
+        if not options['keep']:
+            CustomUser.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            course.delete()
+
+        style = self.style.SUCCESS if not errors else self.style.WARNING
+        self.stdout.write(style(
+            f'{len(samples)} request(s) in {elapsed:.2f}s ({len(samples) / elapsed:.1f} req/s), '
+            f'error rate {errors / len(samples) * 100:.1f}%'
+        ))
@@ -2,13 +2,32 @@
 Management command to notify users about their incomplete courses.
 Run this command daily via a scheduled task/cron job:
     python manage.py notify_incomplete_courses
+    python manage.py notify_incomplete_courses --batch-size 2000
+
+Works in batches of enrollments: one query selects a batch of enrollments
+that are due a reminder (preferences and recently sent reminders are
+resolved in the database), and one bulk INSERT writes its notifications.
 """
+import time
 from datetime import timedelta
+
 from django.core.management.base import BaseCommand
-from django.utils import timezone
+from django.db.models import Exists, OuterRef, Q
 from django.urls import reverse
+from django.utils import timezone
+
 from dashboard.models import Enrollment, Notification
-from accounts.models import NotificationPreference
+from dashboard.notifications import DEFAULT_BATCH_SIZE, bulk_create_notifications
+
+# A course is not reminded about again within this many days
+REMINDER_INTERVAL_DAYS = 7
+
+
+def completion_rate(required_count, completed_required_count, progress_percentage):
+    """Enrollment.get_completion_rate() from already loaded counter values."""
+    if required_count > 0:
+        return round((completed_required_count / required_count) * 100)
+    return progress_percentage
 
 
 class Command(BaseCommand):
@@ -26,97 +45,91 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be notified without actually creating notifications'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Enrollments selected and notifications inserted per batch (default: {DEFAULT_BATCH_SIZE})'
+        )
 
     def handle(self, *args, **options):
         days_threshold = options['days']
         dry_run = options['dry_run']
-        
+        batch_size = max(1, options['batch_size'])
+        started = time.monotonic()
+
         self.stdout.write(f"Looking for incomplete courses inactive for {days_threshold}+ days...")
-        
-        cutoff_date = timezone.now() - timedelta(days=days_threshold)
-        
-        # Find enrollments that are in progress but haven't been updated recently
-        incomplete_enrollments = Enrollment.objects.filter(
-            status__in=['enrolled', 'in_progress'],
-            progress_percentage__lt=100,
-            progress_percentage__gt=0,  # They started but didn't finish
-        ).select_related('user', 'course')
-        
-        # Also check for enrollments where user hasn't made progress
-        stale_enrollments = Enrollment.objects.filter(
-            status__in=['enrolled', 'in_progress'],
-            enrolled_date__lt=cutoff_date,
-        ).select_related('user', 'course')
-        
-        # Combine both querysets
-        all_incomplete = incomplete_enrollments | stale_enrollments
-        all_incomplete = all_incomplete.distinct()
-        
+
+        now = timezone.now()
+        cutoff_date = now - timedelta(days=days_threshold)
+
+        # Enrollments that were started but not finished, or that have been open a while
+        incomplete = Enrollment.objects.filter(status__in=['enrolled', 'in_progress']).filter(
+            Q(progress_percentage__gt=0, progress_percentage__lt=100) | Q(enrolled_date__lt=cutoff_date)
+        )
+        recent_reminder = Notification.objects.filter(
+            related_enrollment=OuterRef('pk'),
+            notification_type='reminder',
+            created_at__gte=now - timedelta(days=REMINDER_INTERVAL_DAYS),
+        )
+        # Users without a NotificationPreference row get the defaults (reminders on)
+        due = (
+            incomplete
+            .exclude(user__notification_preferences__notify_on_reminder=False)
+            .exclude(Exists(recent_reminder))
+            .order_by('id')
+            .values_list(
+                'id', 'user_id', 'user__username', 'course_id', 'course__title',
+                'required_count', 'completed_required_count', 'progress_percentage',
+            )
+        )
+        candidates = incomplete.count()
+
         notified_count = 0
-        skipped_count = 0
-        
-        for enrollment in all_incomplete:
-            user = enrollment.user
-            course = enrollment.course
-            
-            # Check if user has reminder notifications enabled
-            try:
-                prefs = NotificationPreference.objects.get(user=user)
-                if not prefs.notify_on_reminder:
-                    skipped_count += 1
+        batch_number = 0
+        last_id = 0
+        while True:
+            batch_started = time.monotonic()
+            # Keyset pagination: each batch is a fresh query, so no cursor stays open across inserts
+            rows = list(due.filter(id__gt=last_id)[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            batch_number += 1
+
+            notifications = []
+            for (enrollment_id, user_id, username, course_id, course_title,
+                 required, completed_required, progress_percentage) in rows:
+                progress = completion_rate(required, completed_required, progress_percentage)
+                title = f"Continue Your Training: {course_title}"
+                if dry_run:
+                    self.stdout.write(f"[DRY-RUN] Would notify {username}: {title} ({progress}%)")
                     continue
-            except NotificationPreference.DoesNotExist:
-                pass  # Default to sending notifications
-            
-            # Check if we already sent a reminder recently (within 7 days)
-            recent_reminder = Notification.objects.filter(
-                user=user,
-                notification_type='reminder',
-                related_enrollment=enrollment,
-                created_at__gte=timezone.now() - timedelta(days=7)
-            ).exists()
-            
-            if recent_reminder:
-                skipped_count += 1
-                continue
-            
-            # Calculate progress
-            total_materials = course.materials.filter(is_required=True).count()
-            completed_materials = enrollment.completed_materials.filter(is_required=True).count()
-            
-            if total_materials > 0:
-                progress = round((completed_materials / total_materials) * 100)
-            else:
-                progress = enrollment.progress_percentage
-            
-            # Create the notification
-            title = f"Continue Your Training: {course.title}"
-            message = f"You've made {progress}% progress in \"{course.title}\". Keep going to complete your training!"
-            link = reverse('dashboard:course_detail', args=[course.id])
-            
-            if dry_run:
-                self.stdout.write(
-                    f"[DRY-RUN] Would notify {user.username}: {title} ({progress}%)"
-                )
-            else:
-                Notification.objects.create(
-                    user=user,
+                notifications.append(Notification(
+                    user_id=user_id,
                     notification_type='reminder',
                     title=title,
-                    message=message,
-                    link=link,
-                    related_enrollment=enrollment
-                )
-                self.stdout.write(
-                    self.style.SUCCESS(f"Notified {user.username}: {course.title} ({progress}%)")
-                )
-            
-            notified_count += 1
-        
+                    message=f"You've made {progress}% progress in \"{course_title}\". Keep going to complete your training!",
+                    link=reverse('dashboard:course_detail', args=[course_id]),
+                    related_enrollment_id=enrollment_id,
+                ))
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f"Notified {username}: {course_title} ({progress}%)")
+
+            if notifications:
+                bulk_create_notifications(notifications, batch_size=batch_size)
+
+            notified_count += len(rows)
+            self.stdout.write(
+                f"Batch {batch_number}: {len(rows)} enrollment(s) in {time.monotonic() - batch_started:.2f}s"
+            )
+
+        elapsed = time.monotonic() - started
         self.stdout.write("")
         self.stdout.write("=" * 50)
         if dry_run:
             self.stdout.write(f"DRY RUN COMPLETE: Would notify {notified_count} users")
         else:
             self.stdout.write(self.style.SUCCESS(f"Notified {notified_count} users about incomplete courses"))
-        self.stdout.write(f"Skipped {skipped_count} (already notified or preferences disabled)")
+        self.stdout.write(f"Skipped {candidates - notified_count} (already notified or preferences disabled)")
+        self.stdout.write(f"Finished in {elapsed:.2f}s ({batch_number} batch(es) of up to {batch_size})")
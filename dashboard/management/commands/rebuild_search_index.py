@@ -0,0 +1,24 @@
+"""
+Management command to rebuild the training catalog search index
+(dashboard.search) from every course. Saves keep the index current; run it
+after bulk imports or direct SQL updates, which send no signals:
+    python manage.py rebuild_search_index
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of the training catalog'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        started = time.perf_counter()
+        indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} course(s) with {type(backend).__name__} "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,57 @@
+"""
+Management command to repair drift in the materialized Enrollment progress counters.
+Counters are normally maintained by signals (dashboard.signals); run this after
+bulk imports, raw SQL edits or queryset.update() calls that bypass them:
+    python manage.py recompute_progress
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from dashboard.models import Enrollment
+from dashboard.progress import refresh_progress_counters, with_progress
+
+
+class Command(BaseCommand):
+    help = 'Recompute required/completed material counters on enrollments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            help='Only recompute enrollments for this course ID'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report enrollments whose counters have drifted without fixing them'
+        )
+
+    def handle(self, *args, **options):
+        enrollments = Enrollment.objects.all()
+        if options['course']:
+            enrollments = enrollments.filter(course_id=options['course'])
+
+        drifted = with_progress(enrollments).exclude(
+            Q(required_count=F('available_materials')) &
+            Q(completed_required_count=F('completed_available'))
+        ).select_related('user', 'course')
+
+        drifted_count = 0
+        for enrollment in drifted:
+            drifted_count += 1
+            self.stdout.write(
+                f"  {enrollment.user.username} - {enrollment.course.title}: "
+                f"{enrollment.completed_required_count}/{enrollment.required_count} "
+                f"-> {enrollment.completed_available}/{enrollment.available_materials}"
+            )
+
+        if options['dry_run']:
+            self.stdout.write(f"DRY RUN COMPLETE: {drifted_count} enrollment(s) have drifted")
+            return
+
+        with transaction.atomic():
+            updated = refresh_progress_counters(enrollments)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed progress for {updated} enrollment(s) ({drifted_count} had drifted)"
+        ))
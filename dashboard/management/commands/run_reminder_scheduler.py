@@ -0,0 +1,95 @@
+"""
+Management command that sends calendar reminders as they fall due
+(dashboard.reminders). Run it as a long-lived process next to run_worker:
+    python manage.py run_reminder_scheduler
+    python manage.py run_reminder_scheduler --batch-size 500 --max-sleep 10
+
+It sleeps until the earliest pending reminder is due (at most --max-sleep
+seconds, so reminders created meanwhile are picked up), then claims and
+dispatches due reminders in batches. Several schedulers can run at once.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from dashboard.reminders import next_reminder_at, process_due_reminders, release_stale_claims
+
+
+class Command(BaseCommand):
+    help = 'Send calendar reminders as they fall due'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'REMINDER_BATCH_SIZE', 100),
+            help='Reminders claimed per batch (default: REMINDER_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--max-sleep',
+            type=float,
+            default=getattr(settings, 'REMINDER_MAX_SLEEP', 30),
+            help='Longest sleep between checks, in seconds (default: REMINDER_MAX_SLEEP)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send the reminders that are currently due, then exit'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=300,
+            help='Release reminders left claimed for more than N seconds (default: 300)'
+        )
+
+    def send_due(self, batch_size, totals):
+        """Dispatch batches until no due reminder is left unclaimed."""
+        while True:
+            results = process_due_reminders(batch_size)
+            for _, result in results:
+                totals[result] += 1
+            if results:
+                self.stdout.write(
+                    f"Processed {len(results)} reminder(s): {totals['sent']} sent, "
+                    f"{totals['skipped']} skipped (event passed), {totals['failed']} failed"
+                )
+            if len(results) < batch_size:
+                return
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        max_sleep = max(0.1, options['max_sleep'])
+        stale_after = timedelta(seconds=options['stale_after'])
+
+        self.stdout.write(f"Reminder scheduler started with batch size {batch_size}")
+
+        totals = {'sent': 0, 'skipped': 0, 'failed': 0}
+        try:
+            while True:
+                close_old_connections()
+                released = release_stale_claims(stale_after)
+                if released:
+                    self.stdout.write(self.style.WARNING(f"Released {released} stale reminder claim(s)"))
+
+                self.send_due(batch_size, totals)
+                if options['once']:
+                    break
+
+                next_at = next_reminder_at()
+                delay = max_sleep
+                if next_at is not None:
+                    delay = min(max_sleep, (next_at - timezone.now()).total_seconds())
+                if delay > 0:
+                    time.sleep(delay)
+        except KeyboardInterrupt:
+            self.stdout.write("Shutting down reminder scheduler...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reminder scheduler finished: {totals['sent']} sent, "
+            f"{totals['skipped']} skipped, {totals['failed']} failed"
+        ))
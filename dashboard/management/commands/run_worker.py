@@ -0,0 +1,92 @@
+"""
+Management command that processes queued background jobs (dashboard.jobs).
+Run it alongside the web process, e.g. as a separate Render worker:
+    python manage.py run_worker --concurrency 4
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from dashboard.jobs import claim_jobs, requeue_stale_jobs, run_job
+
+
+def _run_in_thread(job):
+    """Run one job on a pool thread, releasing the thread's DB connection afterwards."""
+    try:
+        return run_job(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (emails, certificate PDFs) from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=getattr(settings, 'JOB_WORKER_CONCURRENCY', 4),
+            help='Number of jobs to run in parallel (default: JOB_WORKER_CONCURRENCY)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the queue is empty (default: 2)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs that are currently due, then exit'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=600,
+            help='Requeue running jobs whose heartbeat is older than N seconds (default: 600)'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        stale_after = timedelta(seconds=options['stale_after'])
+
+        self.stdout.write(f"Job worker started with concurrency={concurrency}")
+
+        totals = {'succeeded': 0, 'failed': 0, 'dead': 0}
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job') as pool:
+            try:
+                while True:
+                    close_old_connections()
+                    requeued = requeue_stale_jobs(stale_after)
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale job(s)"))
+
+                    jobs = claim_jobs(concurrency * 2)
+                    if not jobs:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    if concurrency == 1:
+                        statuses = [run_job(job) for job in jobs]
+                    else:
+                        statuses = pool.map(_run_in_thread, jobs)
+                    for status in statuses:
+                        totals[status] = totals.get(status, 0) + 1
+
+                    self.stdout.write(
+                        f"Processed {len(jobs)} job(s): "
+                        f"{totals['succeeded']} succeeded, {totals['failed']} retrying, {totals['dead']} dead"
+                    )
+            except KeyboardInterrupt:
+                self.stdout.write("Shutting down worker...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker finished: {totals['succeeded']} succeeded, {totals['failed']} retrying, {totals['dead']} dead"
+        ))
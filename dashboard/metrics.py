@@ -0,0 +1,253 @@
+"""Prometheus-style application metrics for ProTrack.
+
+Code paths record into an in-process registry with ``inc`` (counters) and
+``observe`` (histograms); both are a dict update under a lock. ``collect``
+and ``render`` produce the text exposition format served at ``/metrics``.
+
+With several gunicorn workers, set ``METRICS_DIR`` to a directory shared by
+them: each process writes its registry to ``<pid>.json`` there at most every
+``METRICS_FLUSH_SECONDS`` (and on exit), and ``collect`` sums every file, so
+a scrape sees the whole server whichever worker answers it. Without
+``METRICS_DIR`` only the answering process is reported. Files left by
+processes that have exited are deleted by ``collect``, so the directory must
+only be shared by processes on one host; the exited process's counts drop
+out, which Prometheus treats as a counter reset.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+LAG_BUCKETS = (1, 5, 15, 30, 60, 300, 900, 3600)  # seconds
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'protrack_http_requests_total': (
+        'counter', 'HTTP requests by URL name and status class.', None),
+    'protrack_http_request_duration_seconds': (
+        'histogram', 'HTTP request wall time by URL name.', LATENCY_BUCKETS),
+    'protrack_http_request_queries': (
+        'histogram', 'Database queries per HTTP request by URL name.', QUERY_BUCKETS),
+    'protrack_http_request_db_seconds': (
+        'histogram', 'Database time per HTTP request by URL name.', LATENCY_BUCKETS),
+    'protrack_notifications_created_total': (
+        'counter', 'Notifications created by type.', None),
+    'protrack_emails_sent_total': (
+        'counter', 'Emails handed to the mail backend.', None),
+    'protrack_emails_failed_total': (
+        'counter', 'Emails the mail backend failed to send.', None),
+    'protrack_supabase_uploads_total': (
+        'counter', 'Supabase Storage uploads by bucket and result.', None),
+    'protrack_supabase_upload_bytes_total': (
+        'counter', 'Bytes uploaded to Supabase Storage by bucket.', None),
+    'protrack_supabase_upload_duration_seconds': (
+        'histogram', 'Supabase Storage upload latency by bucket.', LATENCY_BUCKETS),
+    'protrack_certificate_render_seconds': (
+        'histogram', 'Certificate PDF render time.', LATENCY_BUCKETS),
+    'protrack_calendar_reminders_total': (
+        'counter', 'Calendar reminders dispatched by result.', None),
+    'protrack_calendar_reminder_lag_seconds': (
+        'histogram', 'Delay between a calendar reminder falling due and its dispatch.', LAG_BUCKETS),
+    'protrack_job_queue_depth': (
+        'gauge', 'Background jobs by status.', None),
+}
+
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum, count]
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # one writer of this process's file at a time
+_last_flush = time.monotonic()
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """Add amount to a counter."""
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    _flush_if_due()
+
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram."""
+    buckets = METRICS[name][2]
+    key = (name, _labels(labels))
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(buckets) + 3)
+        series[bisect_left(buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+    _flush_if_due()
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the elapsed time of the block in a histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# ============ MULTIPROCESS ============
+
+def _setting(name, default):
+    # supabase_utils is also used by standalone scripts without Django settings
+    return getattr(settings, name, default) if settings.configured else default
+
+
+def _metrics_dir():
+    directory = _setting('METRICS_DIR', '')
+    return Path(directory) if directory else None
+
+
+def _snapshot():
+    with _lock:
+        return {
+            'counters': [[name, labels, value] for (name, labels), value in _counters.items()],
+            'histograms': [[name, labels, list(series)] for (name, labels), series in _histograms.items()],
+        }
+
+
+def flush():
+    """Write this process's registry to METRICS_DIR (if configured)."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    directory = _metrics_dir()
+    if directory is None:
+        return
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{os.getpid()}.json'
+        tmp_path = path.with_suffix('.tmp')
+        # Every thread of the process shares the .tmp path, so writes are serialized
+        with _flush_lock:
+            tmp_path.write_text(json.dumps(_snapshot()))
+            os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write metrics to {directory}: {e}")
+
+
+def _flush_if_due():
+    if time.monotonic() - _last_flush >= _setting('METRICS_FLUSH_SECONDS', 5):
+        flush()
+
+
+atexit.register(flush)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+def _prune_dead(directory):
+    """Delete the files of processes that are no longer running."""
+    for path in [*directory.glob('*.json'), *directory.glob('*.tmp')]:
+        if path.stem.isdigit() and not _pid_alive(int(path.stem)):
+            path.unlink(missing_ok=True)
+
+
+def collect():
+    """Counters and histograms summed over every live process (see METRICS_DIR)."""
+    directory = _metrics_dir()
+    if directory is None:
+        sources = [_snapshot()]
+    else:
+        flush()
+        _prune_dead(directory)
+        sources = []
+        for path in directory.glob('*.json'):
+            try:
+                sources.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # removed or replaced while reading
+
+    counters, histograms = {}, {}
+    for source in sources:
+        for name, labels, value in source['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, series in source['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], series)]
+            else:
+                histograms[key] = series
+    return counters, histograms
+
+
+# ============ EXPOSITION ============
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(gauges=None):
+    """
+    Render every metric in the Prometheus text format.
+
+    gauges: {(name, labels): value} computed at scrape time (e.g. queue depth)
+    """
+    counters, histograms = collect()
+    series = {}
+    for (name, labels), value in sorted({**counters, **(gauges or {})}.items()):
+        series.setdefault(name, []).append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    for (name, labels), values in sorted(histograms.items()):
+        lines = series.setdefault(name, [])
+        buckets = METRICS[name][2]
+        cumulative = 0
+        for bound, count in zip((*buckets, '+Inf'), values[:-2]):
+            cumulative += count
+            le = bound if bound == '+Inf' else _format_value(bound)
+            lines.append(f'{name}_bucket{_format_labels((*labels, ("le", le)))} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(values[-2])}')
+        lines.append(f'{name}_count{_format_labels(labels)} {_format_value(values[-1])}')
+
+    output = []
+    for name, (metric_type, help_text, _) in METRICS.items():
+        if name in series:
+            output.append(f'# HELP {name} {help_text}')
+            output.append(f'# TYPE {name} {metric_type}')
+            output.extend(series[name])
+    return '\n'.join(output) + '\n'
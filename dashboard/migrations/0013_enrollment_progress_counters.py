@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:08
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_progress_counters(apps, schema_editor):
+    Enrollment = apps.get_model('dashboard', 'Enrollment')
+    TrainingMaterial = apps.get_model('dashboard', 'TrainingMaterial')
+    available = TrainingMaterial.objects.filter(
+        Q(is_required=True) & (~Q(material_type='quiz') | Q(quiz__is_published=True))
+    )
+
+    def count(queryset, group_by):
+        counted = queryset.order_by().values(group_by).annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+    Enrollment.objects.update(
+        required_count=count(available.filter(course=OuterRef('course_id')), 'course'),
+        completed_required_count=count(
+            Enrollment.completed_materials.through.objects.filter(
+                enrollment_id=OuterRef('pk'),
+                trainingmaterial__in=available,
+            ),
+            'enrollment',
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_calendarevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_required_count',
+            field=models.PositiveIntegerField(default=0, help_text='Available required materials completed'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='required_count',
+            field=models.PositiveIntegerField(default=0, help_text='Required materials available to complete (unpublished quizzes excluded)'),
+        ),
+        migrations.RunPython(backfill_progress_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:07
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_remind_at(apps, schema_editor):
+    # Same rule as CalendarEvent.get_reminder_datetime (historical models have no custom methods)
+    CalendarEvent = apps.get_model('dashboard', 'CalendarEvent')
+    events = CalendarEvent.objects.filter(reminder_sent=False).only('event_date', 'event_time', 'reminder_minutes')
+    batch = []
+    for event in events.iterator(chunk_size=1000):
+        event_datetime = datetime.combine(event.event_date, event.event_time)
+        event.remind_at = timezone.make_aware(event_datetime - timedelta(minutes=event.reminder_minutes))
+        batch.append(event)
+        if len(batch) >= 1000:
+            CalendarEvent.objects.bulk_update(batch, ['remind_at'])
+            batch = []
+    CalendarEvent.objects.bulk_update(batch, ['remind_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0016_report_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='calendarevent',
+            name='event_pending_reminder_idx',
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='remind_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the reminder is due (event time minus reminder_minutes), set on save', null=True),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='reminder_claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set while a reminder scheduler is dispatching the reminder', null=True),
+        ),
+        migrations.RunPython(backfill_remind_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(condition=models.Q(('reminder_sent', False)), fields=['remind_at'], name='event_pending_remind_at_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:20
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+COURSE_TABLE = 'dashboard_trainingcourse'
+DOCUMENT_TABLE = 'dashboard_coursesearchdocument'
+FTS_TABLE = 'dashboard_trainingcourse_fts'
+
+
+def create_search_index(apps, schema_editor):
+    # Same documents as dashboard.search builds on save
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX course_search_document_idx ON {DOCUMENT_TABLE} USING gin (vector)'
+        )
+        schema_editor.execute(
+            f"INSERT INTO {DOCUMENT_TABLE} (course_id, vector) SELECT id, "
+            f"setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('english', coalesce(instructor, '')), 'B') || "
+            f"setweight(to_tsvector('english', coalesce(description, '')), 'C') "
+            f"FROM {COURSE_TABLE}"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"title, description, instructor, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, instructor) '
+            f'SELECT id, title, description, instructor FROM {COURSE_TABLE}'
+        )
+        # The rank column scores with bm25, weighting title 10, description 1, instructor 5
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')")
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        # The document table itself is dropped by reversing CreateModel
+        schema_editor.execute('DROP INDEX IF EXISTS course_search_document_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0019_calendarfeed'),
+    ]
+
+    operations = [
+        # PostgreSQL only: SQLite searches its FTS5 table and leaves this one empty
+        migrations.CreateModel(
+            name='CourseSearchDocument',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='dashboard.trainingcourse')),
+                ('vector', django.contrib.postgres.search.SearchVectorField()),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.CreateModel(
+            name='CourseSearchEntry',
+            fields=[
+                ('course', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='dashboard.trainingcourse')),
+                ('document', models.TextField(db_column='dashboard_trainingcourse_fts')),
+                ('rank', models.FloatField(db_column='rank')),
+            ],
+            options={
+                'db_table': 'dashboard_trainingcourse_fts',
+                'managed': False,
+            },
+        ),
+    ]
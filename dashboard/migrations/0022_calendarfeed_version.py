@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0021_quiz_answer_key_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarfeed',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
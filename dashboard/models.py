@@ -1,8 +1,11 @@
+import secrets
+
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.urls import reverse
-from django.core.mail import send_mail
 
 
 class TrainingCategory(models.Model):
@@ -105,6 +108,41 @@ class TrainingCourse(models.Model):
         enrollment = self.get_user_enrollment(user)
         return enrollment and enrollment.status in ['enrolled', 'in_progress']
 
+class CourseSearchDocument(models.Model):
+    """
+    Weighted tsvector of a course for PostgreSQL catalog search (see
+    dashboard.search), kept out of TrainingCourse so course queries never
+    load it. Its GIN index is created by migration 0020. On SQLite the table
+    stays empty; the FTS5 table (CourseSearchEntry) is used instead.
+    """
+    course = models.OneToOneField(
+        TrainingCourse, on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+    vector = SearchVectorField()
+
+    def __str__(self):
+        return f"Search document for {self.course_id}"
+
+
+class CourseSearchEntry(models.Model):
+    """
+    Row of the SQLite FTS5 catalog index, for joining it in queries (see
+    dashboard.search). The virtual table is created by migration 0020 and
+    written with raw SQL; ``document`` is FTS5's hidden table-name column
+    (the MATCH target) and ``rank`` its configured bm25 score.
+    """
+    course = models.OneToOneField(
+        TrainingCourse, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', db_constraint=False, related_name='search_entry'
+    )
+    document = models.TextField(db_column='dashboard_trainingcourse_fts')
+    rank = models.FloatField(db_column='rank')
+
+    class Meta:
+        managed = False
+        db_table = 'dashboard_trainingcourse_fts'
+
+
 class TrainingSession(models.Model):
     """Scheduled sessions for training courses"""
     course = models.ForeignKey(TrainingCourse, on_delete=models.CASCADE, related_name='sessions')
@@ -117,9 +155,14 @@ class TrainingSession(models.Model):
     is_online = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['start_date', 'start_time']
+        indexes = [
+            # Calendar windows: sessions ending on/after the window start, then starting before its end
+            models.Index(fields=['end_date', 'start_date'], name='session_date_range_idx'),
+        ]
     
     def __str__(self):
         return f"{self.course.title} - {self.session_name} ({self.start_date})"
@@ -149,10 +192,19 @@ class Enrollment(models.Model):
     assigned_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_enrollments')
     notes = models.TextField(blank=True, help_text='Internal notes about this enrollment')
     completed_materials = models.ManyToManyField('TrainingMaterial', blank=True, related_name='completed_by_enrollments')
+    # Materialized progress, maintained by dashboard.signals (see dashboard.progress)
+    required_count = models.PositiveIntegerField(default=0, help_text='Required materials available to complete (unpublished quizzes excluded)')
+    completed_required_count = models.PositiveIntegerField(default=0, help_text='Available required materials completed')
+    # Lets build_report_snapshots pick up only enrollments changed since its last run
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         unique_together = ('user', 'course')
         ordering = ['-enrolled_date']
+        indexes = [
+            models.Index(fields=['user', 'status'], name='enrollment_user_status_idx'),
+            models.Index(fields=['course', 'status'], name='enrollment_course_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.course.title} ({self.status})"
@@ -167,6 +219,30 @@ class Enrollment(models.Model):
             self.score = score
         self.save()
     
+    def get_completion_rate(self):
+        """Completion percentage from the materialized progress counters"""
+        if self.required_count > 0:
+            return round((self.completed_required_count / self.required_count) * 100)
+        # Fall back to progress_percentage if no available required materials
+        return self.progress_percentage
+
+    def refresh_progress_counters(self):
+        """Reload the progress counters maintained by the database"""
+        self.refresh_from_db(fields=['required_count', 'completed_required_count'])
+
+    def material_progress(self):
+        """
+        Progress to store after a material is completed: the completion rate
+        over available required materials or, for courses without any, the
+        share of all materials completed. None if the course has no materials.
+        """
+        if self.required_count > 0:
+            return self.get_completion_rate()
+        total = self.course.materials.count()
+        if total == 0:
+            return None
+        return round((self.completed_materials.count() / total) * 100)
+    
     def cancel(self):
         """Cancel enrollment"""
         self.status = 'cancelled'
@@ -226,6 +302,9 @@ class Certificate(models.Model):
     
     class Meta:
         ordering = ['-issue_date']
+        indexes = [
+            models.Index(fields=['status', '-issue_date'], name='certificate_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"Certificate {self.certificate_number} - {self.enrollment.user.username}"
@@ -240,9 +319,22 @@ class Quiz(models.Model):
     pass_mark = models.PositiveIntegerField(default=50, validators=[MaxValueValidator(100)])
     target_question_count = models.PositiveIntegerField(default=10, help_text='Number of questions to add')
     is_published = models.BooleanField(default=False, help_text='Whether the quiz is ready for users to take')
+    # Bumped whenever the quiz or its questions or choices change; cached answer keys are stored under it
+    answer_key_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding:
+            # Incremented in SQL so a stale instance never writes back an older version
+            self.answer_key_version = models.F('answer_key_version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'answer_key_version'}
+        super().save(*args, **kwargs)
+        if not adding:
+            self.refresh_from_db(fields=['answer_key_version'])
     
     def is_ready(self):
         """Check if quiz has enough questions and is published."""
@@ -354,17 +446,35 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Notification feed: a user's latest notifications
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+            # Unread counts per type; only unread rows are indexed
+            models.Index(
+                fields=['user', 'notification_type'],
+                condition=Q(is_read=False),
+                name='notif_user_unread_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
     
     def mark_as_read(self):
+        was_unread = not self.is_read
         self.is_read = True
         self.save()
+        if was_unread:
+            from .notifications import adjust_unread_count
+            adjust_unread_count(self.user_id, self.notification_type, -1)
         
     def mark_as_unread(self):
+        was_read = self.is_read
         self.is_read = False
-        self.save() 
+        self.save()
+        if was_read:
+            from .notifications import adjust_unread_count
+            adjust_unread_count(self.user_id, self.notification_type, 1)
 
     def is_unread(self):
         return not self.is_read
@@ -512,17 +622,14 @@ class Notification(models.Model):
         # Send email if enabled
         if send_email:
             try:
-                from django.core.mail import send_mail
-                from django.conf import settings
+                from .jobs import enqueue_email
                 
-                send_mail(
+                enqueue_email(
                     subject=f'ProTrack: {title}',
                     message=f'{message}\n\nView details: {settings.SITE_URL}{link}',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[user.email],
-                    fail_silently=True,
                 )
-                print(f"✅ Email SENT to {user.email}")
+                print(f"✅ Email QUEUED for {user.email}")
             except Exception as e:
                 print(f"❌ Email FAILED: {e}")
         else:
@@ -563,15 +670,15 @@ class Notification(models.Model):
         # Send email if enabled
         if prefs.email_on_completion:
             try:
-                send_mail(
+                from .jobs import enqueue_email
+                
+                enqueue_email(
                     subject=f'ProTrack: {title}',
                     message=f'{message}\n\nView your training: {settings.SITE_URL}{link}',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[user.email],
-                    fail_silently=True,
                 )
             except Exception as e:
-                print(f"Failed to send email: {e}")
+                print(f"Failed to queue email: {e}")
         
         return notification
     
@@ -608,8 +715,7 @@ class Notification(models.Model):
         # Send email if enabled
         if prefs.email_on_certificate:
             try:
-                from django.core.mail import send_mail
-                from django.conf import settings
+                from .jobs import enqueue_email
                 
                 email_message = f"""
     Congratulations {user.get_full_name() or user.username}!
@@ -631,16 +737,14 @@ class Notification(models.Model):
     The ProTrack Team
     """
                 
-                send_mail(
+                enqueue_email(
                     subject=f'ProTrack: {title}',
                     message=email_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[user.email],
-                    fail_silently=True,
                 )
-                print(f"✅ Certificate email sent to {user.email}")
+                print(f"✅ Certificate email queued for {user.email}")
             except Exception as e:
-                print(f"❌ Failed to send certificate email: {e}")
+                print(f"❌ Failed to queue certificate email: {e}")
         
         return notification
 
@@ -679,16 +783,47 @@ class CalendarEvent(models.Model):
         help_text='When to send reminder notification'
     )
     reminder_sent = models.BooleanField(default=False)
+    remind_at = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text='When the reminder is due (event time minus reminder_minutes), set on save'
+    )
+    reminder_claimed_at = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text='Set while a reminder scheduler is dispatching the reminder'
+    )
     color = models.CharField(max_length=7, default='#667eea', help_text='Event color in hex format')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['event_date', 'event_time']
+        indexes = [
+            models.Index(fields=['user', 'event_date'], name='event_user_date_idx'),
+            # Reminder scheduling only reads the earliest pending remind_at values
+            models.Index(
+                fields=['remind_at'],
+                condition=Q(reminder_sent=False),
+                name='event_pending_remind_at_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title} ({self.event_date})"
     
+    def save(self, *args, **kwargs):
+        remind_at = self.get_reminder_datetime()
+        if remind_at != self.remind_at:
+            if self.remind_at is not None:
+                # Rescheduled: the new time gets a reminder of its own
+                self.reminder_sent = False
+                self.reminder_claimed_at = None
+            self.remind_at = remind_at
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {
+                    *kwargs['update_fields'], 'remind_at', 'reminder_sent', 'reminder_claimed_at'
+                }
+        super().save(*args, **kwargs)
+    
     def get_reminder_datetime(self):
         """Get the datetime when reminder should be sent."""
         from django.utils import timezone
@@ -704,8 +839,8 @@ class CalendarEvent(models.Model):
             return False
         
         from accounts.models import NotificationPreference
-        from django.core.mail import send_mail
         from django.conf import settings as django_settings
+        from .jobs import enqueue_email
         
         # Get user's notification preferences
         prefs, _ = NotificationPreference.objects.get_or_create(user=self.user)
@@ -745,17 +880,162 @@ View your calendar: {django_settings.SITE_URL}/dashboard/calendar/
 Best regards,
 The ProTrack Team
 """
-                send_mail(
+                enqueue_email(
                     subject=f'ProTrack: {title}',
                     message=email_message,
-                    from_email=django_settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[self.user.email],
-                    fail_silently=True,
                 )
-                print(f'✅ Email reminder sent to {self.user.email}: {self.title}')
+                print(f'✅ Email reminder queued for {self.user.email}: {self.title}')
             except Exception as e:
-                print(f'❌ Failed to send reminder email: {e}')
+                print(f'❌ Failed to queue reminder email: {e}')
         
         self.reminder_sent = True
-        self.save()
-        return True
\ No newline at end of file
+        self.reminder_claimed_at = None
+        self.save(update_fields=['reminder_sent', 'reminder_claimed_at', 'updated_at'])
+        return True
+
+def new_calendar_feed_token():
+    return secrets.token_urlsafe(32)
+
+
+class CalendarFeed(models.Model):
+    """Secret token for a user's iCalendar subscription feed (see dashboard.calendar_feed)"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed'
+    )
+    token = models.CharField(max_length=64, unique=True, default=new_calendar_feed_token)
+    # Incremented whenever anything shown in the feed changes; the ETag and cached ICS are keyed on it
+    version = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Calendar feed for {self.user.username}"
+
+    def regenerate(self):
+        """Replace the token, so previously shared feed URLs stop working."""
+        self.token = new_calendar_feed_token()
+        self.save(update_fields=['token'])
+
+
+class BackgroundJob(models.Model):
+    """Queued side effect (email, certificate PDF) processed by `manage.py run_worker`"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),  # will be retried
+        ('dead', 'Dead'),  # gave up after max_attempts
+    )
+
+    task = models.CharField(max_length=100, help_text='Registered task name (see dashboard.jobs)')
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(help_text='Earliest time the job may run')
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+
+# ============ REPORT SNAPSHOTS ============
+# Daily rollups written by `python manage.py build_report_snapshots` (see
+# dashboard.snapshots) so the reports page and trends read precomputed rows.
+
+class SnapshotRun(models.Model):
+    """One execution of build_report_snapshots; the last finished run is the watermark."""
+    snapshot_date = models.DateField()
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    full = models.BooleanField(default=False, help_text='Rebuilt from all rows rather than changes')
+    enrollments_processed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Snapshot {self.snapshot_date} ({'full' if self.full else 'incremental'})"
+
+
+class CourseSnapshot(models.Model):
+    snapshot_date = models.DateField()
+    course = models.ForeignKey(TrainingCourse, on_delete=models.CASCADE, related_name='snapshots')
+    enrollments = models.PositiveIntegerField(default=0)
+    active = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    scored = models.PositiveIntegerField(default=0, help_text='Enrollments with a score')
+    score_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-snapshot_date', '-enrollments']
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot_date', 'course'], name='unique_course_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"{self.course} @ {self.snapshot_date}"
+
+    @property
+    def avg_score(self):
+        return self.score_total / self.scored if self.scored else None
+
+
+class CategorySnapshot(models.Model):
+    snapshot_date = models.DateField()
+    category = models.ForeignKey(TrainingCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='snapshots')
+    courses = models.PositiveIntegerField(default=0)
+    enrollments = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-snapshot_date', '-enrollments']
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot_date', 'category'], name='unique_category_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"{self.category or 'Uncategorized'} @ {self.snapshot_date}"
+
+
+class ProgramSnapshot(models.Model):
+    snapshot_date = models.DateField()
+    program = models.CharField(max_length=20, blank=True)
+    users = models.PositiveIntegerField(default=0)
+    enrollments = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-snapshot_date', '-enrollments']
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot_date', 'program'], name='unique_program_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"{self.program or 'No program'} @ {self.snapshot_date}"
+
+
+class MonthlySnapshot(models.Model):
+    month = models.DateField(unique=True, help_text='First day of the month')
+    enrollments = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    certificates_issued = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month']
+
+    def __str__(self):
+        return self.month.strftime('%Y-%m')
+
@@ -0,0 +1,240 @@
+"""Bulk notification fan-out for ProTrack.
+
+Creating one Notification per recipient with ``Notification.objects.create``
+costs a preference lookup and an INSERT per user. ``notify_users`` resolves
+in-app preferences for the whole audience in one query, builds the rows in
+memory and writes them with ``bulk_create`` in batches.
+
+Each user also has a "stamp" in the cache that changes whenever their
+notifications change; the notification stream (views.notifications_stream)
+watches it to push updates instead of having browsers poll.
+
+Unread counts are kept in the cache per user and type, adjusted as
+notifications are created, read and deleted, and rebuilt from one grouped
+query when the cache is cold (``unread_count``). That needs a cache shared by
+every process (``CACHE_SHARED``); with a per-process cache the count is an
+indexed COUNT instead, since other workers' changes would never reach it.
+"""
+
+import logging
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from . import metrics
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+# In-app preference (accounts.NotificationPreference) that gates each type.
+# Types not listed here (e.g. 'system') are always delivered.
+PREFERENCE_FIELDS = {
+    'enrollment': 'notify_on_enrollment',
+    'assignment': 'notify_on_assignment',
+    'completion': 'notify_on_completion',
+    'certificate': 'notify_on_certificate',
+    'reminder': 'notify_on_reminder',
+    'announcement': 'notify_on_announcement',
+}
+
+
+STAMP_KEY = 'notifications:stamp:{}'
+
+
+def touch_notification_stamps(user_ids):
+    """Record that these users' notifications changed (new, read or deleted)."""
+    stamp = time.time_ns()
+    cache.set_many({STAMP_KEY.format(user_id): stamp for user_id in set(user_ids)}, timeout=None)
+
+
+async def get_notification_stamp(user_id):
+    return await cache.aget(STAMP_KEY.format(user_id))
+
+
+# ============ UNREAD COUNTERS ============
+
+UNREAD_KEY = 'notifications:unread:{}:{}'
+NOTIFICATION_TYPES = [choice for choice, _ in Notification.NOTIFICATION_TYPES]
+
+
+def _unread_keys(user_id):
+    return {UNREAD_KEY.format(user_id, notification_type): notification_type
+            for notification_type in NOTIFICATION_TYPES}
+
+
+def counters_enabled():
+    """Unread counters are only cached when every process shares the cache."""
+    return getattr(settings, 'CACHE_SHARED', False)
+
+
+def _counter_timeout():
+    # Counters expire so any drift (e.g. queryset.update() elsewhere) heals itself
+    return getattr(settings, 'NOTIFICATION_COUNT_TIMEOUT', 3600)
+
+
+def reconcile_unread_counts(user_id):
+    """Rebuild a user's cached unread counters from the database."""
+    counts = dict.fromkeys(NOTIFICATION_TYPES, 0)
+    counts.update(
+        Notification.objects.filter(user_id=user_id, is_read=False)
+        .order_by()
+        .values_list('notification_type')
+        .annotate(total=Count('id'))
+    )
+    cache.set_many(
+        {UNREAD_KEY.format(user_id, t): total for t, total in counts.items()},
+        timeout=_counter_timeout(),
+    )
+    return counts
+
+
+def unread_count(user_id, notification_types=None):
+    """
+    Number of unread notifications for a user, optionally limited to some types.
+
+    Served from the cache; a missing or negative counter triggers a rebuild.
+    Without a shared cache it is counted in the database (notif_user_unread_idx).
+    """
+    if not counters_enabled():
+        unread = Notification.objects.filter(user_id=user_id, is_read=False)
+        if notification_types is not None:
+            unread = unread.filter(notification_type__in=notification_types)
+        return unread.count()
+
+    keys = _unread_keys(user_id)
+    cached = cache.get_many(list(keys))
+    if len(cached) < len(keys) or any(value < 0 for value in cached.values()):
+        counts = reconcile_unread_counts(user_id)
+    else:
+        counts = {keys[key]: value for key, value in cached.items()}
+
+    if notification_types is None:
+        return sum(counts.values())
+    return sum(counts.get(t, 0) for t in notification_types)
+
+
+def adjust_unread_count(user_id, notification_type, delta):
+    """
+    Add delta to a cached counter. Counters that are not cached are left for
+    unread_count() to rebuild, so a cold cache is never half-populated.
+    """
+    if not counters_enabled():
+        return
+    key = UNREAD_KEY.format(user_id, notification_type)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        pass
+
+
+def bulk_adjust_unread_counts(user_ids, notification_type, delta):
+    """
+    adjust_unread_count() for many users in two cache round trips.
+
+    Not atomic like incr(); a racing update can be lost until the counter
+    expires, which is the trade for not doing one call per recipient.
+    """
+    if not counters_enabled():
+        return
+    keys = [UNREAD_KEY.format(user_id, notification_type) for user_id in set(user_ids)]
+    cached = cache.get_many(keys)
+    if cached:
+        cache.set_many({key: value + delta for key, value in cached.items()}, timeout=_counter_timeout())
+
+
+def reset_unread_counts(user_ids):
+    """Mark all of these users' notifications as read in the cache."""
+    if not counters_enabled():
+        return
+    cache.set_many(
+        {key: 0 for user_id in set(user_ids) for key in _unread_keys(user_id)},
+        timeout=_counter_timeout(),
+    )
+
+
+def forget_unread_counts(user_ids):
+    """Drop cached counters (after bulk changes); they are rebuilt on next read."""
+    cache.delete_many([key for user_id in set(user_ids) for key in _unread_keys(user_id)])
+
+
+def filter_by_preference(users, notification_type):
+    """
+    Restrict a user queryset to users who want in-app notifications of this type.
+
+    Users without a NotificationPreference row get the model defaults (enabled).
+    """
+    field = PREFERENCE_FIELDS.get(notification_type)
+    if field is None:
+        return users
+    return users.exclude(**{f'notification_preferences__{field}': False})
+
+
+def bulk_create_notifications(notifications, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insert prepared Notification instances in batches. Returns the created objects.
+
+    bulk_create skips post_save, so the recipients' stamps and unread counters
+    are updated here: one adjustment per (type, count) group of users.
+    """
+    created = []
+    for start in range(0, len(notifications), batch_size):
+        created.extend(Notification.objects.bulk_create(notifications[start:start + batch_size]))
+    for notification_type, count in Counter(n.notification_type for n in created).items():
+        metrics.inc('protrack_notifications_created_total', count, type=notification_type)
+
+    touch_notification_stamps(n.user_id for n in created)
+    unread = Counter((n.user_id, n.notification_type) for n in created if not n.is_read)
+    groups = defaultdict(list)
+    for (user_id, notification_type), count in unread.items():
+        groups[notification_type, count].append(user_id)
+    for (notification_type, count), user_ids in groups.items():
+        bulk_adjust_unread_counts(user_ids, notification_type, count)
+    return created
+
+
+def notify_users(users, notification_type, title, message, link='',
+                 respect_preferences=True, batch_size=DEFAULT_BATCH_SIZE, **related):
+    """
+    Create the same notification for every user in a queryset.
+
+    Args:
+        users: CustomUser queryset of recipients
+        notification_type: one of Notification.NOTIFICATION_TYPES
+        title, message, link: notification content
+        respect_preferences: skip users who disabled this type in-app
+        batch_size: rows per INSERT
+        **related: optional related_enrollment / related_certificate
+
+    Returns:
+        dict with 'created', 'skipped' and 'elapsed' (seconds)
+    """
+    started = time.monotonic()
+
+    recipients = filter_by_preference(users, notification_type) if respect_preferences else users
+    recipient_ids = list(recipients.values_list('id', flat=True))
+    skipped = users.count() - len(recipient_ids) if respect_preferences else 0
+
+    notifications = [
+        Notification(
+            user_id=user_id,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            link=link,
+            **related,
+        )
+        for user_id in recipient_ids
+    ]
+    bulk_create_notifications(notifications, batch_size=batch_size)
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Fan-out '{notification_type}' notification to {len(notifications)} user(s) "
+        f"({skipped} skipped by preference) in {elapsed:.3f}s"
+    )
+    return {'created': len(notifications), 'skipped': skipped, 'elapsed': elapsed}
@@ -0,0 +1,113 @@
+"""Set-based course progress for enrollments.
+
+Progress is materialized on Enrollment as ``required_count`` and
+``completed_required_count``; those columns are kept current by the signal
+handlers in ``dashboard.signals`` and repaired by ``recompute_progress``.
+
+The same counts can also be computed live for any number of enrollments in a
+single query with ``with_progress()``, which is what the counters are
+refreshed from.
+
+"Available" materials are the required materials a learner can actually
+complete: every required non-quiz material plus required quizzes that are
+published.
+"""
+
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Enrollment, TrainingMaterial
+
+ACTIVE_STATUSES = ('enrolled', 'in_progress')
+
+# Required materials that count towards completion (unpublished quizzes excluded)
+AVAILABLE_MATERIAL_Q = Q(is_required=True) & (~Q(material_type='quiz') | Q(quiz__is_published=True))
+
+
+def _count_subquery(queryset, group_by):
+    """Wrap a filtered queryset as a scalar COUNT subquery (0 when empty)."""
+    counted = (
+        queryset.order_by()
+        .values(group_by)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def available_count_expression():
+    """Available required materials for the enrollment's course."""
+    return _count_subquery(
+        TrainingMaterial.objects.filter(AVAILABLE_MATERIAL_Q, course=OuterRef('course_id')),
+        'course',
+    )
+
+
+def completed_count_expression():
+    """Available required materials the enrollment has completed."""
+    return _count_subquery(
+        Enrollment.completed_materials.through.objects.filter(
+            enrollment_id=OuterRef('pk'),
+            trainingmaterial__in=TrainingMaterial.objects.filter(AVAILABLE_MATERIAL_Q),
+        ),
+        'enrollment',
+    )
+
+
+def with_progress(queryset):
+    """
+    Annotate an Enrollment queryset with live progress counts.
+
+    Adds:
+        required_materials: number of required materials in the course
+        available_materials: required materials the learner can complete
+        completed_available: available materials the enrollment has completed
+    """
+    return queryset.annotate(
+        required_materials=_count_subquery(
+            TrainingMaterial.objects.filter(course=OuterRef('course_id'), is_required=True),
+            'course',
+        ),
+        available_materials=available_count_expression(),
+        completed_available=completed_count_expression(),
+    )
+
+
+def refresh_progress_counters(queryset):
+    """
+    Recompute the materialized counters for every enrollment in queryset.
+
+    Runs as a single UPDATE regardless of how many rows match.
+    Returns the number of enrollments updated.
+    """
+    return queryset.update(
+        required_count=available_count_expression(),
+        completed_required_count=completed_count_expression(),
+    )
+
+
+def completion_rate(enrollment):
+    """Completion percentage for an enrollment annotated by with_progress()."""
+    if enrollment.available_materials > 0:
+        return round((enrollment.completed_available / enrollment.available_materials) * 100)
+    # Fall back to progress_percentage if no available required materials
+    return enrollment.progress_percentage
+
+
+def apply_completion_rates(enrollments):
+    """
+    Set ``completion_rate`` on each enrollment from its counters and sync status.
+
+    Enrollments that reached 100% but are not yet completed are marked as
+    completed, matching what the learner sees on their dashboard.
+    """
+    for enrollment in enrollments:
+        enrollment.completion_rate = enrollment.get_completion_rate()
+
+        if enrollment.completion_rate == 100 and enrollment.status not in ['completed', 'cancelled']:
+            enrollment.status = 'completed'
+            enrollment.completion_date = timezone.now().date()
+            enrollment.progress_percentage = 100
+            enrollment.save()
+    return enrollments
@@ -0,0 +1,108 @@
+"""Calendar reminder scheduling for ProTrack.
+
+Each CalendarEvent stores when its reminder is due in ``remind_at`` (set on
+save), covered by a partial index over pending reminders. The functions
+here only read the head of that index (the earliest pending ``remind_at``,
+or the rows already due), so their cost does not grow with the number of
+future events.
+
+``python manage.py run_reminder_scheduler`` sleeps until the next reminder
+is due, then claims due events in batches and dispatches them. Claiming
+stamps ``reminder_claimed_at`` so concurrent schedulers never send the same
+reminder twice: on PostgreSQL the batch is picked with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so schedulers take disjoint batches
+without waiting on each other; on SQLite (one writer at a time) each
+candidate is claimed with a conditional UPDATE, as in dashboard.jobs.
+Claims left behind by a scheduler that died mid-batch are released by
+``release_stale_claims``.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import CalendarEvent
+
+logger = logging.getLogger(__name__)
+
+
+def pending_reminders():
+    """Events whose reminder has not been sent and is not being dispatched."""
+    return CalendarEvent.objects.filter(
+        reminder_sent=False, reminder_claimed_at__isnull=True, remind_at__isnull=False
+    )
+
+
+def next_reminder_at():
+    """The earliest pending remind_at, or None when no reminder is pending."""
+    return pending_reminders().order_by('remind_at').values_list('remind_at', flat=True).first()
+
+
+def claim_due_reminders(limit, now=None):
+    """Atomically claim up to `limit` events whose reminder is due; returns the claimed events."""
+    now = now or timezone.now()
+    due = pending_reminders().filter(remind_at__lte=now).order_by('remind_at', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            claimed = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            CalendarEvent.objects.filter(id__in=claimed).update(reminder_claimed_at=now)
+    else:
+        claimed = []
+        for event_id in due.values_list('id', flat=True)[:limit]:
+            if pending_reminders().filter(id=event_id).update(reminder_claimed_at=now):
+                claimed.append(event_id)
+
+    return list(
+        CalendarEvent.objects.filter(id__in=claimed).select_related('user').order_by('remind_at', 'id')
+    )
+
+
+def dispatch_reminder(event, now=None):
+    """
+    Send a claimed event's reminder (in-app and/or email, per the user's
+    preferences). Reminders for events that have already started are
+    dropped. Returns 'sent' or 'skipped'.
+    """
+    now = now or timezone.now()
+    event_datetime = event.remind_at + timedelta(minutes=event.reminder_minutes)
+    if event_datetime < now:
+        CalendarEvent.objects.filter(id=event.id).update(reminder_sent=True, reminder_claimed_at=None)
+        result = 'skipped'
+    else:
+        event.create_reminder_notification()
+        result = 'sent'
+    metrics.inc('protrack_calendar_reminders_total', result=result)
+    metrics.observe('protrack_calendar_reminder_lag_seconds', max(0, (now - event.remind_at).total_seconds()))
+    return result
+
+
+def process_due_reminders(limit, now=None):
+    """
+    Claim and dispatch one batch of due reminders.
+
+    Returns (event, result) pairs, result being 'sent', 'skipped' or
+    'failed'. A failed reminder keeps its claim and is retried once
+    ``release_stale_claims`` releases it.
+    """
+    results = []
+    for event in claim_due_reminders(limit, now):
+        try:
+            result = dispatch_reminder(event)
+        except Exception as e:
+            logger.exception(f"Could not send the reminder for calendar event {event.id}: {e}")
+            metrics.inc('protrack_calendar_reminders_total', result='failed')
+            result = 'failed'
+        results.append((event, result))
+    return results
+
+
+def release_stale_claims(older_than):
+    """Return reminders claimed longer than `older_than` ago (dead scheduler, failed send) to the queue."""
+    cutoff = timezone.now() - older_than
+    return CalendarEvent.objects.filter(
+        reminder_sent=False, reminder_claimed_at__lt=cutoff
+    ).update(reminder_claimed_at=None)
@@ -0,0 +1,211 @@
+"""Admin report data for ProTrack (US-03).
+
+``get_report`` returns everything the reports page shows. Headline numbers
+come from one conditional-aggregate query per table, monthly trends are
+bucketed in the database with ``TruncMonth``, and the assembled report is
+cached for ``REPORT_CACHE_TIMEOUT`` seconds. Enrollment and Certificate
+writes drop the cached copy (see dashboard.signals), so it is only cached
+when every process shares the cache (``CACHE_SHARED``); a per-process copy
+would outlive invalidations made by other workers.
+
+Once ``build_report_snapshots`` has run, the course, category, program and
+monthly sections are read from the latest snapshot rows instead of the live
+tables, labelled with when that snapshot was built (``snapshot_as_of``), and
+a daily trend is added (see dashboard.snapshots).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from accounts.models import CustomUser
+
+from .models import (
+    CategorySnapshot, Certificate, CourseSnapshot, Enrollment, MonthlySnapshot, ProgramSnapshot,
+    SnapshotRun, TrainingCategory, TrainingCourse,
+)
+
+REPORT_CACHE_KEY = 'reports:summary'
+TREND_DAYS = 180
+SNAPSHOT_TREND_DAYS = 30
+
+
+def _monthly_counts(queryset, field):
+    rows = (
+        queryset.annotate(month=TruncMonth(field))
+        .values('month')
+        .annotate(count=Count('id'))
+        .order_by('month')
+    )
+    return [{'month': row['month'].strftime('%Y-%m'), 'count': row['count']} for row in rows]
+
+
+def live_sections():
+    """Course, category and monthly sections computed from the live tables."""
+    course_stats = TrainingCourse.objects.annotate(
+        total_enrolled=Count('enrollments'),
+        completed=Count('enrollments', filter=Q(enrollments__status='completed')),
+        avg_score=Avg('enrollments__score', filter=Q(enrollments__score__isnull=False))
+    ).filter(total_enrolled__gt=0).order_by('-total_enrolled')[:10]
+
+    category_stats = TrainingCategory.objects.annotate(
+        course_count=Count('courses', distinct=True),
+        enrollment_count=Count('courses__enrollments'),
+        completion_count=Count('courses__enrollments', filter=Q(courses__enrollments__status='completed'))
+    ).filter(course_count__gt=0)
+
+    since = timezone.now() - timedelta(days=TREND_DAYS)
+
+    return {
+        'course_stats': list(course_stats),
+        'category_stats': list(category_stats),
+        'monthly_enrollments': _monthly_counts(
+            Enrollment.objects.filter(enrolled_date__gte=since), 'enrolled_date'
+        ),
+        'certificates_by_month': _monthly_counts(
+            Certificate.objects.filter(status='issued', issue_date__gte=since.date()), 'issue_date'
+        ),
+    }
+
+
+def snapshot_sections():
+    """Report sections read from the latest snapshot, or None if none has been built."""
+    latest = CourseSnapshot.objects.aggregate(latest=Max('snapshot_date'))['latest']
+    if latest is None:
+        return None
+
+    course_stats = [
+        {
+            'title': snapshot.course.title,
+            'total_enrolled': snapshot.enrollments,
+            'completed': snapshot.completed,
+            'avg_score': snapshot.avg_score,
+        }
+        for snapshot in CourseSnapshot.objects.filter(
+            snapshot_date=latest, enrollments__gt=0
+        ).select_related('course').order_by('-enrollments')[:10]
+    ]
+    category_stats = [
+        {
+            'name': snapshot.category.name if snapshot.category else 'Uncategorized',
+            'course_count': snapshot.courses,
+            'enrollment_count': snapshot.enrollments,
+            'completion_count': snapshot.completed,
+        }
+        for snapshot in CategorySnapshot.objects.filter(snapshot_date=latest).select_related('category')
+    ]
+    program_stats = list(
+        ProgramSnapshot.objects.filter(snapshot_date=latest, users__gt=0)
+        .order_by('-enrollments')
+        .values('program', 'users', 'enrollments', 'completed')
+    )
+    enrollment_trend = [
+        {'date': row['snapshot_date'], 'enrollments': row['enrollments'], 'completed': row['completed']}
+        for row in CourseSnapshot.objects.filter(
+            snapshot_date__gt=latest - timedelta(days=SNAPSHOT_TREND_DAYS)
+        ).order_by('snapshot_date').values('snapshot_date').annotate(
+            enrollments=Sum('enrollments'), completed=Sum('completed')
+        )
+    ]
+    since = (timezone.now() - timedelta(days=TREND_DAYS)).date().replace(day=1)
+    months = list(MonthlySnapshot.objects.filter(month__gte=since))
+    # When the snapshot sections were last brought up to date (shown as "as of")
+    as_of = SnapshotRun.objects.filter(
+        snapshot_date=latest, finished_at__isnull=False
+    ).aggregate(latest=Max('finished_at'))['latest']
+
+    return {
+        'snapshot_date': latest,
+        'snapshot_as_of': as_of,
+        'course_stats': course_stats,
+        'category_stats': category_stats,
+        'program_stats': program_stats,
+        'enrollment_trend': enrollment_trend,
+        'monthly_enrollments': [
+            {'month': m.month.strftime('%Y-%m'), 'count': m.enrollments} for m in months if m.enrollments
+        ],
+        'certificates_by_month': [
+            {'month': m.month.strftime('%Y-%m'), 'count': m.certificates_issued}
+            for m in months if m.certificates_issued
+        ],
+    }
+
+
+def build_report():
+    """Compute the report; detail sections come from the latest snapshot when there is one."""
+    courses = TrainingCourse.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='active')),
+        archived=Count('id', filter=Q(status='archived')),
+    )
+    enrollments = Enrollment.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status__in=['enrolled', 'in_progress'])),
+        completed=Count('id', filter=Q(status='completed')),
+        avg_score=Avg('score'),
+    )
+    total_users = CustomUser.objects.filter(is_superuser=False).count()
+    total_certificates = Certificate.objects.filter(status='issued').count()
+
+    if enrollments['total'] > 0:
+        overall_completion_rate = round((enrollments['completed'] / enrollments['total']) * 100, 1)
+    else:
+        overall_completion_rate = 0
+    avg_score = round(enrollments['avg_score'], 1) if enrollments['avg_score'] else 0
+
+    recent_enrollments = Enrollment.objects.select_related(
+        'user', 'course'
+    ).order_by('-enrolled_date')[:10]
+
+    recent_completions = Enrollment.objects.filter(
+        status='completed'
+    ).select_related('user', 'course').order_by('-completion_date')[:10]
+
+    user_progress = CustomUser.objects.filter(
+        is_superuser=False
+    ).annotate(
+        total_enrollments=Count('enrollments'),
+        completed_courses=Count('enrollments', filter=Q(enrollments__status='completed')),
+        in_progress=Count('enrollments', filter=Q(enrollments__status='in_progress')),
+        avg_score=Avg('enrollments__score', filter=Q(enrollments__score__isnull=False))
+    ).filter(total_enrollments__gt=0).order_by('-completed_courses')[:10]
+
+    report = {
+        # Overall Stats
+        'total_courses': courses['total'],
+        'active_courses': courses['active'],
+        'archived_courses': courses['archived'],
+        'total_enrollments': enrollments['total'],
+        'active_enrollments': enrollments['active'],
+        'completed_enrollments': enrollments['completed'],
+        'total_users': total_users,
+        'total_certificates': total_certificates,
+        'overall_completion_rate': overall_completion_rate,
+        'avg_score': avg_score,
+
+        # Detailed Stats (evaluated so they can be cached)
+        'recent_enrollments': list(recent_enrollments),
+        'recent_completions': list(recent_completions),
+        'user_progress': list(user_progress),
+    }
+    report.update(snapshot_sections() or live_sections())
+    return report
+
+
+def get_report():
+    """Return the cached report, building it on a miss (always built without a shared cache)."""
+    if not getattr(settings, 'CACHE_SHARED', False):
+        return build_report()
+    report = cache.get(REPORT_CACHE_KEY)
+    if report is None:
+        report = build_report()
+        cache.set(REPORT_CACHE_KEY, report, getattr(settings, 'REPORT_CACHE_TIMEOUT', 300))
+    return report
+
+
+def invalidate_report():
+    cache.delete(REPORT_CACHE_KEY)
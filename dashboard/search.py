@@ -0,0 +1,208 @@
+"""Full-text search over the training catalog.
+
+``search_courses(queryset, query)`` narrows a TrainingCourse queryset to the
+courses matching every word of the query (each word also matches as a
+prefix, so "prog" finds "programming") and orders them by relevance, best
+first, annotating the score as ``search_rank``. Titles weigh most, then
+instructors, then descriptions.
+
+The backend follows the database (``CATALOG_SEARCH_BACKEND = 'auto'``):
+
+* PostgreSQL: CourseSearchDocument, a weighted tsvector per course in its
+  own table (so course queries never load it) with a GIN index, queried
+  with ``to_tsquery`` and ranked with ``ts_rank``.
+* SQLite: an FTS5 table (``dashboard_trainingcourse_fts``, rowid = course
+  id), joined to the courses through the unmanaged CourseSearchEntry model,
+  queried with MATCH and ranked with ``bm25``.
+* Anything else, or ``'basic'``: the old ``icontains`` scan, ranked by
+  which field matched.
+
+The indexes are created and filled by migration 0020.
+``index_course`` and ``unindex_course`` keep them in sync on save and delete
+(see dashboard.signals); after bulk writes, which send no signals, run
+``python manage.py rebuild_search_index``. ``prune_search_index`` runs after
+every migrate and flush to drop FTS5 entries of courses that are gone.
+"""
+
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Lookup, Q, Value, When
+
+from .models import CourseSearchDocument, CourseSearchEntry, TrainingCourse
+
+FTS_TABLE = CourseSearchEntry._meta.db_table
+DOCUMENT_TABLE = CourseSearchDocument._meta.db_table
+SEARCH_CONFIG = 'english'
+MAX_TERMS = 10
+
+
+def search_terms(query):
+    """Words of the query, lowercased, without search operators."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+class BasicCourseSearch:
+    """Unindexed substring search, for databases without a full-text backend."""
+
+    def index_course(self, course):
+        pass
+
+    def unindex_course(self, course_id):
+        pass
+
+    def rebuild(self):
+        return TrainingCourse.objects.count()
+
+    def prune(self):
+        return 0
+
+    def search(self, queryset, query):
+        query = query.strip()
+        return queryset.filter(
+            Q(title__icontains=query) | Q(description__icontains=query) | Q(instructor__icontains=query)
+        ).annotate(search_rank=Case(
+            When(title__icontains=query, then=Value(3)),
+            When(instructor__icontains=query, then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )).order_by('-search_rank', 'title')
+
+
+class PostgresCourseSearch:
+    """tsvector table (CourseSearchDocument) with a GIN index, ranked with ts_rank."""
+
+    def _upsert(self, where='', params=()):
+        table = TrainingCourse._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {DOCUMENT_TABLE} (course_id, vector) "
+                f"SELECT id, "
+                f"setweight(to_tsvector(%s, coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector(%s, coalesce(instructor, '')), 'B') || "
+                f"setweight(to_tsvector(%s, coalesce(description, '')), 'C') "
+                f"FROM {table} {where} "
+                f"ON CONFLICT (course_id) DO UPDATE SET vector = EXCLUDED.vector",
+                [SEARCH_CONFIG] * 3 + list(params),
+            )
+            return cursor.rowcount
+
+    def index_course(self, course):
+        self._upsert('WHERE id = %s', [course.pk])
+
+    def unindex_course(self, course_id):
+        pass  # the document is deleted with the course (ON DELETE CASCADE)
+
+    def rebuild(self):
+        return self._upsert()
+
+    def prune(self):
+        return 0  # cascades keep the table in step with the courses
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        tsquery = SearchQuery(' & '.join(f'{term}:*' for term in terms), config=SEARCH_CONFIG, search_type='raw')
+        return queryset.filter(search_document__vector=tsquery).annotate(
+            search_rank=SearchRank(F('search_document__vector'), tsquery)
+        ).order_by('-search_rank', 'title')
+
+
+class SqliteCourseSearch:
+    """FTS5 table keyed by course id, joined through CourseSearchEntry and ranked with bm25."""
+
+    def index_course(self, course):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [course.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, instructor) VALUES (%s, %s, %s, %s)',
+                [course.pk, course.title, course.description, course.instructor],
+            )
+
+    def unindex_course(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [course_id])
+
+    def rebuild(self):
+        table = TrainingCourse._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, instructor) '
+                f'SELECT id, title, description, instructor FROM {table}'
+            )
+            return cursor.rowcount
+
+    def prune(self):
+        """
+        Drop entries whose course is gone. The FTS5 table is unmanaged, so
+        ``flush`` (e.g. between TransactionTestCases) empties the courses
+        but not the index.
+        """
+        table = TrainingCourse._meta.db_table
+        with connection.cursor() as cursor:
+            if FTS_TABLE not in connection.introspection.table_names(cursor):
+                return 0  # before migration 0020
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid NOT IN (SELECT id FROM {table})')
+            return cursor.rowcount
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # rank (bm25) is lower for better matches; negated so higher ranks first on every backend
+        return queryset.filter(search_entry__document__match=match).annotate(
+            search_rank=-F('search_entry__rank')
+        ).order_by('-search_rank', 'title')
+
+
+@CourseSearchEntry._meta.get_field('document').register_lookup
+class Match(Lookup):
+    """``document__match``: an FTS5 MATCH against the whole row."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+BACKENDS = {
+    'basic': BasicCourseSearch,
+    'postgresql': PostgresCourseSearch,
+    'sqlite': SqliteCourseSearch,
+}
+
+
+def get_search_backend():
+    name = getattr(settings, 'CATALOG_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = connection.vendor if connection.vendor in BACKENDS else 'basic'
+    return BACKENDS[name]()
+
+
+def search_courses(queryset, query):
+    """Courses in queryset matching query, most relevant first (annotated with search_rank)."""
+    return get_search_backend().search(queryset, query)
+
+
+def index_course(course):
+    get_search_backend().index_course(course)
+
+
+def unindex_course(course_id):
+    get_search_backend().unindex_course(course_id)
+
+
+def rebuild_search_index():
+    """Re-index every course; returns the number indexed."""
+    return get_search_backend().rebuild()
+
+
+def prune_search_index():
+    """Remove index entries of courses that no longer exist; returns the number removed."""
+    return get_search_backend().prune()
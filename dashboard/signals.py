@@ -0,0 +1,175 @@
+"""Signal handlers that keep derived state in step with the models it is built from.
+
+* Enrollment progress counters: enrollment material completions, material
+  changes and quiz (un)publishing (dashboard.progress).
+* Notification stamps, unread counters and /metrics counts: Notification
+  saves and deletes (dashboard.notifications, dashboard.metrics).
+* Cached admin report: Enrollment and Certificate writes (dashboard.reports).
+* Quiz answer-key version: Question and Choice writes (dashboard.grading).
+* iCalendar feed versions: calendar events, enrollments, sessions, course
+  titles and users (dashboard.calendar_feed).
+* Catalog search index: TrainingCourse writes, plus a prune after migrate
+  and flush (dashboard.search).
+"""
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from accounts.models import CustomUser
+
+from . import metrics
+from .calendar_feed import touch_calendar_feeds, touch_superuser_calendar_feeds
+from .grading import invalidate_answer_key
+from .models import (
+    CalendarEvent, Certificate, Choice, Enrollment, Notification, Question, Quiz, TrainingCourse,
+    TrainingMaterial, TrainingSession,
+)
+from .notifications import adjust_unread_count, touch_notification_stamps
+from .progress import refresh_progress_counters
+from .reports import invalidate_report
+from .search import index_course, prune_search_index, unindex_course
+
+
+def _refresh_course(course_id):
+    refresh_progress_counters(Enrollment.objects.filter(course_id=course_id))
+
+
+@receiver(post_save, sender=Enrollment)
+def initialize_enrollment_counters(sender, instance, created, raw=False, **kwargs):
+    """Compute counters for new enrollments."""
+    if created and not raw:
+        refresh_progress_counters(Enrollment.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Enrollment.completed_materials.through)
+def completed_materials_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Update counters when materials are added to or removed from completed_materials."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        refresh_progress_counters(Enrollment.objects.filter(pk=instance.pk))
+    elif pk_set:
+        # material.completed_by_enrollments.add/remove(...)
+        refresh_progress_counters(Enrollment.objects.filter(pk__in=pk_set))
+    else:
+        # material.completed_by_enrollments.clear()
+        _refresh_course(instance.course_id)
+
+
+@receiver(post_save, sender=TrainingMaterial)
+@receiver(post_delete, sender=TrainingMaterial)
+def training_material_changed(sender, instance, raw=False, **kwargs):
+    """Adding, editing or deleting a material can change every enrollment in the course."""
+    if not raw:
+        _refresh_course(instance.course_id)
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, raw=False, **kwargs):
+    """Publishing or unpublishing a quiz changes which materials are available."""
+    if raw:
+        return
+    # The material may already be gone when the quiz is deleted by cascade
+    course_id = TrainingMaterial.objects.filter(pk=instance.material_id).values_list('course_id', flat=True).first()
+    if course_id is not None:
+        _refresh_course(course_id)
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, raw=False, **kwargs):
+    """Wake the user's notification streams and count new unread notifications."""
+    if raw:
+        return
+    touch_notification_stamps([instance.user_id])
+    if created:
+        metrics.inc('protrack_notifications_created_total', type=instance.notification_type)
+    if created and not instance.is_read:
+        adjust_unread_count(instance.user_id, instance.notification_type, 1)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    touch_notification_stamps([instance.user_id])
+    if not instance.is_read:
+        adjust_unread_count(instance.user_id, instance.notification_type, -1)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+def report_data_changed(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_report()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_answer_key(instance.quiz_id)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def choice_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # The question may already be gone when choices are deleted by cascade
+    quiz_id = Question.objects.filter(pk=instance.question_id).values_list('quiz_id', flat=True).first()
+    if quiz_id is not None:
+        invalidate_answer_key(quiz_id)
+
+
+@receiver(post_save, sender=CalendarEvent)
+@receiver(post_delete, sender=CalendarEvent)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def user_calendar_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        touch_calendar_feeds([instance.user_id])
+
+
+@receiver(post_save, sender=TrainingSession)
+@receiver(post_delete, sender=TrainingSession)
+def training_session_changed(sender, raw=False, **kwargs):
+    if not raw:
+        touch_superuser_calendar_feeds()
+
+
+@receiver(post_save, sender=TrainingCourse)
+def training_course_changed(sender, instance, created, raw=False, **kwargs):
+    """Course titles appear in the feeds of its learners and, through sessions, of superusers."""
+    if raw or created:
+        return
+    touch_calendar_feeds(Enrollment.objects.filter(course=instance).values_list('user_id', flat=True))
+    touch_superuser_calendar_feeds()
+
+
+@receiver(post_save, sender=CustomUser)
+def user_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Becoming or ceasing to be a superuser switches the feed between sessions and enrollments."""
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    touch_calendar_feeds([instance.pk])
+
+
+@receiver(post_save, sender=TrainingCourse)
+def course_search_document_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_course(instance)
+
+
+@receiver(post_delete, sender=TrainingCourse)
+def course_deleted(sender, instance, **kwargs):
+    unindex_course(instance.pk)
+
+
+@receiver(post_migrate)
+def search_index_flushed(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """flush also sends post_migrate; it empties the courses but not the unmanaged FTS5 table."""
+    if sender.name == 'dashboard' and using == DEFAULT_DB_ALIAS:
+        prune_search_index()
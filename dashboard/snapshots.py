@@ -0,0 +1,216 @@
+"""Daily reporting rollups for ProTrack.
+
+``build_snapshots`` writes one row per course, category and program for a
+date, plus per-month totals, into the *Snapshot tables. Incremental runs
+only recompute the courses, programs and months touched by enrollments and
+certificates changed since the previous run; everything else is carried
+forward from the previous snapshot date, so the nightly cost follows the
+day's activity rather than the size of the tables.
+
+Deleted courses drop out of the date being built. Deleted enrollments and
+users changing program are not detected incrementally; run with
+``full=True`` (``--full``) to rebuild everything.
+"""
+
+import logging
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from accounts.models import CustomUser
+
+from .models import (
+    CategorySnapshot, Certificate, CourseSnapshot, Enrollment, MonthlySnapshot,
+    ProgramSnapshot, SnapshotRun, TrainingCourse,
+)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ['enrolled', 'in_progress']
+
+
+def _carry_forward(model, key, snapshot_date, skip):
+    """Copy the previous snapshot's rows to snapshot_date, except keys in skip or already present."""
+    previous = model.objects.filter(snapshot_date__lt=snapshot_date).aggregate(latest=Max('snapshot_date'))['latest']
+    if previous is None:
+        return 0
+    present = set(model.objects.filter(snapshot_date=snapshot_date).values_list(key, flat=True))
+    rows = []
+    for row in model.objects.filter(snapshot_date=previous).exclude(**{f'{key}__in': skip | present}):
+        row.pk = None
+        row.snapshot_date = snapshot_date
+        rows.append(row)
+    model.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _replace(model, snapshot_date, key, rows):
+    """Write freshly computed rows for these keys, replacing any existing ones for the date."""
+    model.objects.filter(snapshot_date=snapshot_date, **{f'{key}__in': [getattr(r, key) for r in rows]}).delete()
+    model.objects.bulk_create(rows)
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _snapshot_courses(snapshot_date, course_ids):
+    stats = {
+        row['course_id']: row
+        for row in Enrollment.objects.filter(course_id__in=course_ids)
+        .order_by()
+        .values('course_id')
+        .annotate(
+            enrollments=Count('id'),
+            active=Count('id', filter=Q(status__in=ACTIVE_STATUSES)),
+            completed=Count('id', filter=Q(status='completed')),
+            scored=Count('score'),
+            score_total=Sum('score'),
+        )
+    }
+    existing_courses = TrainingCourse.objects.filter(id__in=course_ids).values_list('id', flat=True)
+    _replace(CourseSnapshot, snapshot_date, 'course_id', [
+        CourseSnapshot(
+            snapshot_date=snapshot_date,
+            course_id=course_id,
+            **{field: stats.get(course_id, {}).get(field) or 0
+               for field in ('enrollments', 'active', 'completed', 'scored', 'score_total')},
+        )
+        for course_id in existing_courses
+    ])
+
+
+def _snapshot_categories(snapshot_date):
+    """Categories are summed from the day's course snapshots, not the live tables."""
+    rows = (
+        CourseSnapshot.objects.filter(snapshot_date=snapshot_date)
+        .values('course__category_id')
+        .annotate(courses=Count('id'), enrollments=Sum('enrollments'), completed=Sum('completed'))
+    )
+    CategorySnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+    CategorySnapshot.objects.bulk_create([
+        CategorySnapshot(
+            snapshot_date=snapshot_date,
+            category_id=row['course__category_id'],
+            courses=row['courses'],
+            enrollments=row['enrollments'],
+            completed=row['completed'],
+        )
+        for row in rows
+    ])
+
+
+def _snapshot_programs(snapshot_date, programs):
+    learners = CustomUser.objects.filter(is_superuser=False, program__in=programs)
+    users = dict(learners.order_by().values('program').annotate(total=Count('id')).values_list('program', 'total'))
+    enrollments = {
+        row['user__program']: row
+        for row in Enrollment.objects.filter(user__in=learners)
+        .order_by()
+        .values('user__program')
+        .annotate(enrollments=Count('id'), completed=Count('id', filter=Q(status='completed')))
+    }
+    _replace(ProgramSnapshot, snapshot_date, 'program', [
+        ProgramSnapshot(
+            snapshot_date=snapshot_date,
+            program=program,
+            users=users.get(program, 0),
+            enrollments=enrollments.get(program, {}).get('enrollments', 0),
+            completed=enrollments.get(program, {}).get('completed', 0),
+        )
+        for program in programs
+    ])
+
+
+def _monthly_counts(queryset, field):
+    return dict(
+        queryset.annotate(bucket=TruncMonth(field)).order_by()
+        .values('bucket').annotate(total=Count('id')).values_list('bucket', 'total')
+    )
+
+
+def _snapshot_months(months):
+    if not months:
+        return
+    first, last = min(months), max(months)
+    last_end = date(last.year + last.month // 12, last.month % 12 + 1, 1)
+
+    def counts(queryset, field, is_datetime=False):
+        bounds = {f'{field}__date__gte' if is_datetime else f'{field}__gte': first,
+                  f'{field}__date__lt' if is_datetime else f'{field}__lt': last_end}
+        return {_month_start(k): v for k, v in _monthly_counts(queryset.filter(**bounds), field).items()}
+
+    enrolled = counts(Enrollment.objects.all(), 'enrolled_date', is_datetime=True)
+    completed = counts(Enrollment.objects.filter(status='completed'), 'completion_date')
+    issued = counts(Certificate.objects.filter(status='issued'), 'issue_date')
+
+    for month in months:
+        MonthlySnapshot.objects.update_or_create(month=month, defaults={
+            'enrollments': enrolled.get(month, 0),
+            'completions': completed.get(month, 0),
+            'certificates_issued': issued.get(month, 0),
+        })
+
+
+def build_snapshots(snapshot_date=None, full=False):
+    """
+    Build (or bring up to date) the snapshot rows for snapshot_date (default today).
+
+    Returns the finished SnapshotRun.
+    """
+    snapshot_date = snapshot_date or timezone.localdate()
+    started_at = timezone.now()
+    last_run = SnapshotRun.objects.filter(finished_at__isnull=False).order_by('-started_at').first()
+    since = None if full or last_run is None else last_run.started_at
+    full = since is None
+
+    enrollments = Enrollment.objects.all()
+    certificates = Certificate.objects.all()
+    users = CustomUser.objects.filter(is_superuser=False)
+    if since is not None:
+        enrollments = enrollments.filter(updated_at__gte=since)
+        certificates = certificates.filter(updated_at__gte=since)
+        users = users.filter(date_joined__gte=since)
+
+    changed = list(enrollments.values_list('course_id', 'user__program', 'enrolled_date', 'completion_date'))
+    course_ids = {course_id for course_id, _, _, _ in changed}
+    programs = {program for _, program, _, _ in changed} | set(users.values_list('program', flat=True))
+    months = {_month_start(timezone.localtime(enrolled)) for _, _, enrolled, _ in changed if enrolled}
+    months |= {_month_start(completed) for _, _, _, completed in changed if completed}
+    months |= {_month_start(issued) for issued in certificates.values_list('issue_date', flat=True) if issued}
+    if full:
+        course_ids |= set(TrainingCourse.objects.values_list('id', flat=True))
+        programs |= set(CustomUser.objects.filter(is_superuser=False).values_list('program', flat=True))
+
+    with transaction.atomic():
+        run = SnapshotRun.objects.create(snapshot_date=snapshot_date, started_at=started_at, full=full)
+
+        if full:
+            for model in (CourseSnapshot, ProgramSnapshot):
+                model.objects.filter(snapshot_date=snapshot_date).delete()
+        else:
+            _carry_forward(CourseSnapshot, 'course_id', snapshot_date, course_ids)
+            _carry_forward(ProgramSnapshot, 'program', snapshot_date, programs)
+            # Courses deleted since their rows were written are not carried into this date
+            CourseSnapshot.objects.filter(snapshot_date=snapshot_date).exclude(
+                course_id__in=TrainingCourse.objects.values('id')
+            ).delete()
+
+        _snapshot_courses(snapshot_date, course_ids)
+        _snapshot_categories(snapshot_date)
+        _snapshot_programs(snapshot_date, programs)
+        _snapshot_months(months)
+
+        run.enrollments_processed = len(changed)
+        run.finished_at = timezone.now()
+        run.save(update_fields=['enrollments_processed', 'finished_at'])
+
+    logger.info(
+        f"Report snapshot {snapshot_date} ({'full' if full else 'incremental'}): "
+        f"{len(changed)} enrollment(s), {len(course_ids)} course(s), "
+        f"{len(programs)} program(s), {len(months)} month(s) recomputed"
+    )
+    return run
@@ -2,18 +2,84 @@
 Handles file uploads to Supabase Storage buckets: profilepic and Uploadfiles"""
 
 import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional, Tuple
 import mimetypes
 from decouple import config
 import time
 from io import BytesIO
 
+from . import metrics
+
+
+# HTTP client tuning (seconds / connection counts)
+CONNECT_TIMEOUT = config('SUPABASE_CONNECT_TIMEOUT', default=5, cast=float)
+READ_TIMEOUT = config('SUPABASE_READ_TIMEOUT', default=30, cast=float)
+POOL_SIZE = config('SUPABASE_POOL_SIZE', default=10, cast=int)
+MAX_RETRIES = config('SUPABASE_MAX_RETRIES', default=3, cast=int)
+
+_session = None
+_storages = {}
+_lock = threading.RLock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Process-wide keep-alive HTTP session for Supabase Storage.
+    
+    Reusing one Session keeps TLS connections open across uploads, downloads
+    and deletes. Connection errors are retried on every method; 429/5xx
+    responses are retried for idempotent methods only (GET/PUT/DELETE), with
+    exponential backoff and jitter.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                retry = Retry(
+                    total=MAX_RETRIES,
+                    connect=MAX_RETRIES,
+                    read=MAX_RETRIES,
+                    status=MAX_RETRIES,
+                    backoff_factor=0.5,
+                    backoff_jitter=0.5,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_SIZE,
+                    pool_maxsize=POOL_SIZE,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def get_storage(use_service_key=False) -> 'SupabaseStorage':
+    """Shared SupabaseStorage client (one per key type) backed by the pooled session"""
+    storage = _storages.get(use_service_key)
+    if storage is None:
+        with _lock:
+            storage = _storages.get(use_service_key)
+            if storage is None:
+                storage = SupabaseStorage(use_service_key=use_service_key)
+                _storages[use_service_key] = storage
+    return storage
+
 
 class SupabaseStorage:
     """Handle file operations with Supabase Storage"""
     
-    def __init__(self, use_service_key=False):
+    def __init__(self, use_service_key=False, session=None):
+        self.session = session or get_http_session()
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        
         # Load from environment variables using decouple
         self.supabase_url = config('SUPABASE_URL', default='').strip().rstrip('/')
         
@@ -56,10 +122,10 @@ class SupabaseStorage:
         try:
             delete_url = f"{self.storage_url}/object/{bucket_name}/{file_path}"
             
-            response = requests.delete(
+            response = self.session.delete(
                 delete_url,
                 headers=self._get_headers(),
-                timeout=10
+                timeout=self.timeout
             )
             
             if response.status_code in [200, 204]:
@@ -121,16 +187,20 @@ class SupabaseStorage:
             print(f"🔄 Upsert mode: {upsert}")
             
             # Upload file
-            response = requests.post(
-                upload_url,
-                headers=headers,
-                data=file_data,
-                timeout=30
-            )
+            with metrics.timer('protrack_supabase_upload_duration_seconds', bucket=bucket_name):
+                response = self.session.post(
+                    upload_url,
+                    headers=headers,
+                    data=file_data,
+                    timeout=self.timeout
+                )
             
             print(f"📥 Response status: {response.status_code}")
             
-            if response.status_code in [200, 201]:
+            succeeded = response.status_code in [200, 201]
+            metrics.inc('protrack_supabase_uploads_total', bucket=bucket_name, result='success' if succeeded else 'error')
+            if succeeded:
+                metrics.inc('protrack_supabase_upload_bytes_total', len(file_data), bucket=bucket_name)
                 # Get public URL
                 public_url = f"{self.supabase_url}/storage/v1/object/public/{bucket_name}/{file_path}"
                 print(f"✅ Upload successful: {public_url}")
@@ -148,10 +218,12 @@ class SupabaseStorage:
         except requests.exceptions.Timeout:
             error_msg = 'Upload timeout - please try again'
             print(f"❌ {error_msg}")
+            metrics.inc('protrack_supabase_uploads_total', bucket=bucket_name, result='timeout')
             return False, '', error_msg
         except Exception as e:
             error_msg = str(e)
             print(f"❌ Exception during upload: {error_msg}")
+            metrics.inc('protrack_supabase_uploads_total', bucket=bucket_name, result='error')
             return False, '', error_msg
     
     def get_public_url(self, bucket_name: str, file_path: str) -> str:
@@ -186,10 +258,10 @@ class SupabaseStorage:
             if folder_path:
                 list_url += f"?prefix={folder_path}"
             
-            response = requests.get(
+            response = self.session.get(
                 list_url,
                 headers=self._get_headers(),
-                timeout=10
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
@@ -218,7 +290,7 @@ def upload_profile_picture(user_id: int, file) -> Tuple[bool, str, Optional[str]
     Returns:
         Tuple of (success: bool, url: str, error: Optional[str])
     """
-    storage = SupabaseStorage(use_service_key=False)  # Use anon key for user uploads
+    storage = get_storage(use_service_key=False)  # Use anon key for user uploads
     
     # Get file extension
     file_extension = os.path.splitext(file.name)[1].lower()
@@ -262,7 +334,7 @@ def upload_training_material(course_id: int, file) -> Tuple[bool, str, Optional[
         Tuple of (success: bool, url: str, error: Optional[str])
     """
     # 🔐 USE SERVICE KEY FOR ADMIN UPLOADS
-    storage = SupabaseStorage(use_service_key=True)
+    storage = get_storage(use_service_key=True)
     
     # Keep original filename but make it safe
     safe_filename = file.name.replace(' ', '_').replace('(', '').replace(')', '')
@@ -283,7 +355,7 @@ def delete_training_material(file_url: str) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (success: bool, error: Optional[str])
     """
-    storage = SupabaseStorage(use_service_key=True)
+    storage = get_storage(use_service_key=True)
     
     # Extract bucket and path from URL
     # URL format: https://xxx.supabase.co/storage/v1/object/public/Uploadfiles/course_1/file.pdf
@@ -311,7 +383,7 @@ def upload_certificate(enrollment_id: int, pdf_file) -> Tuple[bool, str, Optiona
     Returns:
         Tuple of (success: bool, url: str, error: Optional[str])
     """
-    storage = SupabaseStorage(use_service_key=True)
+    storage = get_storage(use_service_key=True)
     file_path = f"certificates/enrollment_{enrollment_id}.pdf"
     
     print(f"🚀 Uploading certificate for enrollment {enrollment_id}")
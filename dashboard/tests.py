@@ -1,11 +1,52 @@
+import csv
 import json
-from datetime import date, timedelta
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from time import sleep
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.http import FileResponse, HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import NotificationPreference
 
-from .models import TrainingCourse, Enrollment, TrainingCategory
+from . import certificates
+from . import metrics
+from .instrumentation import RequestMetricsMiddleware, reset_metrics, rolling_metrics
+from .certificate_issuing import issue_certificates
+from .jobs import claim_jobs, enqueue, enqueue_email, heartbeat, requeue_stale_jobs, run_job
+from .models import (
+    BackgroundJob, CalendarEvent, CalendarFeed, CategorySnapshot, Certificate, CourseSearchDocument,
+    CourseSearchEntry, CourseSnapshot, Enrollment, MonthlySnapshot, Notification, ProgramSnapshot, Question, Choice,
+    Quiz, SnapshotRun, TrainingCategory, TrainingCourse, TrainingMaterial, TrainingSession,
+)
+from .notifications import STAMP_KEY, bulk_create_notifications, notify_users, unread_count
+from .progress import completion_rate, with_progress
+from .reports import REPORT_CACHE_KEY
+from .reminders import claim_due_reminders, next_reminder_at, pending_reminders, release_stale_claims
+from .search import get_search_backend, rebuild_search_index, search_courses
+from .snapshots import build_snapshots
+from .supabase_utils import SupabaseStorage, get_http_session, get_storage
 
 User = get_user_model()
 
@@ -65,3 +106,1503 @@ class CalendarFunctionalityTests(TestCase):
         # Verify the date was updated in the database
         self.enrollment.refresh_from_db()
         self.assertEqual(self.enrollment.completion_date, new_completion_date)
+
+    def _feed_window(self, first_day, days=42):
+        return {
+            'start': f'{first_day.isoformat()}T00:00:00+08:00',
+            'end': f'{(first_day + timedelta(days=days)).isoformat()}T00:00:00+08:00',
+        }
+
+    def test_feeds_only_return_the_visible_window(self):
+        today = timezone.localdate()
+        for offset in (-90, 0, 90):
+            CalendarEvent.objects.create(
+                user=self.user, title=f'Event {offset}', event_date=today + timedelta(days=offset),
+                event_time=time(9),
+            )
+        window = self._feed_window(today - timedelta(days=7), days=14)
+
+        events = self.client.get(reverse('dashboard:get_user_calendar_events'), window).json()
+        self.assertEqual([event['title'] for event in events], ['Event 0'])
+        self.assertNotIn('description', events[0]['extendedProps'])
+
+        enrollments = self.client.get(reverse('dashboard:calendar_events'), window).json()
+        self.assertEqual([event['id'] for event in enrollments], [self.enrollment.id])
+        later = self._feed_window(today + timedelta(days=60))
+        self.assertEqual(self.client.get(reverse('dashboard:calendar_events'), later).json(), [])
+
+        self.assertEqual(
+            self.client.get(reverse('dashboard:calendar_events'), {'start': 'soon'}).status_code, 400
+        )
+
+    def test_session_feed_for_superusers_is_windowed(self):
+        User.objects.create_superuser(username='calendar_admin', password='password')
+        self.client.login(username='calendar_admin', password='password')
+        today = timezone.localdate()
+        for name, offset in (('Past', -60), ('Current', 0)):
+            TrainingSession.objects.create(
+                course=self.course, session_name=name, location='Room 1',
+                start_date=today + timedelta(days=offset), end_date=today + timedelta(days=offset + 2),
+                start_time=time(9),
+                end_time=time(17),
+            )
+        events = self.client.get(
+            reverse('dashboard:calendar_events'), self._feed_window(today - timedelta(days=7), days=14)
+        ).json()
+        self.assertEqual([event['title'] for event in events], [f'{self.course.title} - Current'])
+
+    def test_feeds_support_conditional_get(self):
+        url = reverse('dashboard:get_user_calendar_events')
+        window = self._feed_window(timezone.localdate())
+        event = CalendarEvent.objects.create(
+            user=self.user, title='Standup', event_date=timezone.localdate() + timedelta(days=1),
+            event_time=time(9),
+        )
+
+        first = self.client.get(url, window)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+        with CaptureQueriesContext(connection) as queries:
+            unchanged = self.client.get(url, window, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertFalse(any('"title"' in q['sql'] for q in queries.captured_queries))
+
+        other_month = self.client.get(url, self._feed_window(timezone.localdate() + timedelta(days=60)),
+                                      HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(other_month.status_code, 200)
+
+        event.title = 'Daily standup'
+        event.save()
+        changed = self.client.get(url, window, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()[0]['title'], 'Daily standup')
+
+
+class ProgressEngineTests(TestCase):
+
+    def setUp(self):
+        """Create a learner with enrollments in courses that have materials."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='learner', password='password')
+        self.client.login(username='learner', password='password')
+        self.category = TrainingCategory.objects.create(name='Progress Category')
+
+    def _enroll_in_new_courses(self, count):
+        """Create `count` courses with required materials and enroll the learner."""
+        for i in range(count):
+            course = TrainingCourse.objects.create(
+                title=f'Course {TrainingCourse.objects.count()}',
+                description='Progress course.',
+                category=self.category,
+                instructor='Instructor',
+                duration_hours=2,
+                learning_outcomes='Outcomes.',
+            )
+            doc = TrainingMaterial.objects.create(
+                course=course, title='Doc', file_url='https://example.com/doc.pdf',
+                file_name='doc.pdf', is_required=True,
+            )
+            TrainingMaterial.objects.create(
+                course=course, title='Slides', file_url='https://example.com/slides.pdf',
+                file_name='slides.pdf', is_required=True,
+            )
+            quiz_material = TrainingMaterial.objects.create(
+                course=course, title='Quiz', material_type='quiz', file_url='',
+                file_name='quiz.json', is_required=True,
+            )
+            Quiz.objects.create(material=quiz_material, title='Quiz', is_published=False)
+            enrollment = Enrollment.objects.create(user=self.user, course=course, status='enrolled')
+            enrollment.completed_materials.add(doc)
+
+    def test_with_progress_counts_exclude_unpublished_quizzes(self):
+        """Unpublished quizzes are required but not counted as available."""
+        self._enroll_in_new_courses(1)
+        enrollment = with_progress(Enrollment.objects.filter(user=self.user)).get()
+
+        self.assertEqual(enrollment.required_materials, 3)
+        self.assertEqual(enrollment.available_materials, 2)
+        self.assertEqual(enrollment.completed_available, 1)
+        self.assertEqual(completion_rate(enrollment), 50)
+
+    def test_my_training_query_count_is_flat(self):
+        """my_training issues the same number of queries for 2 or 10 enrollments."""
+        self._enroll_in_new_courses(2)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(reverse('dashboard:my_training'))
+        self.assertEqual(response.status_code, 200)
+
+        self._enroll_in_new_courses(8)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('dashboard:my_training'))
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertTrue(all(e.completion_rate == 50 for e in response.context['active_enrollments']))
+
+    def test_user_dashboard_query_count_is_flat(self):
+        """user_dashboard progress does not scale with the number of enrollments."""
+        self._enroll_in_new_courses(1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('dashboard:user_dashboard'))
+
+        self._enroll_in_new_courses(4)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('dashboard:user_dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_counters_follow_completions_and_quiz_publishing(self):
+        """Counters are maintained on completion changes and quiz publish/unpublish."""
+        self._enroll_in_new_courses(1)
+        enrollment = Enrollment.objects.get(user=self.user)
+        self.assertEqual((enrollment.completed_required_count, enrollment.required_count), (1, 2))
+
+        quiz = Quiz.objects.get(material__course=enrollment.course)
+        quiz.is_published = True
+        quiz.save()
+        enrollment.completed_materials.add(quiz.material)
+        enrollment.refresh_progress_counters()
+        self.assertEqual((enrollment.completed_required_count, enrollment.required_count), (2, 3))
+
+        enrollment.completed_materials.clear()
+        enrollment.refresh_progress_counters()
+        self.assertEqual(enrollment.get_completion_rate(), 0)
+
+    def test_recompute_progress_repairs_drift(self):
+        """recompute_progress restores counters changed behind the signals' back."""
+        self._enroll_in_new_courses(2)
+        Enrollment.objects.update(required_count=0, completed_required_count=7)
+
+        call_command('recompute_progress', stdout=StringIO())
+
+        for enrollment in Enrollment.objects.all():
+            self.assertEqual((enrollment.completed_required_count, enrollment.required_count), (1, 2))
+
+    def test_courses_without_required_materials_track_all_materials(self):
+        """With nothing required, progress is the share of all materials, as before the counters."""
+        course = TrainingCourse.objects.create(
+            title='Optional Course', description='d', instructor='i', duration_hours=1, learning_outcomes='o',
+        )
+        first, second = [
+            TrainingMaterial.objects.create(
+                course=course, title=f'Doc {i}', file_url='https://example.com/doc.pdf', file_name='doc.pdf',
+            )
+            for i in range(2)
+        ]
+        enrollment = Enrollment.objects.create(user=self.user, course=course, status='enrolled')
+
+        self.client.post(reverse('dashboard:mark_material_complete', args=[enrollment.id, first.id]))
+        enrollment.refresh_from_db()
+        self.assertEqual((enrollment.progress_percentage, enrollment.status), (50, 'enrolled'))
+
+        self.client.post(reverse('dashboard:mark_material_complete', args=[enrollment.id, second.id]))
+        enrollment.refresh_from_db()
+        self.assertEqual((enrollment.progress_percentage, enrollment.status), (100, 'completed'))
+        self.assertTrue(Certificate.objects.filter(enrollment=enrollment).exists())
+
+
+class NotificationFanOutTests(TestCase):
+
+    def setUp(self):
+        """Create recipients, one of whom has announcements turned off."""
+        for i in range(5):
+            User.objects.create_user(username=f'recipient{i}', password='password')
+        NotificationPreference.objects.create(
+            user=User.objects.get(username='recipient0'),
+            notify_on_announcement=False,
+        )
+
+    def test_notify_users_respects_preferences(self):
+        """Users who disabled a notification type are skipped."""
+        result = notify_users(User.objects.all(), 'announcement', title='New Course', message='Check it out')
+
+        self.assertEqual(result['created'], 4)
+        self.assertEqual(result['skipped'], 1)
+        self.assertFalse(Notification.objects.filter(user__username='recipient0').exists())
+
+    def test_system_notifications_ignore_preferences(self):
+        """System notifications are delivered to everyone."""
+        result = notify_users(User.objects.all(), 'system', title='Maintenance', message='Tonight')
+        self.assertEqual(result['created'], 5)
+
+    def test_notify_users_query_count_is_constant(self):
+        """Fan-out cost does not grow with the number of recipients."""
+        with CaptureQueriesContext(connection) as small:
+            notify_users(User.objects.all(), 'announcement', title='A', message='A', batch_size=1000)
+
+        for i in range(5, 50):
+            User.objects.create_user(username=f'recipient{i}', password='password')
+        with CaptureQueriesContext(connection) as large:
+            notify_users(User.objects.all(), 'announcement', title='B', message='B', batch_size=1000)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+class BackgroundJobTests(TestCase):
+
+    def test_enrollment_email_is_queued_not_sent(self):
+        """Enrollment notifications enqueue the email instead of sending it inline."""
+        user = User.objects.create_user(username='jobuser', email='jobuser@example.com', password='password')
+        course = TrainingCourse.objects.create(
+            title='Queued Course', description='d', instructor='i',
+            duration_hours=1, learning_outcomes='o',
+        )
+        enrollment = Enrollment.objects.create(user=user, course=course, status='enrolled')
+
+        Notification.create_enrollment_notification(enrollment)
+
+        self.assertEqual(len(mail.outbox), 0)
+        job = BackgroundJob.objects.get(task='send_email')
+        self.assertEqual(job.payload['recipient_list'], ['jobuser@example.com'])
+
+    def test_run_worker_sends_queued_email(self):
+        """run_worker --once drains due jobs."""
+        enqueue_email('ProTrack: Hi', 'Body', ['a@example.com'])
+
+        call_command('run_worker', '--once', '--concurrency', '1', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(BackgroundJob.objects.get().status, 'succeeded')
+
+    def test_failed_job_retries_with_backoff_then_dies(self):
+        """Failing jobs are rescheduled and dead-lettered after max_attempts."""
+        job = enqueue_email('ProTrack: Hi', 'Body', ['a@example.com'])
+        job.max_attempts = 2
+        job.save()
+
+        with mock.patch('dashboard.jobs.send_mail', side_effect=ConnectionError('smtp down')):
+            self.assertEqual(run_job(claim_jobs(1)[0]), 'failed')
+            job.refresh_from_db()
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertEqual(claim_jobs(1), [])  # not due yet
+
+            BackgroundJob.objects.update(run_after=timezone.now())
+            self.assertEqual(run_job(claim_jobs(1)[0]), 'dead')
+
+        job.refresh_from_db()
+        self.assertIn('smtp down', job.last_error)
+
+    def test_stale_running_jobs_count_an_attempt(self):
+        """A job whose worker keeps dying is requeued until max_attempts, then dead-lettered."""
+        job = enqueue_email('ProTrack: Hi', 'Body', ['a@example.com'])
+        job.max_attempts = 2
+        job.save()
+
+        for expected_status, expected_requeued in (('failed', 1), ('dead', 0)):
+            claim_jobs(1)
+            BackgroundJob.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(requeue_stale_jobs(timedelta(minutes=10)), expected_requeued)
+            job.refresh_from_db()
+            self.assertEqual(job.status, expected_status)
+
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unique_on_reuses_queued_job(self):
+        """A job with the same unique payload values is reused while it is still queued."""
+        first = enqueue('send_email', unique_on=['subject'], subject='A', message='m', recipient_list=['a@example.com'])
+        again = enqueue('send_email', unique_on=['subject'], subject='A', message='m', recipient_list=['a@example.com'])
+        other = enqueue('send_email', unique_on=['subject'], subject='B', message='m', recipient_list=['a@example.com'])
+
+        self.assertEqual(again, first)
+        self.assertNotEqual(other, first)
+
+        BackgroundJob.objects.filter(id=first.id).update(status='succeeded')
+        self.assertNotEqual(
+            enqueue('send_email', unique_on=['subject'], subject='A', message='m', recipient_list=['a@example.com']),
+            first,
+        )
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+class JobHeartbeatTests(TransactionTestCase):
+
+    def test_running_job_is_not_requeued_while_it_heartbeats(self):
+        """A long job keeps its row fresh, so the stale sweep leaves it running."""
+        job = enqueue_email('ProTrack: Hi', 'Body', ['a@example.com'])
+        claim_jobs(1)
+        BackgroundJob.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+        with heartbeat(job.id, interval=0.05):
+            sleep(0.3)
+
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=10)), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+        self.assertEqual(job.attempts, 0)
+
+
+class SupabaseClientTests(TestCase):
+
+    def test_storage_clients_are_shared(self):
+        """Helpers reuse one storage client per key type and one pooled session."""
+        self.assertIs(get_storage(use_service_key=True), get_storage(use_service_key=True))
+        self.assertIs(get_storage(use_service_key=True).session, get_storage(use_service_key=False).session)
+
+        adapter = get_http_session().get_adapter('https://example.supabase.co')
+        self.assertGreater(adapter.max_retries.total, 0)
+
+    def test_upload_uses_pooled_session(self):
+        """Uploads go through the shared session with the configured timeouts."""
+        storage = SupabaseStorage(use_service_key=True)
+        storage.supabase_url = 'https://example.supabase.co'
+        storage.supabase_key = 'key'
+        storage.storage_url = f"{storage.supabase_url}/storage/v1"
+        self.assertIs(storage.session, get_http_session())
+        response = mock.Mock(status_code=200)
+
+        with mock.patch.object(storage.session, 'post', return_value=response) as post:
+            success, url, error = storage.upload_file(BytesIO(b'%PDF'), 'Uploadfiles', 'certificates/x.pdf')
+
+        self.assertTrue(success)
+        self.assertEqual(post.call_args.kwargs['timeout'], storage.timeout)
+
+
+class FakeDownload:
+    """Minimal stand-in for a streamed requests.Response."""
+
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+class MaterialBundleTests(TestCase):
+
+    def setUp(self):
+        """Enroll a learner in a course with two downloadable materials and one broken link."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='bundler', password='password')
+        self.client.login(username='bundler', password='password')
+        self.course = TrainingCourse.objects.create(
+            title='Bundle Course', description='d', instructor='i',
+            duration_hours=1, learning_outcomes='o',
+        )
+        Enrollment.objects.create(user=self.user, course=self.course, status='enrolled')
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = Path(cache_dir.name)
+        cache_settings = override_settings(MATERIAL_BUNDLE_CACHE_DIR=cache_dir.name)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        self.bodies = {
+            'https://files.example.com/a.pdf': b'A' * 300000,
+            'https://files.example.com/b.mp4': b'B' * 1000,
+        }
+        for url in [*self.bodies, 'https://files.example.com/missing.pdf']:
+            TrainingMaterial.objects.create(
+                course=self.course, title=url, file_url=url, file_name=url.rsplit('/', 1)[1],
+            )
+
+    def _fake_get(self, url, **kwargs):
+        if url in self.bodies:
+            return FakeDownload(self.bodies[url])
+        return FakeDownload(b'', status_code=404)
+
+    def test_download_all_materials_streams_a_valid_zip(self):
+        """The bundle is streamed and skips materials that fail to download."""
+        with mock.patch('dashboard.downloads.get_http_session') as session:
+            session.return_value.get.side_effect = self._fake_get
+            response = self.client.get(reverse('dashboard:download_all_materials', args=[self.course.id]))
+            self.assertTrue(response.streaming)
+            content = b''.join(response.streaming_content)
+
+        self.assertIn('attachment', response['Content-Disposition'])
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            self.assertEqual(sorted(archive.namelist()), ['a.pdf', 'b.mp4'])
+            self.assertEqual(archive.read('a.pdf'), self.bodies['https://files.example.com/a.pdf'])
+        # An incomplete bundle is never cached
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+    def test_unchanged_course_is_served_from_cached_bundle(self):
+        """A complete bundle is cached; it is rebuilt once the materials change."""
+        TrainingMaterial.objects.filter(file_name='missing.pdf').delete()
+        url = reverse('dashboard:download_all_materials', args=[self.course.id])
+
+        with mock.patch('dashboard.downloads.get_http_session') as session:
+            session.return_value.get.side_effect = self._fake_get
+            first = b''.join(self.client.get(url).streaming_content)
+            self.assertEqual(session.return_value.get.call_count, 2)
+
+            cached = self.client.get(url)
+            self.assertIsInstance(cached, FileResponse)
+            self.assertEqual(b''.join(cached.streaming_content), first)
+            self.assertEqual(session.return_value.get.call_count, 2)
+
+            TrainingMaterial.objects.filter(file_name='b.mp4').update(file_size=1000)
+            rebuilt = self.client.get(url)
+            self.assertNotIsInstance(rebuilt, FileResponse)
+            b''.join(rebuilt.streaming_content)
+            self.assertEqual(session.return_value.get.call_count, 4)
+
+        # The stale bundle for the course was replaced, not kept alongside
+        self.assertEqual(len(list(self.cache_dir.glob('*.zip'))), 1)
+
+
+class CertificateRenderTests(TestCase):
+
+    def setUp(self):
+        self.contexts = [
+            {
+                'user_name': f'Learner {i}', 'course_title': 'Safety Basics', 'duration_hours': '4',
+                'instructor': 'Ina', 'issued_by': 'Admin', 'issue_date': 'January 01, 2026',
+                'certificate_number': f'CERT-TEST-{i}',
+            }
+            for i in range(3)
+        ]
+
+    def test_batch_renders_one_pdf_per_context(self):
+        """A batch stamps each certificate's details onto its own background."""
+        with mock.patch('reportlab.rl_config.pageCompression', 0):
+            pdfs = certificates.render_certificates(self.contexts)
+
+        self.assertEqual(len(pdfs), len(self.contexts))
+        for context, pdf in zip(self.contexts, pdfs):
+            self.assertTrue(pdf.startswith(b'%PDF'))
+            self.assertIn(b'CERTIFICATE', pdf)
+            self.assertIn(context['certificate_number'].encode(), pdf)
+
+    def test_rendered_pdf_matches_drawing_it(self):
+        """render_certificate_pdf is exactly the background followed by the details."""
+        with mock.patch('reportlab.rl_config.invariant', 1):
+            cached = certificates.render_certificate_pdf(self.contexts[0])
+
+            buffer = BytesIO()
+            c = certificates.canvas.Canvas(buffer, pagesize=certificates.PAGE_SIZE)
+            c.saveState()
+            certificates.draw_background(c)
+            c.restoreState()
+            certificates.draw_details(c, self.contexts[0])
+            c.save()
+
+        self.assertEqual(cached, buffer.getvalue())
+
+
+class BulkCertificateIssueTests(TestCase):
+
+    def setUp(self):
+        """Three learners with draft certificates for one course."""
+        self.admin = User.objects.create_superuser(username='issuer', password='password')
+        course = TrainingCourse.objects.create(
+            title='Issued Course', description='d', instructor='i',
+            duration_hours=2, learning_outcomes='o',
+        )
+        self.certificates = []
+        for i in range(3):
+            learner = User.objects.create_user(username=f'learner{i}', password='password')
+            enrollment = Enrollment.objects.create(user=learner, course=course, status='completed')
+            self.certificates.append(Certificate.objects.create(
+                enrollment=enrollment, certificate_number=f'CERT-BULK-{i}',
+            ))
+
+    def _fake_upload(self, enrollment_id, pdf_file):
+        if enrollment_id == self.certificates[1].enrollment_id:
+            return False, None, 'bucket unavailable'
+        self.assertTrue(pdf_file.getvalue().startswith(b'%PDF'))
+        return True, f'https://files.example.com/{enrollment_id}.pdf', None
+
+    def test_command_issues_drafts_and_leaves_failures_pending(self):
+        """Uploaded certificates are issued and notified; failed uploads stay draft."""
+        out = StringIO()
+        with mock.patch('dashboard.certificate_issuing.upload_certificate', side_effect=self._fake_upload):
+            call_command(
+                'issue_certificates', '--issued-by', 'issuer', '--processes', '1', '--batch-size', '2',
+                stdout=out,
+            )
+
+        statuses = dict(Certificate.objects.values_list('certificate_number', 'status'))
+        self.assertEqual(statuses, {'CERT-BULK-0': 'issued', 'CERT-BULK-1': 'draft', 'CERT-BULK-2': 'issued'})
+        issued = Certificate.objects.get(certificate_number='CERT-BULK-0')
+        self.assertEqual(issued.issued_by, self.admin)
+        self.assertTrue(issued.certificate_url.endswith(f'{issued.enrollment_id}.pdf'))
+        self.assertEqual(Notification.objects.filter(notification_type='certificate').count(), 2)
+        self.assertIn('Issued 2 certificate(s), 1 failed', out.getvalue())
+
+    def test_render_processes_are_spawned_and_report_is_dropped(self):
+        """Render processes are spawned (safe from threads); bulk_update skips post_save, so
+        the cached report is invalidated explicitly."""
+        cache.set(REPORT_CACHE_KEY, {'stale': True})
+        get_context = multiprocessing.get_context
+        with mock.patch('dashboard.certificate_issuing.upload_certificate', side_effect=self._fake_upload), \
+                mock.patch('dashboard.certificate_issuing.multiprocessing.get_context', wraps=get_context) as context:
+            result = issue_certificates(Certificate.objects.all(), processes=2)
+
+        self.assertEqual((result['issued'], result['failed']), (2, 1))
+        context.assert_called_once_with('spawn')
+        self.assertIsNone(cache.get(REPORT_CACHE_KEY))
+
+    @override_settings(JOB_QUEUE_EAGER=False)
+    def test_approving_twice_queues_one_job(self):
+        """A double-submitted approval does not issue the certificate twice."""
+        self.client.login(username='issuer', password='password')
+        url = reverse('dashboard:approve_certificate', args=[self.certificates[0].id])
+
+        self.client.post(url, {'expiry_date': ''})
+        self.client.post(url, {'expiry_date': ''})
+
+        self.assertEqual(BackgroundJob.objects.filter(task='issue_certificate').count(), 1)
+
+    @override_settings(JOB_QUEUE_EAGER=False)
+    def test_bulk_approve_queues_one_job(self):
+        """The certifications page approves the selected drafts in a single job."""
+        self.client.login(username='issuer', password='password')
+        selected = [self.certificates[0].id, self.certificates[2].id]
+
+        response = self.client.post(reverse('dashboard:bulk_approve_certificates'), {
+            'certificate_ids': selected, 'expiry_date': '2030-01-01',
+        })
+
+        self.assertRedirects(response, reverse('dashboard:certifications'), fetch_redirect_response=False)
+        job = BackgroundJob.objects.get(task='issue_certificates')
+        self.assertEqual(sorted(job.payload['certificate_ids']), selected)
+        self.assertEqual(Certificate.objects.filter(expiry_date=date(2030, 1, 1)).count(), 2)
+
+
+class NotificationDeliveryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='listener', password='password')
+        Notification.objects.create(
+            user=self.user, notification_type='system', title='Welcome', message='m',
+        )
+
+    def test_notifications_api_supports_conditional_get(self):
+        """Polling with the ETag returns 304 until the feed changes."""
+        self.client.login(username='listener', password='password')
+        url = reverse('dashboard:notifications_api')
+
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['unread_count'], 1)
+        self.assertIn('no-cache', first['Cache-Control'])
+        # reads and deletes leave no timestamp, so only the ETag validates
+        self.assertNotIn('Last-Modified', first)
+
+        with CaptureQueriesContext(connection) as queries:
+            unchanged = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertFalse(any('LIMIT 20' in q['sql'] for q in queries.captured_queries))
+
+        self.client.post(reverse('dashboard:mark_all_read'))
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['unread_count'], 0)
+
+    def test_stream_is_disabled_by_default(self):
+        """Without an ASGI deployment the stream tells EventSource to stop."""
+        self.client.login(username='listener', password='password')
+        response = self.client.get(reverse('dashboard:notifications_stream'))
+        self.assertEqual(response.status_code, 204)
+
+    @override_settings(NOTIFICATION_STREAM_ENABLED=True, NOTIFICATION_STREAM_MAX_SECONDS=5)
+    async def test_stream_pushes_new_notifications(self):
+        """The stream sends the feed, then pushes again when a notification is created."""
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.user)
+
+        with mock.patch('dashboard.views.STREAM_CHECK_SECONDS', 0.01):
+            response = await client.get(reverse('dashboard:notifications_stream'))
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            events = aiter(response.streaming_content)
+
+            self.assertTrue((await anext(events)).startswith(b'retry:'))
+            first = json.loads((await anext(events)).split(b'data: ', 1)[1])
+            self.assertEqual([n['title'] for n in first['notifications']], ['Welcome'])
+
+            await sync_to_async(notify_users)(
+                User.objects.filter(pk=self.user.pk), 'system', 'Pushed', 'm',
+            )
+            pushed = json.loads((await anext(events)).split(b'data: ', 1)[1])
+            await events.aclose()
+
+        self.assertEqual(pushed['unread_count'], 2)
+        self.assertEqual(pushed['notifications'][0]['title'], 'Pushed')
+
+
+@override_settings(CACHE_SHARED=True)
+class UnreadCounterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='counter', password='password')
+        self.client.login(username='counter', password='password')
+        for notification_type in ['system', 'system', 'reminder']:
+            Notification.objects.create(
+                user=self.user, notification_type=notification_type, title='t', message='m',
+            )
+
+    def test_cold_cache_is_reconciled_once(self):
+        """A cold counter is rebuilt with one grouped query, then served from cache."""
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(self.user.id), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.user.id, ['reminder']), 1)
+
+    def test_counter_follows_create_read_and_delete(self):
+        """Creation (single and bulk), reads and deletes adjust the warm counter."""
+        self.assertEqual(unread_count(self.user.id), 3)
+
+        notify_users(User.objects.filter(pk=self.user.pk), 'announcement', 'News', 'm')
+        Notification.objects.create(user=self.user, notification_type='system', title='t', message='m')
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.user.id), 5)
+
+        first, second = Notification.objects.filter(user=self.user, notification_type='system')[:2]
+        self.client.post(reverse('dashboard:mark_notification_read', args=[first.id]))
+        self.client.post(reverse('dashboard:delete_notification', args=[second.id]))
+        self.assertEqual(unread_count(self.user.id), 3)
+        self.assertEqual(unread_count(self.user.id), Notification.objects.filter(user=self.user, is_read=False).count())
+
+        self.client.post(reverse('dashboard:mark_all_read'))
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.user.id), 0)
+
+    def test_bulk_create_keeps_counters_and_stamps(self):
+        """Mixed bulk inserts adjust each user's counters per type and touch their stamps."""
+        other = User.objects.create_user(username='other-counter', password='password')
+        self.assertEqual(unread_count(self.user.id), 3)
+        self.assertEqual(unread_count(other.id), 0)
+
+        bulk_create_notifications([
+            Notification(user=self.user, notification_type='reminder', title='t', message='m'),
+            Notification(user=self.user, notification_type='reminder', title='t', message='m'),
+            Notification(user=self.user, notification_type='system', title='t', message='m', is_read=True),
+            Notification(user=other, notification_type='reminder', title='t', message='m'),
+        ])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.user.id, ['reminder']), 3)
+            self.assertEqual(unread_count(self.user.id, ['system']), 2)
+            self.assertEqual(unread_count(other.id), 1)
+        self.assertIsNotNone(cache.get(STAMP_KEY.format(other.id)))
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_counts_in_database(self):
+        """Without a shared cache, changes made by other processes are always seen."""
+        self.assertEqual(unread_count(self.user.id), 3)
+        self.assertEqual(cache.get_many(['notifications:unread:{}:system'.format(self.user.id)]), {})
+
+        # e.g. another worker marking everything read
+        Notification.objects.filter(user=self.user).update(is_read=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(self.user.id, ['system']), 0)
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the hot query shapes and fail if one falls back to a full table scan.
+
+    Runs against whichever database is configured (SQLite locally, PostgreSQL
+    when DB_HOST is set). On PostgreSQL sequential scans are disabled for the
+    check, since the planner prefers them on tiny test tables anyway.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner', password='password')
+        self.course = TrainingCourse.objects.create(
+            title='Planned Course', description='d', instructor='i',
+            duration_hours=1, learning_outcomes='o',
+        )
+
+    def hot_queries(self):
+        today = timezone.now().date()
+        types = ['system', 'reminder']
+        return {
+            'notification feed': Notification.objects.filter(
+                user=self.user, notification_type__in=types
+            ).order_by('-created_at')[:20],
+            'unread notification counts': Notification.objects.filter(
+                user=self.user, is_read=False
+            ).values('notification_type').annotate(total=Count('id')),
+            'enrollments by user and status': Enrollment.objects.filter(
+                user=self.user, status__in=['enrolled', 'in_progress']
+            ),
+            'enrollments by course and status': Enrollment.objects.filter(
+                course=self.course, status__in=['enrolled', 'in_progress']
+            ),
+            'pending certificates': Certificate.objects.filter(status='draft').order_by('-issue_date'),
+            'due calendar reminders': CalendarEvent.objects.filter(
+                reminder_sent=False, remind_at__lte=timezone.now()
+            ),
+            'next calendar reminder': pending_reminders().order_by('remind_at')[:1],
+            'training sessions in window': TrainingSession.objects.filter(
+                end_date__gte=today, start_date__lt=today + timedelta(days=42)
+            ),
+            'calendar window': CalendarEvent.objects.filter(
+                user=self.user, event_date__range=(today, today + timedelta(days=31))
+            ),
+        }
+
+    def full_scans(self, plan):
+        if connection.vendor == 'postgresql':
+            return [line for line in plan.splitlines() if 'Seq Scan' in line]
+        # SQLite: "SCAN <table>" without an index is a full table scan
+        return [
+            line for line in plan.splitlines()
+            if re.search(r'\bSCAN \w+$', line.strip()) and 'dashboard_' in line
+        ]
+
+    def test_hot_queries_use_indexes(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                for name, queryset in self.hot_queries().items():
+                    with self.subTest(query=name):
+                        plan = queryset.explain()
+                        self.assertEqual(self.full_scans(plan), [], f"{name}:\n{plan}")
+            finally:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('RESET enable_seqscan')
+
+
+@override_settings(CACHE_SHARED=True)
+class ReportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='reporter', password='password')
+        self.client.login(username='reporter', password='password')
+        self.course = TrainingCourse.objects.create(
+            title='Reported Course', description='d', instructor='i',
+            duration_hours=1, learning_outcomes='o',
+        )
+        for i, status in enumerate(['completed', 'completed', 'in_progress']):
+            learner = User.objects.create_user(username=f'reported{i}', password='password')
+            Enrollment.objects.create(user=learner, course=self.course, status=status, score=80 + i)
+
+    def test_report_is_cached_until_enrollments_change(self):
+        """The second page view is served from cache; an enrollment write invalidates it."""
+        response = self.client.get(reverse('dashboard:reports'))
+        self.assertEqual(response.context['total_enrollments'], 3)
+        self.assertEqual(response.context['completed_enrollments'], 2)
+        self.assertEqual(response.context['overall_completion_rate'], 66.7)
+        self.assertEqual(
+            response.context['monthly_enrollments'],
+            [{'month': timezone.now().strftime('%Y-%m'), 'count': 3}],
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('dashboard:reports'))
+        self.assertFalse(any('dashboard_enrollment' in q['sql'] for q in queries.captured_queries))
+
+        learner = User.objects.create_user(username='latecomer', password='password')
+        Enrollment.objects.create(user=learner, course=self.course, status='enrolled')
+        response = self.client.get(reverse('dashboard:reports'))
+        self.assertEqual(response.context['total_enrollments'], 4)
+        self.assertEqual(response.context['active_enrollments'], 2)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_is_not_used(self):
+        """Without a shared cache, writes made by other processes show up on the next view."""
+        self.client.get(reverse('dashboard:reports'))
+        self.assertIsNone(cache.get(REPORT_CACHE_KEY))
+
+        # e.g. another worker changing enrollments; its invalidation never reaches this cache
+        Enrollment.objects.update(status='completed')
+        response = self.client.get(reverse('dashboard:reports'))
+        self.assertEqual(response.context['completed_enrollments'], 3)
+
+
+class ReportSnapshotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = TrainingCategory.objects.create(name='Snapshots')
+        self.courses = [
+            TrainingCourse.objects.create(
+                title=f'Snapshot Course {i}', description='d', instructor='i',
+                duration_hours=1, learning_outcomes='o', category=self.category,
+            )
+            for i in range(2)
+        ]
+        self.learner = User.objects.create_user(username='snapper', password='password', program='BSIT')
+        self.today = timezone.localdate()
+        Enrollment.objects.create(
+            user=self.learner, course=self.courses[0], status='completed', score=90, completion_date=self.today,
+        )
+        Enrollment.objects.create(user=self.learner, course=self.courses[1], status='in_progress')
+
+    def test_incremental_run_only_recomputes_changed_courses(self):
+        """A second run carries untouched course rows forward and recomputes the rest."""
+        run = build_snapshots(self.today - timedelta(days=1))
+        self.assertTrue(run.full)
+        self.assertEqual(run.enrollments_processed, 2)
+
+        other = User.objects.create_user(username='snapper2', password='password', program='BSIT')
+        Enrollment.objects.create(
+            user=other, course=self.courses[0], status='completed', score=70, completion_date=self.today,
+        )
+        run = build_snapshots(self.today)
+        self.assertFalse(run.full)
+        self.assertEqual(run.enrollments_processed, 1)
+
+        today = {s.course_id: s for s in CourseSnapshot.objects.filter(snapshot_date=self.today)}
+        self.assertEqual(today[self.courses[0].id].enrollments, 2)
+        self.assertEqual(today[self.courses[0].id].avg_score, 80)
+        self.assertEqual(today[self.courses[1].id].active, 1)
+        self.assertEqual(CourseSnapshot.objects.filter(snapshot_date=self.today - timedelta(days=1)).count(), 2)
+
+        category = CategorySnapshot.objects.get(snapshot_date=self.today, category=self.category)
+        self.assertEqual((category.courses, category.enrollments, category.completed), (2, 3, 2))
+        program = ProgramSnapshot.objects.get(snapshot_date=self.today, program='BSIT')
+        self.assertEqual((program.users, program.enrollments, program.completed), (2, 3, 2))
+        month = MonthlySnapshot.objects.get(month=self.today.replace(day=1))
+        self.assertEqual((month.enrollments, month.completions), (3, 2))
+
+    def test_incremental_run_drops_deleted_courses(self):
+        """A course deleted between runs leaves no row (or category total) in the new snapshot."""
+        build_snapshots(self.today - timedelta(days=1))
+        self.courses[1].delete()
+
+        build_snapshots(self.today)
+
+        self.assertEqual(
+            list(CourseSnapshot.objects.filter(snapshot_date=self.today).values_list('course_id', flat=True)),
+            [self.courses[0].id],
+        )
+        category = CategorySnapshot.objects.get(snapshot_date=self.today, category=self.category)
+        self.assertEqual((category.courses, category.enrollments), (1, 1))
+
+    def test_reports_page_reads_snapshots(self):
+        call_command('build_report_snapshots', stdout=StringIO())
+        User.objects.create_superuser(username='snapadmin', password='password')
+        self.client.login(username='snapadmin', password='password')
+
+        response = self.client.get(reverse('dashboard:reports'))
+        self.assertEqual(response.context['snapshot_date'], self.today)
+        self.assertEqual(response.context['program_stats'][0]['program'], 'BSIT')
+        self.assertEqual(response.context['enrollment_trend'], [{'date': self.today, 'enrollments': 2, 'completed': 1}])
+        self.assertContains(response, 'Programs')
+
+        # Every snapshot-backed section says when it was built
+        as_of = timezone.localtime(SnapshotRun.objects.get().finished_at).strftime('%b %d, %Y %H:%M')
+        self.assertEqual(response.context['snapshot_as_of'], SnapshotRun.objects.get().finished_at)
+        self.assertContains(response, f'as of {as_of}', count=4)
+
+
+class ReportExportTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='exporter', password='password')
+        self.client.login(username='exporter', password='password')
+        course = TrainingCourse.objects.create(
+            title='Exported Course', description='d', instructor='i',
+            duration_hours=1, learning_outcomes='o',
+        )
+        for i, status in enumerate(['completed', 'in_progress']):
+            learner = User.objects.create_user(username=f'=exported{i}', password='password')
+            Enrollment.objects.create(user=learner, course=course, status=status, score=80 + i)
+
+    def download(self, report, file_format):
+        response = self.client.get(reverse('dashboard:export_report', args=[report, file_format]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        return b''.join(response.streaming_content)
+
+    def test_csv_exports(self):
+        rows = list(csv.reader(StringIO(self.download('courses', 'csv').decode('utf-8-sig'))))
+        self.assertEqual(rows[0][:2], ['Course ID', 'Course'])
+        self.assertEqual(rows[1][1:], ['Exported Course', '', 'i', 'active', '2', '1', '1', '50.0', '80.50'])
+
+        rows = list(csv.reader(StringIO(self.download('enrollments', 'csv').decode('utf-8-sig'))))
+        self.assertEqual(len(rows), 3)
+        # Formula-like text is neutralised for spreadsheet apps
+        self.assertEqual(rows[1][1], "'=exported0")
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        data = self.download('user-progress', 'xlsx')
+        with zipfile.ZipFile(BytesIO(data)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+            self.assertIn('[Content_Types].xml', workbook.namelist())
+        self.assertEqual(sheet.count('<row>'), 3)
+        self.assertIn('=exported1', sheet)
+
+    def test_export_requires_superuser_and_known_report(self):
+        self.assertEqual(
+            self.client.get(reverse('dashboard:export_report', args=['secrets', 'csv'])).status_code, 404
+        )
+        self.client.login(username='=exported0', password='password')
+        response = self.client.get(reverse('dashboard:export_report', args=['courses', 'csv']))
+        self.assertEqual(response.status_code, 302)
+
+
+class QuizGradingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='examinee', password='password')
+        self.client.login(username='examinee', password='password')
+        self.course = TrainingCourse.objects.create(
+            title='Graded Course', description='d', instructor='i',
+            duration_hours=1, learning_outcomes='o',
+        )
+        TrainingMaterial.objects.create(
+            course=self.course, title='Doc', file_url='https://example.com/doc.pdf',
+            file_name='doc.pdf', is_required=True,
+        )
+        material = TrainingMaterial.objects.create(
+            course=self.course, title='Exam', material_type='quiz', file_url='',
+            file_name='exam.json', is_required=True,
+        )
+        self.quiz = Quiz.objects.create(material=material, title='Exam', is_published=True, pass_mark=50)
+        self.enrollment = Enrollment.objects.create(user=self.user, course=self.course, status='enrolled')
+
+    def _add_questions(self, count):
+        """Add count multiple-choice questions; returns {question id: correct choice id}."""
+        correct = {}
+        for i in range(count):
+            question = Question.objects.create(quiz=self.quiz, text=f'Q{i}', order=i)
+            correct[question.id] = Choice.objects.create(question=question, text='right', is_correct=True).id
+            Choice.objects.create(question=question, text='wrong')
+        return correct
+
+    def _submit(self, data):
+        return self.client.post(reverse('dashboard:take_quiz', args=[self.quiz.id]), data)
+
+    def test_grades_every_question_type(self):
+        correct = self._add_questions(1)
+        (mc_id, choice_id), = correct.items()
+        foreign = Question.objects.create(quiz=Quiz.objects.create(
+            material=TrainingMaterial.objects.create(
+                course=self.course, title='Other', material_type='quiz', file_url='', file_name='o.json',
+            ), title='Other',
+        ), text='elsewhere')
+        foreign_choice = Choice.objects.create(question=foreign, text='elsewhere', is_correct=True)
+        tf = Question.objects.create(quiz=self.quiz, text='TF', question_type='true_false', correct_answer='True', order=1)
+        ident = Question.objects.create(
+            quiz=self.quiz, text='Name', question_type='identification', correct_answer=' Django ', order=2,
+        )
+        mc2 = Question.objects.create(quiz=self.quiz, text='MC2', order=3)
+        Choice.objects.create(question=mc2, text='right', is_correct=True)
+
+        response = self._submit({
+            f'question_{mc_id}': choice_id,
+            f'question_{tf.id}': 'false',
+            f'question_{ident.id}': 'django',
+            # A correct choice from another quiz does not count
+            f'question_{mc2.id}': foreign_choice.id,
+        })
+
+        self.assertEqual(response.context['score'], 2)
+        self.assertEqual(response.context['percentage_score'], 50)
+        self.assertTrue(response.context['passed'])
+        results = response.context['results']
+        self.assertEqual([r['is_correct'] for r in results], [True, False, True, False])
+        self.assertEqual(results[1]['correct_answer'], 'True')
+        self.assertEqual(results[3]['user_answer'], '')
+        attempt = response.context['attempt']
+        self.assertEqual(attempt.score, 50)
+        self.assertEqual(attempt.answers.count(), 3)
+        self.assertTrue(self.enrollment.completed_materials.filter(id=self.quiz.material_id).exists())
+
+    def test_quiz_page_lists_questions_in_grading_order(self):
+        """The form shows questions in the same order the results are graded in."""
+        for order, text in ((2, 'third'), (0, 'first'), (1, 'second')):
+            Question.objects.create(quiz=self.quiz, text=text, order=order)
+
+        response = self.client.get(reverse('dashboard:take_quiz', args=[self.quiz.id]))
+
+        self.assertEqual([q.text for q in response.context['questions']], ['first', 'second', 'third'])
+
+    def test_submission_queries_do_not_grow_with_questions(self):
+        correct = self._add_questions(3)
+        with CaptureQueriesContext(connection) as small:
+            self._submit({f'question_{q}': c for q, c in correct.items()})
+
+        correct.update(self._add_questions(30))
+        self.enrollment.completed_materials.clear()
+        with CaptureQueriesContext(connection) as large:
+            response = self._submit({f'question_{q}': c for q, c in correct.items()})
+
+        self.assertEqual(response.context['score'], 33)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_published_quiz_is_graded_without_question_queries(self):
+        """The compiled key is cached; any question or choice edit retires it."""
+        correct = self._add_questions(3)
+        self.client.get(reverse('dashboard:take_quiz', args=[self.quiz.id]))  # compiles the key
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._submit({f'question_{q}': c for q, c in correct.items()})
+        self.assertEqual(response.context['score'], 3)
+        self.assertFalse(any(
+            'dashboard_question' in q['sql'] or 'dashboard_choice' in q['sql']
+            for q in queries.captured_queries if q['sql'].startswith('SELECT')
+        ))
+
+        question_id, choice_id = next(iter(correct.items()))
+        Choice.objects.get(id=choice_id).delete()
+        Choice.objects.create(question_id=question_id, text='new right', is_correct=True)
+        response = self._submit({f'question_{q}': c for q, c in correct.items()})
+        self.assertEqual(response.context['score'], 2)
+        self.assertEqual(response.context['results'][0]['correct_answer'], 'new right')
+
+    def test_answer_key_version_lives_in_the_database(self):
+        """Edits bump the quiz row, so processes with their own cache see them too."""
+        stale = Quiz.objects.get(id=self.quiz.id)
+        version = stale.answer_key_version
+        self._add_questions(1)  # one question and two choices
+        self.assertEqual(Quiz.objects.get(id=self.quiz.id).answer_key_version, version + 3)
+
+        # Saving an instance loaded before those edits still moves the version forward
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(stale.answer_key_version, version + 4)
+        self.assertEqual(Quiz.objects.get(id=self.quiz.id).answer_key_version, version + 4)
+
+
+class QuizLoadTestCommandTests(TransactionTestCase):
+
+    def test_loadtest_reports_latency_queries_and_errors(self):
+        course = TrainingCourse.objects.create(
+            title='Real Course', description='d', instructor='i', duration_hours=1, learning_outcomes='o',
+        )
+        material = TrainingMaterial.objects.create(
+            course=course, title='Exam', material_type='quiz', file_url='', file_name='exam.json',
+        )
+        real_question = Question.objects.create(quiz=Quiz.objects.create(material=material, title='Exam'), text='Q')
+
+        out = StringIO()
+        call_command('loadtest_quiz', users=3, concurrency=1, questions=4, stdout=out)
+        output = out.getvalue()
+        self.assertRegex(output, r'POST\s+3 req\s+p50 .* p99 .* queries/req .* errors 0 \(0\.0%\)')
+        self.assertIn('6 request(s)', output)
+        # The load-test course and learners are removed afterwards; real quizzes are untouched
+        self.assertFalse(User.objects.filter(username__startswith='loadtest_').exists())
+        self.assertEqual(list(TrainingCourse.objects.all()), [course])
+        self.assertTrue(Question.objects.filter(id=real_question.id).exists())
+        self.assertFalse(Quiz.objects.get(material=material).is_published)
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_metrics()
+        User.objects.create_superuser(username='observer', password='password')
+        self.client.login(username='observer', password='password')
+
+    def test_metrics_endpoint_reports_rolling_histograms_per_view(self):
+        for _ in range(3):
+            self.client.get(reverse('dashboard:reports'))
+
+        response = self.client.get(reverse('dashboard:request_metrics'))
+        reports = response.json()['views']['dashboard:reports']
+        self.assertEqual(reports['requests'], 3)
+        self.assertEqual(reports['errors'], 0)
+        self.assertGreater(reports['queries']['max'], 0)
+        self.assertEqual(sum(b['count'] for b in reports['duration_ms']['histogram']), 3)
+        self.assertEqual(reports['duration_ms']['histogram'][-1]['le'], '+Inf')
+
+        self.client.logout()
+        response = self.client.get(reverse('dashboard:request_metrics'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_query_heavy_request_logs_repeated_sql(self):
+        """Requests over the query threshold are logged with the statements they repeated."""
+        def n_plus_one_view(request):
+            for user_id in range(3):
+                User.objects.filter(id=user_id).first()
+            return HttpResponse()
+
+        with override_settings(REQUEST_QUERY_THRESHOLD=3):
+            middleware = RequestMetricsMiddleware(n_plus_one_view)
+        with self.assertLogs('dashboard.instrumentation', 'WARNING') as logs:
+            middleware(RequestFactory().get('/noisy/'))
+        self.assertIn('Slow request GET /noisy/ (unresolved)', logs.output[0])
+        self.assertIn('3x SELECT', logs.output[0])
+        self.assertEqual(rolling_metrics()['unresolved']['queries']['p50'], 3)
+
+
+@override_settings(METRICS_TOKEN='scrape-token', METRICS_DIR='', JOB_QUEUE_EAGER=False)
+class PrometheusMetricsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create_user(username='metered', password='password')
+
+    def scrape(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requires_token_or_superuser(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        User.objects.create_superuser(username='prom', password='password')
+        self.client.login(username='prom', password='password')
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_exports_requests_notifications_and_queue_depth(self):
+        self.client.login(username='metered', password='password')
+        self.client.get(reverse('dashboard:notifications_api'))
+        Notification.objects.create(user=self.user, notification_type='reminder', title='t', message='m')
+        notify_users(User.objects.filter(id=self.user.id), 'announcement', title='t', message='m')
+        enqueue_email('Subject', 'Body', ['x@example.com'])
+
+        text = self.scrape()
+        self.assertIn('# TYPE protrack_http_requests_total counter', text)
+        self.assertIn('protrack_http_requests_total{status="2xx",view="dashboard:notifications_api"} 1', text)
+        self.assertIn(
+            'protrack_http_request_duration_seconds_bucket{view="dashboard:notifications_api",le="+Inf"} 1', text
+        )
+        self.assertIn('protrack_notifications_created_total{type="reminder"} 1', text)
+        self.assertIn('protrack_notifications_created_total{type="announcement"} 1', text)
+        self.assertIn('protrack_job_queue_depth{status="pending"} 1', text)
+
+    def test_counts_from_other_worker_files_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            metrics.inc('protrack_emails_sent_total', 2)
+            # Any running process will do as the other worker
+            Path(directory, f'{os.getppid()}.json').write_text(json.dumps({
+                'counters': [['protrack_emails_sent_total', [], 3]],
+                'histograms': [],
+            }))
+            self.assertIn('protrack_emails_sent_total 5', self.scrape())
+
+    def test_files_of_exited_workers_are_removed(self):
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            metrics.inc('protrack_emails_sent_total', 2)
+            for suffix in ('json', 'tmp'):
+                Path(directory, f'{exited.pid}.{suffix}').write_text(json.dumps({
+                    'counters': [['protrack_emails_sent_total', [], 3]],
+                    'histograms': [],
+                }))
+
+            self.assertIn('protrack_emails_sent_total 2', self.scrape())
+            self.assertEqual([path.name for path in Path(directory).iterdir()], [f'{os.getpid()}.json'])
+
+    def test_concurrent_flushes_do_not_clobber_each_other(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            metrics.inc('protrack_emails_sent_total')
+            with self.assertNoLogs('dashboard.metrics', 'WARNING'):
+                with ThreadPoolExecutor(max_workers=8) as pool:
+                    list(pool.map(lambda _: metrics.flush(), range(200)))
+            [written] = Path(directory).iterdir()
+            self.assertEqual(written.suffix, '.json')
+            self.assertIn('counters', json.loads(written.read_text()))
+
+
+class ReminderSchedulerTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(username='reminded', password='password')
+
+    def event(self, minutes_from_now, reminder_minutes=15, **kwargs):
+        when = timezone.localtime() + timedelta(minutes=minutes_from_now)
+        return CalendarEvent.objects.create(
+            user=self.user, title=f'Event in {minutes_from_now} min',
+            event_date=when.date(), event_time=when.time().replace(microsecond=0),
+            reminder_minutes=reminder_minutes, **kwargs,
+        )
+
+    def test_remind_at_is_stored_and_rescheduling_rearms_the_reminder(self):
+        event = self.event(120, reminder_minutes=60)
+        self.assertEqual(event.remind_at, event.get_reminder_datetime())
+
+        event.reminder_sent = True
+        event.save()
+        event.reminder_minutes = 30
+        event.save(update_fields=['reminder_minutes'])
+        event.refresh_from_db()
+        self.assertEqual(event.remind_at, event.get_reminder_datetime())
+        self.assertFalse(event.reminder_sent)
+
+    def test_claims_only_due_reminders_once(self):
+        due = self.event(10)
+        future = self.event(600)
+
+        self.assertEqual(claim_due_reminders(10), [due])
+        self.assertEqual(claim_due_reminders(10), [])
+        self.assertEqual(next_reminder_at(), future.remind_at)
+
+    def test_stale_claims_are_released(self):
+        due = self.event(10)
+        claim_due_reminders(10)
+        self.assertEqual(release_stale_claims(timedelta(minutes=5)), 0)
+        CalendarEvent.objects.filter(id=due.id).update(reminder_claimed_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(release_stale_claims(timedelta(minutes=5)), 1)
+        self.assertEqual(claim_due_reminders(10), [due])
+
+    def test_scheduler_sends_due_reminders_and_skips_past_events(self):
+        NotificationPreference.objects.create(user=self.user, notify_on_reminder=True, email_on_reminder=False)
+        due = self.event(10)
+        past = self.event(-30)
+        future = self.event(600)
+
+        out = StringIO()
+        with mock.patch('builtins.print'):
+            call_command('run_reminder_scheduler', '--once', stdout=out)
+
+        self.assertIn('1 sent, 1 skipped', out.getvalue())
+        for event, sent in ((due, True), (past, True), (future, False)):
+            event.refresh_from_db()
+            self.assertEqual(event.reminder_sent, sent)
+            self.assertIsNone(event.reminder_claimed_at)
+        self.assertEqual(
+            list(Notification.objects.filter(user=self.user).values_list('title', flat=True)),
+            [f'Reminder: {due.title}'],
+        )
+        self.assertEqual(metrics.collect()[0][('protrack_calendar_reminders_total', (('result', 'sent'),))], 1)
+
+
+class CalendarSubscriptionFeedTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='subscriber', password='password')
+        self.course = TrainingCourse.objects.create(
+            title='Feeds, Calendars; and More', description='d', instructor='i',
+            duration_hours=1, learning_outcomes='o',
+        )
+        Enrollment.objects.create(user=self.user, course=self.course, status='enrolled')
+        CalendarEvent.objects.create(
+            user=self.user, title='Planning', description='Agenda: ' + 'long line ' * 20,
+            event_date=timezone.localdate() + timedelta(days=3), event_time=time(9), end_time=time(10),
+        )
+        self.feed = CalendarFeed.objects.create(user=self.user)
+        self.url = reverse('dashboard:calendar_feed', args=[self.feed.token])
+
+    def test_feed_lists_enrollments_and_events(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('SUMMARY:Feeds\\, Calendars\\; and More\r\n', body)
+        self.assertIn('SUMMARY:Planning\r\n', body)
+        self.assertIn('TRIGGER:-PT15M\r\n', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_unchanged_feed_is_served_from_cache_or_as_304(self):
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get(self.url)
+            unchanged = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(len(queries.captured_queries), 2)  # one token lookup per request
+        self.assertNotIn('Last-Modified', first)
+
+        CalendarEvent.objects.create(
+            user=self.user, title='Review', event_date=timezone.localdate() + timedelta(days=4), event_time=time(14),
+        )
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn('SUMMARY:Review', changed.content.decode())
+
+    def test_changes_are_seen_by_processes_with_their_own_cache(self):
+        """The change marker is a database column, not a per-process cache entry."""
+        first = self.client.get(self.url)
+        cache.clear()  # as if the next poll reached another worker
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        CalendarEvent.objects.create(
+            user=self.user, title='Review', event_date=timezone.localdate() + timedelta(days=4), event_time=time(14),
+        )
+        CalendarEvent.objects.create(
+            user=self.user, title='Retro', event_date=timezone.localdate() + timedelta(days=4), event_time=time(15),
+        )
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertIn('SUMMARY:Retro', second.content.decode())
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_unknown_or_reset_token_is_not_found(self):
+        self.assertEqual(self.client.get(reverse('dashboard:calendar_feed', args=['nope'])).status_code, 404)
+        self.client.login(username='subscriber', password='password')
+        self.client.post(reverse('dashboard:reset_calendar_feed'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.feed.refresh_from_db()
+        self.assertEqual(
+            self.client.get(reverse('dashboard:calendar_feed', args=[self.feed.token])).status_code, 200
+        )
+
+
+class IncompleteCourseReminderTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.course = TrainingCourse.objects.create(
+            title='Unfinished Course', description='d', instructor='i', duration_hours=1, learning_outcomes='o',
+        )
+
+    def enroll(self, username, status='enrolled', **fields):
+        user = User.objects.create_user(username=username, password='password')
+        return Enrollment.objects.create(user=user, course=self.course, status=status, **fields)
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('notify_incomplete_courses', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reminds_due_enrollments_in_batches(self):
+        due = [self.enroll(f'learner{i}', progress_percentage=40) for i in range(5)]
+        stale = self.enroll('stale')
+        Enrollment.objects.filter(id=stale.id).update(enrolled_date=timezone.now() - timedelta(days=30))
+        opted_out = self.enroll('opted_out', progress_percentage=40)
+        NotificationPreference.objects.create(user=opted_out.user, notify_on_reminder=False)
+        reminded = self.enroll('reminded', progress_percentage=40)
+        Notification.objects.create(
+            user=reminded.user, notification_type='reminder', title='t', message='m', related_enrollment=reminded,
+        )
+        finished = self.enroll('finished', status='completed', progress_percentage=100)
+        Enrollment.objects.filter(id=finished.id).update(enrolled_date=timezone.now() - timedelta(days=30))
+        self.enroll('fresh')  # just enrolled, no progress yet
+
+        with CaptureQueriesContext(connection) as queries:
+            output = self.run_command('--batch-size', '2')
+
+        self.assertIn('Notified 6 users', output)
+        self.assertIn('Skipped 2', output)
+        self.assertIn('Batch 3: 2 enrollment(s)', output)
+        self.assertIn('Finished in', output)
+        self.assertEqual(
+            set(Notification.objects.filter(notification_type='reminder').exclude(user=reminded.user)
+                .values_list('related_enrollment_id', flat=True)),
+            {enrollment.id for enrollment in [*due, stale]},
+        )
+        self.assertEqual(Notification.objects.get(related_enrollment=due[0]).message.count('40%'), 1)
+        # count + per batch (select, insert) + the empty final select, whatever the volume
+        self.assertLessEqual(len(queries.captured_queries), 2 + 3 * 2 + 1)
+
+        self.assertIn('Notified 0 users', self.run_command())
+
+
+class CatalogSearchTests(TestCase):
+
+    def course(self, title, description='General training', instructor='Staff'):
+        return TrainingCourse.objects.create(
+            title=title, description=description, instructor=instructor, duration_hours=1, learning_outcomes='o',
+        )
+
+    def search(self, query):
+        return list(search_courses(TrainingCourse.objects.all(), query))
+
+    def test_title_matches_rank_first(self):
+        in_description = self.course('Office Basics', description='Includes a short python primer')
+        in_title = self.course('Python Fundamentals')
+        self.course('Welding Safety')
+
+        self.assertEqual(self.search('python'), [in_title, in_description])
+        self.assertEqual(self.search('prog'), [])
+        self.assertEqual(self.search('pyth fund'), [in_title])  # prefixes, every word required
+        self.assertEqual(self.search('  '), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        course = self.course('Networking Essentials')
+        self.assertEqual(self.search('network'), [course])
+
+        course.title = 'Cloud Essentials'
+        course.save()
+        self.assertEqual(self.search('network'), [])
+        self.assertEqual(self.search('cloud'), [course])
+
+        course.delete()
+        self.assertEqual(self.search('cloud'), [])
+
+    def test_rebuild_indexes_bulk_created_courses(self):
+        TrainingCourse.objects.bulk_create([
+            TrainingCourse(title=f'Imported Course {i}', description='d', instructor='i',
+                           duration_hours=1, learning_outcomes='o')
+            for i in range(3)
+        ])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 course(s)', out.getvalue())
+        self.assertEqual(len(self.search('imported')), 3)
+
+    @override_settings(CATALOG_SEARCH_BACKEND='basic')
+    def test_basic_backend_setting(self):
+        course = self.course('Data Analysis', instructor='Ana Reyes')
+        self.assertEqual(type(get_search_backend()).__name__, 'BasicCourseSearch')
+        self.assertEqual(self.search('reyes'), [course])
+
+    def test_catalog_view_searches(self):
+        user = User.objects.create_user(username='searcher', password='password')
+        self.client.force_login(user)
+        match = self.course('Project Management')
+        self.course('Food Handling')
+
+        response = self.client.get(reverse('dashboard:training_catalog'), {'search': 'manag'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['courses']), [match])
+        self.assertEqual(response.context['total_courses'], 1)
+
+    def test_course_queries_do_not_load_search_documents(self):
+        self.course('Plain Listing')
+        with CaptureQueriesContext(connection) as queries:
+            list(TrainingCourse.objects.all())
+            list(Enrollment.objects.select_related('course'))
+        self.assertFalse(any('vector' in q['sql'] for q in queries.captured_queries))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL full-text search')
+class PostgresCatalogSearchTests(TestCase):
+
+    def course(self, title, description='General training', instructor='Staff'):
+        return TrainingCourse.objects.create(
+            title=title, description=description, instructor=instructor, duration_hours=1, learning_outcomes='o',
+        )
+
+    def search(self, query):
+        return list(search_courses(TrainingCourse.objects.all(), query))
+
+    def test_weighted_prefix_search_on_document_table(self):
+        self.assertEqual(type(get_search_backend()).__name__, 'PostgresCourseSearch')
+        in_description = self.course('Office Basics', description='Includes a short python primer')
+        by_instructor = self.course('Automation', instructor='Python Team')
+        in_title = self.course('Python Fundamentals')
+
+        self.assertEqual(self.search('pyth'), [in_title, by_instructor, in_description])
+        self.assertEqual(self.search('pyth fund'), [in_title])
+        self.assertEqual(CourseSearchDocument.objects.count(), 3)
+
+    def test_documents_follow_saves_deletes_and_rebuilds(self):
+        course = self.course('Networking Essentials')
+        course.title = 'Cloud Essentials'
+        course.save()
+        self.assertEqual(self.search('network'), [])
+        self.assertEqual(self.search('cloud'), [course])
+
+        CourseSearchDocument.objects.all().delete()
+        self.assertEqual(rebuild_search_index(), 1)
+        self.assertEqual(self.search('cloud'), [course])
+
+        course.delete()
+        self.assertFalse(CourseSearchDocument.objects.exists())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite FTS5 index')
+class SearchIndexFlushTests(TransactionTestCase):
+
+    def test_flush_prunes_the_unmanaged_fts_table(self):
+        TrainingCourse.objects.create(
+            title='Flushed Course', description='d', instructor='i', duration_hours=1, learning_outcomes='o',
+        )
+        self.assertEqual(CourseSearchEntry.objects.count(), 1)
+
+        call_command('flush', interactive=False, verbosity=0)
+
+        self.assertEqual(CourseSearchEntry.objects.count(), 0)
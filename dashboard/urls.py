@@ -18,6 +18,7 @@ urlpatterns = [
     # Certifications
     path('certifications/', views.certifications, name='certifications'),
     path('certifications/approve/<int:certificate_id>/', views.approve_certificate, name='approve_certificate'),
+    path('certifications/approve/bulk/', views.bulk_approve_certificates, name='bulk_approve_certificates'),
     
     # My Training
     path('training/my-training/', views.my_training, name='my_training'),
@@ -42,10 +43,14 @@ urlpatterns = [
     
     # Reports (US-03)
     path('reports/', views.reports, name='reports'),
+    path('reports/export/<slug:report>.<slug:file_format>', views.export_report, name='export_report'),
+    path('api/metrics/requests/', views.request_metrics, name='request_metrics'),
     
     # Calendar (US-01A)
     path('calendar/', views.calendar, name='calendar'),
     path('api/calendar-events/', views.get_calendar_events, name='calendar_events'),
+    path('calendar/feed/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    path('calendar/feed/reset/', views.reset_calendar_feed, name='reset_calendar_feed'),
     path('api/enrollment/update-completion/', views.update_enrollment_completion, name='update_enrollment_completion'),
     
     # Calendar Event API (User-created events/tasks)
@@ -93,6 +98,7 @@ urlpatterns = [
     # Notification URLs
     path('notifications/', views.notifications_list, name='notifications_list'),
     path('api/notifications/', views.notifications_api, name='notifications_api'),
+    path('api/notifications/stream/', views.notifications_stream, name='notifications_stream'),
     path('api/notifications/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
     path('api/notifications/mark-all-read/', views.mark_all_read, name='mark_all_read'),
     path('api/notifications/<int:notification_id>/delete/', views.delete_notification, name='delete_notification'),
@@ -1,15 +1,18 @@
+import asyncio
+import hashlib
 import json
-from collections import defaultdict
 from datetime import datetime, timedelta
 import mimetypes
 import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings as django_settings  # views.settings is a view
 from django.contrib import messages
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import PasswordChangeForm
 from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
-from django.db.models import Avg, Count, F, Q, Sum
+from django.db.models import Avg, Count, F, Max, Q, Sum
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
@@ -22,7 +25,14 @@ from accounts.forms import NotificationPreferenceForm
 import os
 
 logger = logging.getLogger(__name__)
+
+# Notification stream: how often to check the cached stamp, and the longest
+# silence before a keep-alive comment is sent
+STREAM_CHECK_SECONDS = 1
+STREAM_KEEPALIVE_SECONDS = 15
+
 from .models import (
+    BackgroundJob,
     Certificate,
     Enrollment,
     Notification,
@@ -33,19 +43,32 @@ from .models import (
     Quiz,
     Question,
     Choice,
-    QuizAttempt,
-    Answer,
     TrainingSession,
     CalendarEvent,
+    CalendarFeed,
 )
 
-from django.http import JsonResponse, FileResponse, Http404
+from django.http import JsonResponse, FileResponse, Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date
+from django.utils.http import content_disposition_header
 from django.views.decorators.http import require_http_methods
 from .supabase_utils import upload_training_material, delete_training_material
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
+from .progress import apply_completion_rates
+from .notifications import (
+    get_notification_stamp, notify_users, reset_unread_counts, touch_notification_stamps, unread_count,
+)
+from .jobs import enqueue
+from .downloads import bundle_cache_path, stream_and_cache_bundle
+from .certificates import certificate_context, render_certificate_pdf
+from .reports import get_report
+from .exports import EXPORT_FORMATS, EXPORTS
+from .grading import get_answer_key, grade_submission, save_attempt
+from .search import search_courses
+from .calendar_feed import calendar_enrollments, calendar_events, calendar_sessions, feed_etag, get_feed
+from .instrumentation import rolling_metrics
+from . import metrics
 from io import BytesIO
 import uuid
 from django.http import HttpResponse
@@ -94,36 +117,8 @@ def user_dashboard(request):
     ).order_by('-enrolled_date')[:5])
     
     # Calculate completion rate for each active enrollment (same as my_training)
-    # Also sync status with progress - exclude unpublished quizzes
-    for enrollment in active_enrollments:
-        course = enrollment.course
-        
-        # Get all required materials, but exclude unpublished quizzes
-        all_required_materials = course.materials.filter(is_required=True)
-        available_materials = []
-        for mat in all_required_materials:
-            if mat.material_type == 'quiz':
-                # Only count quiz if it's published
-                if hasattr(mat, 'quiz') and mat.quiz and mat.quiz.is_published:
-                    available_materials.append(mat.id)
-            else:
-                available_materials.append(mat.id)
-        
-        total_items = len(available_materials)
-        completed_items = enrollment.completed_materials.filter(id__in=available_materials).count()
-        
-        if total_items > 0:
-            enrollment.completion_rate = round((completed_items / total_items) * 100)
-        else:
-            # Fall back to progress_percentage if no available materials
-            enrollment.completion_rate = enrollment.progress_percentage
-        
-        # Auto-sync: If progress is 100% but status is not completed, update it
-        if enrollment.completion_rate == 100 and enrollment.status not in ['completed', 'cancelled']:
-            enrollment.status = 'completed'
-            enrollment.completion_date = timezone.now().date()
-            enrollment.progress_percentage = 100
-            enrollment.save()
+    # Also sync status with progress - excludes unpublished quizzes
+    apply_completion_rates(active_enrollments)
     
     # Completed enrollments - refresh after potential status updates
     completed_enrollments = enrollments.filter(status='completed')
@@ -308,19 +303,13 @@ def create_training(request):
                 if programs:
                     recipients = recipients.filter(program__in=programs)
 
-            notified = 0
-            for u in recipients:
-                pref = NotificationPreference.objects.filter(user=u).first()
-                if pref and not getattr(pref, 'notify_on_announcement', True):
-                    continue
-                Notification.objects.create(
-                    user=u,
-                    notification_type='announcement',
-                    title=f'New Course: {course.title}',
-                    message=f'A new course "{course.title}" is now available. Check it out!',
-                    link=reverse('dashboard:course_detail', args=[course.id])
-                )
-                notified += 1
+            notify_users(
+                recipients,
+                'announcement',
+                title=f'New Course: {course.title}',
+                message=f'A new course "{course.title}" is now available. Check it out!',
+                link=reverse('dashboard:course_detail', args=[course.id]),
+            )
         except Exception as e:
             try:
                 logger.warning(f"Failed to send new course notifications: {e}")
@@ -451,11 +440,8 @@ def training_catalog(request):
         courses = courses.filter(level=level)
 
     if search_query:
-        courses = courses.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(instructor__icontains=search_query)
-        )
+        # Full-text index, best matches first
+        courses = search_courses(courses, search_query)
 
     # Get user's enrollments
     user_enrollments = Enrollment.objects.filter(
@@ -626,42 +612,11 @@ def my_training(request):
 
     all_enrollments = list(Enrollment.objects.filter(
         user=request.user
-    ).select_related('course', 'session').order_by('-enrolled_date'))
-
-    # ----------------------------------------------------
-    # FIX: Calculate completion rate for each enrollment and sync status
-    # Exclude unpublished quizzes from total count
-    # ----------------------------------------------------
-    for enrollment in all_enrollments:
-        course = enrollment.course
-
-        # Get all required materials, but exclude unpublished quizzes
-        all_required_materials = course.materials.filter(is_required=True)
-        available_materials = []
-        for mat in all_required_materials:
-            if mat.material_type == 'quiz':
-                # Only count quiz if it's published
-                if hasattr(mat, 'quiz') and mat.quiz and mat.quiz.is_published:
-                    available_materials.append(mat.id)
-            else:
-                available_materials.append(mat.id)
-        
-        total_items = len(available_materials)
-        completed_items = enrollment.completed_materials.filter(id__in=available_materials).count()
+    ).select_related('course', 'session', 'assigned_by', 'certificate').order_by('-enrolled_date'))
 
-        if total_items > 0:
-            enrollment.completion_rate = round((completed_items / total_items) * 100)
-        else:
-            # Fall back to progress_percentage if no available required materials
-            enrollment.completion_rate = enrollment.progress_percentage
-        
-        # Auto-sync: If progress is 100% but status is not completed, update it
-        if enrollment.completion_rate == 100 and enrollment.status not in ['completed', 'cancelled']:
-            enrollment.status = 'completed'
-            enrollment.completion_date = timezone.now().date()
-            enrollment.progress_percentage = 100
-            enrollment.save()
-    # ----------------------------------------------------
+    # Calculate completion rate for each enrollment and sync status
+    # (unpublished quizzes are excluded from the total count)
+    apply_completion_rates(all_enrollments)
     
     # Filter from the list (preserves completion_rate attribute)
     active_enrollments = [e for e in all_enrollments if e.status in ['enrolled', 'in_progress']]
@@ -710,16 +665,19 @@ def cancel_enrollment(request, enrollment_id):
 @login_required
 def take_quiz(request, quiz_id):
     """Take a quiz and calculate score"""
-    quiz = get_object_or_404(Quiz, id=quiz_id)
-    questions = quiz.questions.all().prefetch_related('choices')
+    quiz = get_object_or_404(Quiz.objects.select_related('material__course'), id=quiz_id)
     
     # Check if quiz is published
     if not quiz.is_published:
         messages.error(request, 'This quiz is currently being edited and is not available yet.')
         return redirect('dashboard:course_detail', course_id=quiz.material.course.id)
     
+    # Compiled questions and choices, cached while the quiz is published; grading
+    # and the results page both work from this key (see dashboard.grading)
+    answer_key = get_answer_key(quiz)
+    
     # Check if quiz has questions
-    if not questions.exists():
+    if not answer_key:
         messages.error(request, 'This quiz has no questions configured yet.')
         return redirect('dashboard:course_detail', course_id=quiz.material.course.id)
     
@@ -732,72 +690,13 @@ def take_quiz(request, quiz_id):
     )
     
     if request.method == 'POST':
-        score = 0
-        total_questions = questions.count()
-        
-        if total_questions == 0:
-            messages.error(request, 'This quiz has no questions.')
-            return redirect('dashboard:course_detail', course_id=quiz.material.course.id)
-        
-        # Create quiz attempt
-        quiz_attempt = QuizAttempt.objects.create(
-            enrollment=enrollment,
-            quiz=quiz,
-            score=0  # Will update after calculation
-        )
+        graded = grade_submission(answer_key, request.POST)
+        score = graded['score']
+        total_questions = graded['total']
+        percentage_score = graded['percentage']
         
-        # Grade each question
-        for question in questions:
-            user_answer = request.POST.get(f'question_{question.id}')
-            if not user_answer:
-                continue  # Skip unanswered questions
-            
-            is_correct = False
-            
-            if question.question_type == 'multiple_choice':
-                try:
-                    selected_choice = Choice.objects.get(id=user_answer)
-                    if selected_choice.is_correct:
-                        score += 1
-                        is_correct = True
-                    # Save answer
-                    Answer.objects.create(
-                        attempt=quiz_attempt,
-                        question=question,
-                        choice=selected_choice
-                    )
-                except Choice.DoesNotExist:
-                    pass
-                    
-            elif question.question_type == 'true_false':
-                if user_answer.strip().lower() == question.correct_answer.strip().lower():
-                    score += 1
-                    is_correct = True
-                # Save answer
-                Answer.objects.create(
-                    attempt=quiz_attempt,
-                    question=question,
-                    text_answer=user_answer
-                )
-                
-            elif question.question_type in ['fill_in_the_blanks', 'identification']:
-                # Case-insensitive comparison, strip whitespace
-                if user_answer.strip().lower() == question.correct_answer.strip().lower():
-                    score += 1
-                    is_correct = True
-                # Save answer
-                Answer.objects.create(
-                    attempt=quiz_attempt,
-                    question=question,
-                    text_answer=user_answer
-                )
-        
-        # Calculate percentage
-        percentage_score = round((score / total_questions) * 100, 2) if total_questions > 0 else 0
-        
-        # Update quiz attempt
-        quiz_attempt.score = percentage_score
-        quiz_attempt.save()
+        # Create quiz attempt with all of its answers
+        quiz_attempt = save_attempt(enrollment, quiz, graded)
         
         # Update enrollment score
         enrollment.score = percentage_score
@@ -809,11 +708,10 @@ def take_quiz(request, quiz_id):
             # Mark quiz material as complete ONLY if passed
             enrollment.completed_materials.add(quiz.material)
             
-            # Update progress
-            total_materials = enrollment.course.materials.count()
-            if total_materials > 0:
-                completed_count = enrollment.completed_materials.count()
-                progress = round((completed_count / total_materials) * 100)
+            # Update progress (counters are maintained by the completed_materials signal)
+            enrollment.refresh_progress_counters()
+            progress = enrollment.material_progress()
+            if progress is not None:
                 enrollment.progress_percentage = progress
                 
                 # Check for course completion
@@ -842,48 +740,18 @@ def take_quiz(request, quiz_id):
                         )
                         
                         # Notify admins
-                        admins = CustomUser.objects.filter(is_superuser=True)
-                        for admin in admins:
-                            Notification.objects.create(
-                                user=admin,
-                                notification_type='system',
-                                title='Certificate Pending Approval',
-                                message=f'{enrollment.user.get_full_name() or enrollment.user.username} completed "{enrollment.course.title}"',
-                                link=reverse('dashboard:certifications')
-                            )
+                        notify_users(
+                            CustomUser.objects.filter(is_superuser=True),
+                            'system',
+                            title='Certificate Pending Approval',
+                            message=f'{enrollment.user.get_full_name() or enrollment.user.username} completed "{enrollment.course.title}"',
+                            link=reverse('dashboard:certifications'),
+                        )
                 
                 enrollment.save()
         else:
             enrollment.save()
         
-        # Build results data for review
-        results = []
-        for question in questions:
-            answer = quiz_attempt.answers.filter(question=question).first()
-            user_answer_text = ''
-            is_correct = False
-            correct_answer_text = ''
-            
-            if question.question_type == 'multiple_choice':
-                if answer and answer.choice:
-                    user_answer_text = answer.choice.text
-                    is_correct = answer.choice.is_correct
-                # Get correct choice
-                correct_choice = question.choices.filter(is_correct=True).first()
-                correct_answer_text = correct_choice.text if correct_choice else 'N/A'
-            else:
-                if answer:
-                    user_answer_text = answer.text_answer
-                    is_correct = user_answer_text.strip().lower() == question.correct_answer.strip().lower()
-                correct_answer_text = question.correct_answer
-            
-            results.append({
-                'question': question,
-                'user_answer': user_answer_text,
-                'correct_answer': correct_answer_text,
-                'is_correct': is_correct,
-            })
-        
         # Render results page instead of redirecting
         context = {
             'quiz': quiz,
@@ -893,7 +761,7 @@ def take_quiz(request, quiz_id):
             'percentage_score': percentage_score,
             'passed': passed,
             'pass_mark': quiz.pass_mark,
-            'results': results,
+            'results': graded['results'],
             'attempt': quiz_attempt,
         }
         
@@ -902,7 +770,7 @@ def take_quiz(request, quiz_id):
     # GET request - show quiz
     context = {
         'quiz': quiz,
-        'questions': questions,
+        'questions': quiz.questions.order_by('order', 'id').prefetch_related('choices'),
         'enrollment': enrollment,
     }
     
@@ -1065,7 +933,7 @@ def manage_quiz(request, material_id):
 
             return redirect('dashboard:manage_quiz', material_id=material.id)
 
-        questions = quiz.questions.all().prefetch_related('choices')
+        questions = quiz.questions.order_by('order', 'id').prefetch_related('choices')
         logger.info(f"Rendering template with {questions.count()} questions")
 
         context = {
@@ -1114,8 +982,8 @@ def edit_course(request, course_id):
             
             # Upload to Supabase
             try:
-                from .supabase_utils import SupabaseStorage
-                storage = SupabaseStorage(use_service_key=True)
+                from .supabase_utils import get_storage
+                storage = get_storage(use_service_key=True)
                 
                 # Create file path
                 import time
@@ -1182,19 +1050,13 @@ def create_training(request):
                 if programs:
                     recipients = recipients.filter(program__in=programs)
 
-            notified = 0
-            for u in recipients:
-                pref = NotificationPreference.objects.filter(user=u).first()
-                if pref and not getattr(pref, 'notify_on_announcement', True):
-                    continue
-                Notification.objects.create(
-                    user=u,
-                    notification_type='announcement',
-                    title=f'New Course: {course.title}',
-                    message=f'A new course "{course.title}" is now available. Check it out!',
-                    link=reverse('dashboard:course_detail', args=[course.id])
-                )
-                notified += 1
+            notify_users(
+                recipients,
+                'announcement',
+                title=f'New Course: {course.title}',
+                message=f'A new course "{course.title}" is now available. Check it out!',
+                link=reverse('dashboard:course_detail', args=[course.id]),
+            )
         except Exception as e:
             try:
                 logger.warning(f"Failed to send new course notifications: {e}")
@@ -1419,11 +1281,10 @@ def mark_material_complete(request, enrollment_id, material_id):
     # Add material to completed set
     enrollment.completed_materials.add(material)
     
-    # Recalculate progress
-    total_materials = enrollment.course.materials.count()
-    if total_materials > 0:
-        completed_count = enrollment.completed_materials.count()
-        progress = round((completed_count / total_materials) * 100)
+    # Progress counters are updated by the completed_materials signal
+    enrollment.refresh_progress_counters()
+    progress = enrollment.material_progress()
+    if progress is not None:
         enrollment.progress_percentage = progress
         
         # Check for course completion
@@ -1451,15 +1312,13 @@ def mark_material_complete(request, enrollment_id, material_id):
                 )
                 
                 # Notify admins about pending certificate
-                admins = CustomUser.objects.filter(is_superuser=True)
-                for admin in admins:
-                    Notification.objects.create(
-                        user=admin,
-                        notification_type='system',
-                        title='Certificate Pending Approval',
-                        message=f'{enrollment.user.get_full_name() or enrollment.user.username} completed "{enrollment.course.title}" and needs certificate approval.',
-                        link=reverse('dashboard:certifications')
-                    )
+                notify_users(
+                    CustomUser.objects.filter(is_superuser=True),
+                    'system',
+                    title='Certificate Pending Approval',
+                    message=f'{enrollment.user.get_full_name() or enrollment.user.username} completed "{enrollment.course.title}" and needs certificate approval.',
+                    link=reverse('dashboard:certifications'),
+                )
                 
                 messages.success(request, f"Congratulations! You have completed {enrollment.course.title}. Your certificate is pending approval.")
             else:
@@ -1482,26 +1341,20 @@ def approve_certificate(request, certificate_id):
             # Set expiry date if provided
             if expiry_date_str:
                 certificate.expiry_date = expiry_date_str
+                certificate.save()
             
-            # Generate PDF and upload to Supabase
-            pdf_success, pdf_url = generate_and_upload_certificate(certificate)
+            # PDF generation, upload and the user notification run in the
+            # background worker (python manage.py run_worker); a repeated
+            # approval reuses the job that is already queued
+            enqueue(
+                'issue_certificate', unique_on=['certificate_id'],
+                certificate_id=certificate.id, issued_by_id=request.user.id,
+            )
             
-            if pdf_success:
-                # Update certificate status
-                certificate.status = 'issued'
-                certificate.certificate_url = pdf_url
-                certificate.issued_by = request.user
-                certificate.save()
-                
-                # Create notification for user
-                Notification.create_certificate_notification(certificate)
-                
-                messages.success(
-                    request,
-                    f'Certificate approved and issued to {certificate.enrollment.user.username}'
-                )
-            else:
-                messages.error(request, 'Failed to generate certificate PDF')
+            messages.success(
+                request,
+                f'Certificate approved for {certificate.enrollment.user.username}. It will be issued shortly.'
+            )
         
         except Exception as e:
             messages.error(request, f'Error approving certificate: {str(e)}')
@@ -1512,6 +1365,36 @@ def approve_certificate(request, certificate_id):
     
     return redirect('dashboard:certifications')
 
+@login_required
+@user_passes_test(is_superuser)
+def bulk_approve_certificates(request):
+    """Admin view to approve several draft certificates at once."""
+    if request.method == 'POST':
+        certificates = Certificate.objects.filter(
+            id__in=request.POST.getlist('certificate_ids'),
+            status='draft'
+        )
+        certificate_ids = list(certificates.values_list('id', flat=True))
+        
+        if not certificate_ids:
+            messages.warning(request, 'Select at least one pending certificate to approve.')
+            return redirect('dashboard:certifications')
+        
+        expiry_date_str = request.POST.get('expiry_date')
+        if expiry_date_str:
+            certificates.update(expiry_date=expiry_date_str)
+        
+        # Rendered, uploaded and issued in batches by the background worker
+        enqueue('issue_certificates', certificate_ids=certificate_ids, issued_by_id=request.user.id)
+        
+        messages.success(
+            request,
+            f'{len(certificate_ids)} certificate{"s" if len(certificate_ids) != 1 else ""} approved. '
+            f'They will be issued shortly.'
+        )
+    
+    return redirect('dashboard:certifications')
+
 @login_required
 @user_passes_test(is_superuser)
 def admin_user_toggle_status(request, user_id):
@@ -1541,126 +1424,62 @@ def admin_user_toggle_status(request, user_id):
 def reports(request):
     """Admin reports and analytics dashboard (US-03)"""
     
-    # Overall Statistics
-    total_courses = TrainingCourse.objects.count()
-    active_courses = TrainingCourse.objects.filter(status='active').count()
-    archived_courses = TrainingCourse.objects.filter(status='archived').count()
-    
-    total_enrollments = Enrollment.objects.count()
-    active_enrollments = Enrollment.objects.filter(
-        status__in=['enrolled', 'in_progress']
-    ).count()
-    completed_enrollments = Enrollment.objects.filter(status='completed').count()
-    
-    total_users = CustomUser.objects.filter(is_superuser=False).count()
-    total_certificates = Certificate.objects.filter(status='issued').count()
+    # Computed with database-side aggregation and cached briefly; see dashboard.reports
+    context = get_report()
     
-    # Completion Rate
-    if total_enrollments > 0:
-        overall_completion_rate = round((completed_enrollments / total_enrollments) * 100, 1)
-    else:
-        overall_completion_rate = 0
+    return render(request, 'dashboard/reports.html', context)
+
+
+@login_required
+@user_passes_test(is_superuser)
+def export_report(request, report, file_format):
+    """Stream a full report as CSV or XLSX (US-03); see dashboard.exports"""
+    if report not in EXPORTS or file_format not in EXPORT_FORMATS:
+        raise Http404("Unknown export")
     
-    # Average Score
-    avg_score = Enrollment.objects.filter(
-        score__isnull=False
-    ).aggregate(Avg('score'))['score__avg']
-    avg_score = round(avg_score, 1) if avg_score else 0
-    
-    # Course Performance
-    course_stats = TrainingCourse.objects.annotate(
-        total_enrolled=Count('enrollments'),
-        completed=Count('enrollments', filter=Q(enrollments__status='completed')),
-        avg_score=Avg('enrollments__score', filter=Q(enrollments__score__isnull=False))
-    ).filter(total_enrolled__gt=0).order_by('-total_enrolled')[:10]
-    
-    # Recent Enrollments
-    recent_enrollments = Enrollment.objects.select_related(
-        'user', 'course'
-    ).order_by('-enrolled_date')[:10]
-    
-    # Recent Completions
-    recent_completions = Enrollment.objects.filter(
-        status='completed'
-    ).select_related('user', 'course').order_by('-completion_date')[:10]
-    
-    # User Progress Summary
-    user_progress = CustomUser.objects.filter(
-        is_superuser=False
-    ).annotate(
-        total_enrollments=Count('enrollments'),
-        completed_courses=Count('enrollments', filter=Q(enrollments__status='completed')),
-        in_progress=Count('enrollments', filter=Q(enrollments__status='in_progress')),
-        avg_score=Avg('enrollments__score', filter=Q(enrollments__score__isnull=False))
-    ).filter(total_enrollments__gt=0).order_by('-completed_courses')[:10]
-    
-    # Monthly Enrollment Trend (last 6 months)
-    six_months_ago = timezone.now() - timedelta(days=180)
-    
-    # Get enrollments and group by month in Python (SQLite compatible)
-    enrollments_recent = Enrollment.objects.filter(
-        enrolled_date__gte=six_months_ago
-    ).values('enrolled_date')
-    
-    monthly_data = defaultdict(int)
-    for enrollment in enrollments_recent:
-        if enrollment['enrolled_date']:
-            month_key = enrollment['enrolled_date'].strftime('%Y-%m')
-            monthly_data[month_key] += 1
-    
-    monthly_enrollments = [
-        {'month': month, 'count': count}
-        for month, count in sorted(monthly_data.items())
-    ]
-    
-    # Category Performance
-    category_stats = TrainingCategory.objects.annotate(
-        course_count=Count('courses'),
-        enrollment_count=Count('courses__enrollments'),
-        completion_count=Count('courses__enrollments', filter=Q(courses__enrollments__status='completed'))
-    ).filter(course_count__gt=0)
-    
-    # Certificates Issued (group by month in Python)
-    certs_recent = Certificate.objects.filter(
-        status='issued',
-        issue_date__gte=six_months_ago
-    ).values('issue_date')
-    
-    cert_monthly_data = defaultdict(int)
-    for cert in certs_recent:
-        if cert['issue_date']:
-            month_key = cert['issue_date'].strftime('%Y-%m')
-            cert_monthly_data[month_key] += 1
-    
-    certificates_by_month = [
-        {'month': month, 'count': count}
-        for month, count in sorted(cert_monthly_data.items())
-    ]
+    headers, rows = EXPORTS[report]
+    content_type, stream = EXPORT_FORMATS[file_format]
     
-    context = {
-        # Overall Stats
-        'total_courses': total_courses,
-        'active_courses': active_courses,
-        'archived_courses': archived_courses,
-        'total_enrollments': total_enrollments,
-        'active_enrollments': active_enrollments,
-        'completed_enrollments': completed_enrollments,
-        'total_users': total_users,
-        'total_certificates': total_certificates,
-        'overall_completion_rate': overall_completion_rate,
-        'avg_score': avg_score,
-        
-        # Detailed Stats
-        'course_stats': course_stats,
-        'recent_enrollments': recent_enrollments,
-        'recent_completions': recent_completions,
-        'user_progress': user_progress,
-        'monthly_enrollments': monthly_enrollments,
-        'category_stats': category_stats,
-        'certificates_by_month': certificates_by_month,
+    # Rows are read in chunks and written as they arrive, so the download
+    # starts immediately and memory use does not grow with the table
+    response = StreamingHttpResponse(stream(headers, rows()), content_type=content_type)
+    filename = f'{report}_{timezone.localdate():%Y%m%d}.{file_format}'
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+
+@login_required
+@user_passes_test(is_superuser)
+def request_metrics(request):
+    """Per-view latency, query count and DB time over recent requests in this worker"""
+    return JsonResponse({'views': rolling_metrics()})
+
+
+JOB_QUEUE_STATUSES = ('pending', 'running', 'failed', 'dead')
+
+
+def prometheus_metrics(request):
+    """Application metrics in the Prometheus text format; see dashboard.metrics
+
+    Open to superusers, or to scrapers sending ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    token = getattr(django_settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    if not (request.user.is_superuser or (token and constant_time_compare(authorization, f'Bearer {token}'))):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    
+    # Queue depth is read from the database at scrape time
+    depth = dict(
+        BackgroundJob.objects.filter(status__in=JOB_QUEUE_STATUSES)
+        .values('status').annotate(total=Count('id')).values_list('status', 'total')
+    )
+    gauges = {
+        ('protrack_job_queue_depth', (('status', status),)): depth.get(status, 0)
+        for status in JOB_QUEUE_STATUSES
     }
-    
-    return render(request, 'dashboard/reports.html', context)
+    return HttpResponse(metrics.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @login_required
 def notifications_list(request):
     """Display all notifications for the user"""
@@ -1669,30 +1488,63 @@ def notifications_list(request):
     # Mark as read if requested
     mark_read = request.GET.get('mark_read')
     if mark_read == 'all':
-        notifications.update(is_read=True)
+        Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        reset_unread_counts([request.user.id])
+        touch_notification_stamps([request.user.id])
     
     context = {
         'notifications': notifications,
-        'unread_count': Notification.objects.filter(user=request.user, is_read=False).count()
+        'unread_count': unread_count(request.user.id)
     }
     return render(request, 'dashboard/notifications.html', context)
 
 @login_required
 def notifications_api(request):
-    """API endpoint to get notifications as JSON - respects user preferences"""
+    """
+    API endpoint to get notifications as JSON - respects user preferences
+
+    Responses carry an ETag so polling clients get a 304 from a single
+    aggregate query when nothing has changed. There is no Last-Modified:
+    reads and deletes change the feed without leaving a timestamp behind.
+    """
+    allowed_types = allowed_notification_types(request.user)
+    etag, unread = notification_state(request.user, allowed_types)
+    
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(notifications_payload(request.user, allowed_types, unread))
     
-    # Get user preferences
-    prefs = getattr(request.user, 'notification_preferences', None)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@login_required
+async def notifications_stream(request):
+    """
+    Server-Sent Events stream that pushes the notifications payload on change.
+
+    Needs an ASGI server; with NOTIFICATION_STREAM_ENABLED off it answers 204,
+    which tells EventSource to stop and the page to poll notifications_api.
+    """
+    if not getattr(django_settings, 'NOTIFICATION_STREAM_ENABLED', False):
+        return HttpResponse(status=204)
+    
+    user = await request.auser()
+    response = StreamingHttpResponse(
+        notification_events(user, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
+
+def allowed_notification_types(user):
+    """Notification types the user has enabled (system notifications always show)."""
+    prefs = getattr(user, 'notification_preferences', None)
     if not prefs:
         from accounts.models import NotificationPreference
-        prefs, _ = NotificationPreference.objects.get_or_create(user=request.user)
-    
-    # Start with all notifications for this user
-    notifications = Notification.objects.filter(
-        user=request.user
-    ).order_by('-created_at')
+        prefs, _ = NotificationPreference.objects.get_or_create(user=user)
     
-    # Filter based on preferences
     allowed_types = []
     
     if prefs.notify_on_enrollment:
@@ -1708,11 +1560,33 @@ def notifications_api(request):
     
     # Always show system notifications
     allowed_types.append('system')
+    return allowed_types
+
+def notification_state(user, allowed_types):
+    """
+    Cheap validator for the user's notification feed.
+    Returns (etag, unread) from one aggregate query.
+    """
+    state = Notification.objects.filter(
+        user=user,
+        notification_type__in=allowed_types
+    ).aggregate(
+        total=Count('id'),
+        latest_id=Max('id'),
+        unread=Count('id', filter=Q(is_read=False)),
+    )
+    fingerprint = f"{state['total']}:{state['latest_id']}:{state['unread']}:{','.join(allowed_types)}"
+    etag = '"{}"'.format(hashlib.md5(fingerprint.encode()).hexdigest())
+    return etag, state['unread']
+
+def notifications_payload(user, allowed_types, unread):
+    """Latest notifications; unread is the count notification_state() built the ETag from."""
+    notifications = Notification.objects.filter(
+        user=user,
+        notification_type__in=allowed_types
+    ).order_by('-created_at')[:20]
     
-    # Filter notifications by allowed types
-    notifications = notifications.filter(notification_type__in=allowed_types)[:20]
-    
-    data = {
+    return {
         'notifications': [
             {
                 'id': n.id,
@@ -1725,14 +1599,48 @@ def notifications_api(request):
                 'time_ago': get_time_ago(n.created_at),
             } for n in notifications
         ],
-        'unread_count': Notification.objects.filter(
-            user=request.user,
-            is_read=False,
-            notification_type__in=allowed_types  # Only count allowed types
-        ).count()
+        'unread_count': unread  # Only counts allowed types
     }
-    
-    return JsonResponse(data)
+
+async def notification_events(user, last_event_id=None):
+    """
+    Yield SSE messages for one connection.
+
+    The cached notification stamp is checked every STREAM_CHECK_SECONDS; the
+    database is only queried when it changes, or every
+    NOTIFICATION_STREAM_FALLBACK_SECONDS in case the change happened in a
+    process that does not share this cache. The stream ends after
+    NOTIFICATION_STREAM_MAX_SECONDS and the browser reconnects, sending the
+    last ETag as Last-Event-ID so an unchanged feed is not resent.
+    """
+    max_seconds = getattr(django_settings, 'NOTIFICATION_STREAM_MAX_SECONDS', 300)
+    fallback_seconds = getattr(django_settings, 'NOTIFICATION_STREAM_FALLBACK_SECONDS', 30)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    
+    yield 'retry: 5000\n\n'
+    
+    sent_etag = last_event_id
+    stamp = checked_at = None
+    last_write = loop.time()
+    while True:
+        now = loop.time()
+        current_stamp = await get_notification_stamp(user.id)
+        if checked_at is None or current_stamp != stamp or now - checked_at >= fallback_seconds:
+            stamp, checked_at = current_stamp, now
+            allowed_types = await sync_to_async(allowed_notification_types)(user)
+            etag, unread = await sync_to_async(notification_state)(user, allowed_types)
+            if etag != sent_etag:
+                payload = await sync_to_async(notifications_payload)(user, allowed_types, unread)
+                yield f'id: {etag}\nevent: notifications\ndata: {json.dumps(payload)}\n\n'
+                sent_etag, last_write = etag, now
+        
+        if now >= deadline:
+            return
+        if now - last_write >= STREAM_KEEPALIVE_SECONDS:
+            yield ': keep-alive\n\n'
+            last_write = now
+        await asyncio.sleep(STREAM_CHECK_SECONDS)
 
 @login_required
 @require_POST
@@ -1750,6 +1658,10 @@ def mark_notification_read(request, notification_id):
 def mark_all_read(request):
     """Mark all notifications as read for the current user"""
     count = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    if count:
+        # update() skips post_save
+        reset_unread_counts([request.user.id])
+        touch_notification_stamps([request.user.id])
     return JsonResponse({'success': True, 'marked_count': count})
 
 @login_required
@@ -1804,51 +1716,146 @@ from django.http import JsonResponse
 @login_required
 def calendar(request):
     """Render the calendar page."""
-    return render(request, 'dashboard/calendar.html')
+    feed, _ = CalendarFeed.objects.get_or_create(user=request.user)
+    return render(request, 'dashboard/calendar.html', {
+        'calendar_feed_url': request.build_absolute_uri(
+            reverse('dashboard:calendar_feed', args=[feed.token])
+        ),
+    })
+
+@login_required
+@require_POST
+def reset_calendar_feed(request):
+    """Issue a new subscription URL; calendars subscribed to the old one stop updating."""
+    feed, _ = CalendarFeed.objects.get_or_create(user=request.user)
+    feed.regenerate()
+    messages.success(request, 'Your calendar subscription link has been reset.')
+    return redirect('dashboard:calendar')
+
+def calendar_feed(request, token):
+    """
+    iCalendar subscription feed for Outlook/Google Calendar (see
+    dashboard.calendar_feed). The secret token in the URL identifies the
+    user. An unchanged feed is answered with a 304 from the feed's version;
+    a changed one is rebuilt once and served from the cache afterwards.
+    """
+    feed = CalendarFeed.objects.filter(token=token, user__is_active=True).select_related('user').first()
+    if feed is None:
+        raise Http404('Unknown calendar feed')
+
+    etag = feed_etag(feed)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(get_feed(feed), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = content_disposition_header(False, 'protrack.ics')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def calendar_window(request):
+    """
+    FullCalendar's visible range from its start/end parameters as
+    (start, end) dates, end exclusive. A missing bound is None (no limit).
+    Raises ValueError for values that are not ISO dates or datetimes.
+    """
+    bounds = []
+    for name in ('start', 'end'):
+        value = request.GET.get(name)
+        parsed = parse_date(value[:10]) if value else None
+        if value and parsed is None:
+            raise ValueError(f"Invalid {name}: {value}")
+        bounds.append(parsed)
+    return tuple(bounds)
+
+def calendar_feed_response(request, window, queryset, modified_fields, build_events):
+    """
+    FullCalendar JSON feed with conditional GET.
+
+    The ETag comes from one aggregate over the windowed queryset (row
+    count, newest id and latest modification), so a client navigating back
+    to an unchanged month gets a 304 without the events being built.
+    """
+    state = queryset.order_by().aggregate(
+        total=Count('id'),
+        latest_id=Max('id'),
+        **{f'modified_{i}': Max(field) for i, field in enumerate(modified_fields)}
+    )
+    fingerprint = f"{request.user.id}:{request.user.is_superuser}:{window}:" + ':'.join(
+        str(state[key]) for key in sorted(state)
+    )
+    etag = '"{}"'.format(hashlib.md5(fingerprint.encode()).hexdigest())
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(build_events(), safe=False, json_dumps_params={'separators': (',', ':')})
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @login_required
 def get_calendar_events(request):
-    """API endpoint to fetch calendar events for FullCalendar."""
-    events = []
+    """API endpoint to fetch calendar events for FullCalendar (honours its start/end range)."""
+    try:
+        window = calendar_window(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    start, end = window
+
     if request.user.is_superuser:
         # Superusers see all training sessions
-        sessions = TrainingSession.objects.all().select_related('course')
-        for session in sessions:
-            events.append({
-                'title': f"{session.course.title} - {session.session_name}",
-                'start': f"{session.start_date}T{session.start_time}",
-                'end': f"{session.end_date}T{session.end_time}",
-                'url': reverse('dashboard:course_detail', args=[session.course.id]),
-                'color': '#3b82f6', # Blue for sessions
-                'extendedProps': {
-                    'location': session.location,
-                    'is_online': session.is_online
+        sessions = calendar_sessions(start, end)
+
+        def build_events():
+            return [
+                {
+                    'title': f"{course_title} - {session_name}",
+                    'start': f"{start_date}T{start_time}",
+                    'end': f"{end_date}T{end_time}",
+                    'url': reverse('dashboard:course_detail', args=[course_id]),
+                    'color': '#3b82f6', # Blue for sessions
+                    'extendedProps': {
+                        'location': location,
+                        'is_online': is_online
+                    }
                 }
-            })
-    else:
-        # Regular users see their course start and finish dates
-        enrollments = Enrollment.objects.filter(user=request.user).select_related('course')
-        for enrollment in enrollments:
-            # Default completion date to one day after start if not set
-            end_date = enrollment.completion_date
-            if not end_date:
-                end_date = enrollment.enrolled_date + timedelta(days=1)
+                for (course_id, course_title, session_name, start_date, start_time,
+                     end_date, end_time, location, is_online) in sessions.values_list(
+                    'course_id', 'course__title', 'session_name', 'start_date', 'start_time',
+                    'end_date', 'end_time', 'location', 'is_online',
+                )
+            ]
+
+        return calendar_feed_response(
+            request, window, sessions, ['updated_at', 'course__updated_at'], build_events
+        )
+
+    # Regular users see their course start and finish dates
+    enrollments = calendar_enrollments(request.user, start, end)
 
+    def build_events():
+        events = []
+        for enrollment_id, course_id, course_title, enrolled_date, completion_date in enrollments.values_list(
+            'id', 'course_id', 'course__title', 'enrolled_date', 'completion_date'
+        ):
+            # Default completion date to one day after start if not set
+            end_date = completion_date or enrolled_date + timedelta(days=1)
             events.append({
-                'id': enrollment.id,
-                'title': enrollment.course.title,
-                'start': enrollment.enrolled_date.strftime('%Y-%m-%d'),
+                'id': enrollment_id,
+                'title': course_title,
+                'start': enrolled_date.strftime('%Y-%m-%d'),
                 'end': end_date.strftime('%Y-%m-%d'),
                 'allDay': True,
-                'color': '#3b82f6' if enrollment.completion_date else '#60a5fa', # Darker blue for set, lighter for unset
-                'url': reverse('dashboard:course_detail', args=[enrollment.course.id]),
-                # Make the event editable, but only from the end
-                'editable': True,
-                'eventStartEditable': False,
-                'eventDurationEditable': True, 
+                'color': '#3b82f6' if completion_date else '#60a5fa', # Darker blue for set, lighter for unset
+                'url': reverse('dashboard:course_detail', args=[course_id]),
+                # Only the end can be moved (see eventResize on the calendar page)
+                'startEditable': False,
+                'durationEditable': True,
             })
+        return events
 
-    return JsonResponse(events, safe=False)
+    return calendar_feed_response(
+        request, window, enrollments, ['updated_at', 'course__updated_at'], build_events
+    )
 
 @login_required
 @require_POST
@@ -1953,29 +1960,42 @@ def create_calendar_event(request):
 
 @login_required
 def get_user_calendar_events(request):
-    """API endpoint to fetch user's calendar events."""
-    events = CalendarEvent.objects.filter(user=request.user)
-    
-    event_list = []
-    for event in events:
-        event_data = {
-            'id': f'user_event_{event.id}',
-            'title': event.title,
-            'start': f"{event.event_date}T{event.event_time}",
-            'color': event.color,
-            'extendedProps': {
-                'event_type': event.event_type,
-                'description': event.description,
-                'reminder_minutes': event.reminder_minutes,
-                'is_user_event': True
+    """API endpoint to fetch user's calendar events (honours FullCalendar's start/end range)."""
+    try:
+        window = calendar_window(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    start, end = window
+
+    events = calendar_events(request.user, start, end)
+
+    def build_events():
+        event_list = []
+        for (event_id, title, event_type, description, event_date, event_time, end_time,
+             reminder_minutes, color) in events.values_list(
+            'id', 'title', 'event_type', 'description', 'event_date', 'event_time', 'end_time',
+            'reminder_minutes', 'color',
+        ):
+            event_data = {
+                'id': f'user_event_{event_id}',
+                'title': title,
+                'start': f"{event_date}T{event_time}",
+                'color': color,
+                'extendedProps': {
+                    'event_type': event_type,
+                    'reminder_minutes': reminder_minutes,
+                    'is_user_event': True
+                }
             }
-        }
-        if event.end_time:
-            event_data['end'] = f"{event.event_date}T{event.end_time}"
-        
-        event_list.append(event_data)
-    
-    return JsonResponse(event_list, safe=False)
+            if description:
+                event_data['extendedProps']['description'] = description
+            if end_time:
+                event_data['end'] = f"{event_date}T{end_time}"
+
+            event_list.append(event_data)
+        return event_list
+
+    return calendar_feed_response(request, window, events, ['updated_at'], build_events)
 
 
 @login_required
@@ -2235,20 +2255,17 @@ def upload_material(request, course_id):
         )
         
         # Create notifications for enrolled users
-        enrollments = Enrollment.objects.filter(
-            course=course,
-            status__in=['enrolled', 'in_progress']
+        notify_users(
+            CustomUser.objects.filter(
+                enrollments__course=course,
+                enrollments__status__in=['enrolled', 'in_progress']
+            ),
+            'announcement',
+            title=f'New Material: {material.title}',
+            message=f'New {material_type} material has been added to {course.title}',
+            link=reverse('dashboard:course_detail', args=[course.id]),
         )
         
-        for enrollment in enrollments:
-            Notification.objects.create(
-                user=enrollment.user,
-                notification_type='announcement',
-                title=f'New Material: {material.title}',
-                message=f'New {material_type} material has been added to {course.title}',
-                link=reverse('dashboard:course_detail', args=[course.id])
-            )
-        
         messages.success(request, f'Successfully uploaded {uploaded_file.name}')
 
         is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest' or request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest'
@@ -2483,137 +2500,14 @@ def generate_certificate_pdf(certificate):
     """
     Generate a professional certificate PDF using ReportLab
     Returns a BytesIO buffer containing the PDF
+
+    The static background is cached per process; see dashboard.certificates.
     """
     try:
-        buffer = BytesIO()
-        
-        # Create PDF in landscape mode
-        c = canvas.Canvas(buffer, pagesize=landscape(letter))
-        width, height = landscape(letter)
-        
-        # =====================================================
-        # MODERN CERTIFICATE DESIGN
-        # =====================================================
-        
-        # Draw outer border (gold)
-        c.setStrokeColor(colors.HexColor('#C9A961'))
-        c.setLineWidth(6)
-        c.roundRect(0.4*inch, 0.4*inch, width-0.8*inch, height-0.8*inch, 15)
-        
-        # Draw inner border (blue)
-        c.setStrokeColor(colors.HexColor('#667eea'))
-        c.setLineWidth(3)
-        c.roundRect(0.6*inch, 0.6*inch, width-1.2*inch, height-1.2*inch, 10)
-        
-        # =====================================================
-        # TITLE SECTION
-        # =====================================================
-        
-        # Main title "CERTIFICATE"
-        c.setFont("Helvetica-Bold", 60)
-        c.setFillColor(colors.HexColor('#667eea'))
-        c.drawCentredString(width/2, height-2*inch, "CERTIFICATE")
-        
-        # Subtitle "OF COMPLETION"
-        c.setFont("Helvetica", 24)
-        c.setFillColor(colors.black)
-        c.drawCentredString(width/2, height-2.5*inch, "OF COMPLETION")
-        
-        # Decorative line
-        c.setStrokeColor(colors.HexColor('#764ba2'))
-        c.setLineWidth(2)
-        c.line(width/2 - 3.5*inch, height-2.8*inch, width/2 + 3.5*inch, height-2.8*inch)
-        
-        # =====================================================
-        # RECIPIENT SECTION
-        # =====================================================
-        
-        # "This is to certify that"
-        c.setFont("Helvetica", 16)
-        c.setFillColor(colors.black)
-        c.drawCentredString(width/2, height-3.6*inch, "This is to certify that")
-        
-        # Recipient name (gold and bold)
-        c.setFont("Helvetica-Bold", 40)
-        c.setFillColor(colors.HexColor('#764ba2'))
-        user_name = certificate.enrollment.user.get_full_name() or certificate.enrollment.user.username
-        c.drawCentredString(width/2, height-4.3*inch, user_name)
-        
-        # =====================================================
-        # COURSE SECTION
-        # =====================================================
-        
-        # "has successfully completed the course"
-        c.setFont("Helvetica", 15)
-        c.setFillColor(colors.black)
-        c.drawCentredString(width/2, height-5*inch, "has successfully completed the course")
-        
-        # Course title (blue and bold)
-        c.setFont("Helvetica-Bold", 26)
-        c.setFillColor(colors.HexColor('#667eea'))
-        course_title = certificate.enrollment.course.title
-        
-        # Handle long course titles
-        if len(course_title) > 50:
-            words = course_title.split()
-            mid = len(words) // 2
-            line1 = ' '.join(words[:mid])
-            line2 = ' '.join(words[mid:])
-            c.drawCentredString(width/2, height-5.6*inch, line1)
-            c.drawCentredString(width/2, height-6*inch, line2)
-            info_y_position = height-6.7*inch
-        else:
-            c.drawCentredString(width/2, height-5.6*inch, course_title)
-            info_y_position = height-6.3*inch
-        
-        # Course details (duration and instructor)
-        c.setFont("Helvetica", 13)
-        c.setFillColor(colors.HexColor('#666666'))
-        course_info = f"Duration: {certificate.enrollment.course.duration_hours} hours | Instructor: {certificate.enrollment.course.instructor}"
-        c.drawCentredString(width/2, info_y_position, course_info)
-        
-        # =====================================================
-        # SIGNATURE AND DATES SECTION
-        # =====================================================
-        
-        # Signature line
-        c.setStrokeColor(colors.black)
-        c.setLineWidth(1)
-        c.line(width/2 - 2*inch, 2.5*inch, width/2 + 2*inch, 2.5*inch)
-        
-        
-        
-        # Issued by name (if available)
-        if certificate.issued_by:
-            c.setFont("Helvetica-Bold", 11)
-            c.drawCentredString(width/2, 1.95*inch, 
-                certificate.issued_by.get_full_name() or certificate.issued_by.username)
-        
-        # Date issued (left side)
-        c.setFont("Helvetica-Bold", 11)
-        c.setFillColor(colors.black)
-        date_str = certificate.issue_date.strftime("%B %d, %Y")
-        c.drawString(1.5*inch, 1.6*inch, f"Date Issued: {date_str}")
-        
-        # Certificate number (right side)
-        c.drawRightString(width-1.5*inch, 1.6*inch, f"Certificate No: {certificate.certificate_number}")
-        
-        # =====================================================
-        # FOOTER
-        # =====================================================
-        
-        # System name
-        c.setFont("Helvetica-Oblique", 11)
-        c.setFillColor(colors.grey)
-        c.drawCentredString(width/2, 1*inch, "ProTrack - Skills & Training Management System")
-        
-        # Verification text
-        c.setFont("Helvetica-Oblique", 9)
-        c.drawCentredString(width/2, 0.7*inch, 
-            "This certificate verifies successful completion of the training program")
-        
-        # Save and return
-        c.save()
+        context = certificate_context(certificate)
+        with metrics.timer('protrack_certificate_render_seconds'):
+            pdf = render_certificate_pdf(context)
+        buffer = BytesIO(pdf)
         buffer.seek(0)
         return buffer
         
@@ -2646,31 +2540,26 @@ def download_all_materials(request, course_id):
                     messages.warning(request, 'No materials available for download')
                     return redirect('dashboard:course_detail', course_id=course_id)
                 
-                # Create ZIP file
-                import zipfile
-                from io import BytesIO
-                import requests
-                
-                zip_buffer = BytesIO()
+                filename = f'{course.title}_materials.zip'
+                bundle_path = bundle_cache_path(course, materials)
                 
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    for material in materials:
-                        try:
-                            # Download file from Supabase
-                            response = requests.get(material.file_url, timeout=30)
-                            if response.status_code == 200:
-                                zip_file.writestr(material.file_name, response.content)
-                        except Exception as e:
-                            logger.error(f"Failed to add {material.file_name}: {str(e)}")
-                
-                zip_buffer.seek(0)
+                # Unchanged course: serve the bundle built by an earlier download
+                if bundle_path.exists():
+                    return FileResponse(
+                        open(bundle_path, 'rb'),
+                        as_attachment=True,
+                        filename=filename,
+                        content_type='application/zip'
+                    )
                 
-                response = FileResponse(
-                    zip_buffer,
-                    content_type='application/zip',
-                    as_attachment=True,
-                    filename=f'{course.title}_materials.zip'
+                # Stream the ZIP: materials are fetched concurrently in chunks and
+                # written straight to the response (and the cache file), so memory
+                # use does not grow with the size of the course
+                response = StreamingHttpResponse(
+                    stream_and_cache_bundle(materials, bundle_path),
+                    content_type='application/zip'
                 )
+                response['Content-Disposition'] = content_disposition_header(True, filename)
                 
                 return response
                 
@@ -2743,15 +2632,14 @@ def mark_material_viewed(request, enrollment_id, material_id):
         enrollment.completed_materials.add(material)
         logger.info(f"Added material {material.id} to completed materials")
 
-        # Recalculate progress
-        total_materials = enrollment.course.materials.count()
-        logger.info(f"Total materials in course: {total_materials}")
+        # Progress counters are updated by the completed_materials signal
+        enrollment.refresh_progress_counters()
+        logger.info(f"Required materials in course: {enrollment.required_count}")
 
-        if total_materials > 0:
-            completed_count = enrollment.completed_materials.count()
-            progress = round((completed_count / total_materials) * 100)
+        progress = enrollment.material_progress()
+        if progress is not None:
             enrollment.progress_percentage = progress
-            logger.info(f"Progress updated: {completed_count}/{total_materials} = {progress}%")
+            logger.info(f"Progress updated: {progress}%")
 
             # Check for course completion
             if progress == 100 and enrollment.status != 'completed':
@@ -2780,15 +2668,13 @@ def mark_material_viewed(request, enrollment_id, material_id):
                     )
 
                     # Notify admins
-                    admins = CustomUser.objects.filter(is_superuser=True)
-                    for admin in admins:
-                        Notification.objects.create(
-                            user=admin,
-                            notification_type='system',
-                            title='Certificate Pending Approval',
-                            message=f'{enrollment.user.get_full_name() or enrollment.user.username} completed "{enrollment.course.title}" and needs certificate approval.',
-                            link=reverse('dashboard:certifications')
-                        )
+                    notify_users(
+                        CustomUser.objects.filter(is_superuser=True),
+                        'system',
+                        title='Certificate Pending Approval',
+                        message=f'{enrollment.user.get_full_name() or enrollment.user.username} completed "{enrollment.course.title}" and needs certificate approval.',
+                        link=reverse('dashboard:certifications'),
+                    )
                 else:
                     logger.info("Certificate already exists")
 
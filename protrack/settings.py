@@ -79,6 +79,7 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'dashboard.instrumentation.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -178,6 +179,85 @@ else:
 
 EMAIL_TIMEOUT = 30
 
+# ============================================
+# BACKGROUND JOBS (dashboard.jobs)
+# ============================================
+# Emails and certificate PDFs run inline in the request by default. Once a
+# worker service runs `python manage.py run_worker` (see
+# DEPLOYMENT_CHECKLIST.md), set JOB_QUEUE_EAGER=False to queue them instead.
+
+JOB_QUEUE_EAGER = config('JOB_QUEUE_EAGER', default=True, cast=bool)
+JOB_WORKER_CONCURRENCY = config('JOB_WORKER_CONCURRENCY', default=4, cast=int)
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=5, cast=int)
+# Running jobs refresh their row this often; run_worker --stale-after must be longer
+JOB_HEARTBEAT_SECONDS = config('JOB_HEARTBEAT_SECONDS', default=60, cast=int)
+
+# Calendar reminders are sent as they fall due by:
+#   python manage.py run_reminder_scheduler
+REMINDER_BATCH_SIZE = config('REMINDER_BATCH_SIZE', default=100, cast=int)
+# Longest the scheduler sleeps between checks, which bounds how late a
+# reminder created while it sleeps can be sent
+REMINDER_MAX_SLEEP = config('REMINDER_MAX_SLEEP', default=30, cast=float)
+
+# Processes used to render certificate PDFs when issuing in bulk
+CERTIFICATE_RENDER_PROCESSES = config('CERTIFICATE_RENDER_PROCESSES', default=2, cast=int)
+
+# ============================================
+# NOTIFICATION STREAM (Server-Sent Events)
+# ============================================
+# Pushes notification updates to open pages. Holding connections open needs
+# an ASGI server (e.g. uvicorn protrack.asgi:application); leave disabled
+# under sync gunicorn workers and pages fall back to conditional polling.
+# Instant delivery across processes needs a shared CACHES backend.
+
+NOTIFICATION_STREAM_ENABLED = config('NOTIFICATION_STREAM_ENABLED', default=False, cast=bool)
+NOTIFICATION_STREAM_MAX_SECONDS = config('NOTIFICATION_STREAM_MAX_SECONDS', default=300, cast=int)
+NOTIFICATION_STREAM_FALLBACK_SECONDS = config('NOTIFICATION_STREAM_FALLBACK_SECONDS', default=30, cast=int)
+
+# ============================================
+# CACHE
+# ============================================
+# Holds notification unread counters (only when shared) and stream stamps.
+# CACHE_BACKEND: 'locmem' (per process), 'file' or 'db' (shared by all
+# processes; 'db' needs `python manage.py createcachetable`)
+
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'protrack',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'django')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': config('CACHE_LOCATION', default='protrack_cache'),
+    },
+}
+CACHES = {'default': CACHE_BACKENDS[CACHE_BACKEND]}
+# Whether every process sees the same cache. Unread counters and the reports
+# page are only cached in a shared cache; with 'locmem' each gunicorn worker
+# would hold its own copy, so they are read from the database instead.
+CACHE_SHARED = config('CACHE_SHARED', default=CACHE_BACKEND != 'locmem', cast=bool)
+
+# Cached unread-notification counters are rebuilt from the database after this long
+NOTIFICATION_COUNT_TIMEOUT = config('NOTIFICATION_COUNT_TIMEOUT', default=3600, cast=int)
+
+# Admin reports page is cached this long when CACHE_SHARED (and dropped on enrollment/certificate changes)
+REPORT_CACHE_TIMEOUT = config('REPORT_CACHE_TIMEOUT', default=300, cast=int)
+
+# Compiled answer keys of published quizzes are cached this long (and retired on any quiz edit)
+ANSWER_KEY_CACHE_TIMEOUT = config('ANSWER_KEY_CACHE_TIMEOUT', default=86400, cast=int)
+
+# Training catalog search (dashboard.search): 'auto' uses PostgreSQL full-text
+# search or SQLite FTS5 to match the database; 'basic' scans with icontains
+CATALOG_SEARCH_BACKEND = config('CATALOG_SEARCH_BACKEND', default='auto')
+
+# Rendered iCalendar subscription feeds are cached this long (and rebuilt when their data changes)
+CALENDAR_FEED_CACHE_TIMEOUT = config('CALENDAR_FEED_CACHE_TIMEOUT', default=86400, cast=int)
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -198,6 +278,11 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Course material ZIP bundles are cached here and served directly while the
+# course's materials are unchanged
+MATERIAL_BUNDLE_CACHE_DIR = config('MATERIAL_BUNDLE_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'material_bundles'))
+MATERIAL_BUNDLE_FETCH_WORKERS = config('MATERIAL_BUNDLE_FETCH_WORKERS', default=4, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -242,6 +327,26 @@ SOCIALACCOUNT_PROVIDERS = {
 # Crispy Forms
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
+# ============================================
+# METRICS (dashboard.instrumentation, dashboard.metrics)
+# ============================================
+
+# Per-view wall time, query count and DB time; histograms at /dashboard/api/metrics/requests/
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=True, cast=bool)
+REQUEST_METRICS_WINDOW = config('REQUEST_METRICS_WINDOW', default=1000, cast=int)  # recent requests kept per view
+# Requests over either threshold are logged with their most repeated SQL
+REQUEST_SLOW_MS = config('REQUEST_SLOW_MS', default=1000, cast=int)
+REQUEST_QUERY_THRESHOLD = config('REQUEST_QUERY_THRESHOLD', default=50, cast=int)
+
+# Prometheus metrics at /metrics (dashboard.metrics): superusers, or scrapers
+# sending "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Directory shared by all gunicorn workers on this host so /metrics covers
+# every process (files of exited workers are removed when scraped);
+# leave empty to report only the process answering the scrape
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=5, cast=int)
+
 # ============================================
 # LOGGING CONFIGURATION (For debugging)
 # ============================================
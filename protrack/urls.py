@@ -20,6 +20,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 
+from dashboard.views import prometheus_metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', TemplateView.as_view(template_name='home.html'), name='home'),
@@ -28,6 +30,7 @@ urlpatterns = [
     path('user/', include('accounts.urls')),
     path('dashboard/', include('dashboard.urls')),
     path('api/training/', include('training.urls')),
+    path('metrics', prometheus_metrics, name='metrics'),
 ]
 
 if settings.DEBUG: